@@ -0,0 +1,124 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AsyncDatabase:
+    def __init__(self, open_databases, config, db_file, close_databases=None, max_workers=4, max_pending=64):
+        """
+        数据库异步门面：所有同步 db_* 调用都在专用的有界线程池中执行，事件循环不再被存储阻塞
+
+        参数:
+            open_databases: 数据库插件的 get_databases 上下文管理器
+            config: 数据库插件配置
+            db_file: 数据库文件路径
+            close_databases: 每次会话结束后调用的关闭函数（可选）
+            max_workers: 线程池工作线程数
+            max_pending: 允许同时排队/执行的调用数上限，超出时调用方在事件循环中等待
+        """
+        self.open_databases = open_databases
+        self.config = config
+        self.db_file = db_file
+        self.close_databases = close_databases
+        self.max_workers = max(1, int(max_workers))
+        self.max_pending = max(self.max_workers, int(max_pending))
+
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="teahouse-db")
+        self._slots = asyncio.Semaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._peak_queued = 0
+        # op -> [调用次数, 失败次数, 总排队耗时, 总执行耗时, 最大执行耗时]
+        self._op_stats = {}
+
+    async def run(self, func, *args, op=None, **kwargs):
+        """在线程池中执行任意同步函数并等待结果"""
+        op = op or getattr(func, "__name__", "call")
+        loop = asyncio.get_running_loop()
+        async with self._slots:
+            submitted = time.perf_counter()
+            with self._lock:
+                self._queued += 1
+                self._peak_queued = max(self._peak_queued, self._queued)
+
+            def task():
+                started = time.perf_counter()
+                with self._lock:
+                    self._queued -= 1
+                    self._running += 1
+                failed = False
+                try:
+                    return func(*args, **kwargs)
+                except BaseException:
+                    failed = True
+                    raise
+                finally:
+                    self._record(op, started - submitted, time.perf_counter() - started, failed)
+
+            return await loop.run_in_executor(self._pool, task)
+
+    async def session(self, user_id, work, op=None):
+        """
+        打开指定用户的数据库会话并在线程池中执行 work
+
+        work 接收 (db_user, db_economy, db_task, db_backpack, db_store) 五个参数，
+        其返回值即为本方法的返回值。会话结束后自动关闭数据库连接。
+        """
+        return await self.run(self.execute, user_id, work, op=op or getattr(work, "__name__", "session"))
+
+    def execute(self, user_id, work):
+        """同步版本的 session，只能在数据库线程中调用"""
+        try:
+            with self.open_databases(self.config, self.db_file, user_id) as databases:
+                return work(*databases)
+        finally:
+            if self.close_databases:
+                self.close_databases()
+
+    def _record(self, op, wait, elapsed, failed):
+        with self._lock:
+            self._running -= 1
+            stats = self._op_stats.setdefault(op, [0, 0, 0.0, 0.0, 0.0])
+            stats[0] += 1
+            if failed:
+                stats[1] += 1
+            stats[2] += wait
+            stats[3] += elapsed
+            stats[4] = max(stats[4], elapsed)
+
+    def stats(self):
+        """
+        获取线程池运行指标
+
+        返回:
+            一个字典，包含以下键：
+            - workers (int): 工作线程数
+            - queued (int): 当前排队等待的调用数
+            - running (int): 当前正在执行的调用数
+            - peak_queued (int): 历史最大排队深度
+            - ops (dict): 各操作的调用次数、失败次数、平均排队/执行耗时(ms)和最大执行耗时(ms)
+        """
+        with self._lock:
+            ops = {
+                op: {
+                    "count": count,
+                    "errors": errors,
+                    "avg_wait_ms": wait / count * 1000 if count else 0.0,
+                    "avg_ms": total / count * 1000 if count else 0.0,
+                    "max_ms": peak * 1000,
+                }
+                for op, (count, errors, wait, total, peak) in self._op_stats.items()
+            }
+            return {
+                "workers": self.max_workers,
+                "queued": self._queued,
+                "running": self._running,
+                "peak_queued": self._peak_queued,
+                "ops": ops,
+            }
+
+    def shutdown(self, wait=True):
+        """关闭线程池，wait=True 时等待已提交的调用全部完成"""
+        self._pool.shutdown(wait=wait)
@@ -0,0 +1,158 @@
+import itertools
+import threading
+from collections import OrderedDict
+
+# 全局递增的版本号，记录被清理后重建也不会与旧版本号重复
+_versions = itertools.count(1)
+
+
+class BackpackRecord:
+    __slots__ = ("items", "varieties", "total_teas", "total_value", "version")
+
+    def __init__(self):
+        self.items = {}  # 茶叶名称 -> [数量, 单价, 类型]
+        self.varieties = 0
+        self.total_teas = 0
+        self.total_value = 0.0
+        self.version = next(_versions)
+
+
+class BackpackAggregates:
+    def __init__(self, max_users=10000, listener=None, on_reset=None):
+        """
+        每个用户背包的聚合数据（种类数、总数量、总价值），随 add_item / remove_item 增量维护
+
+        未缓存的用户在首次读取时由背包表重建；超过 max_users 时清理最久未使用的用户。
+
+        参数:
+            max_users: 最多缓存的用户数
+            listener: 可选，用户聚合数据重建或变化后以 (用户ID, BackpackRecord) 调用
+            on_reset: 可选，rebuild_all 清空全部聚合数据时调用（无参数）
+        """
+        self.max_users = max_users
+        self.listener = listener
+        self.on_reset = on_reset
+        self._records = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        """获取用户的聚合数据，未缓存时返回 None"""
+        with self._lock:
+            record = self._records.get(user_id)
+            if record is not None:
+                self._records.move_to_end(user_id)
+            return record
+
+    def snapshot(self, user_id):
+        """
+        获取用户背包的一致快照，未缓存时返回 None
+
+        返回:
+            (版本号, [(茶叶名称, 数量, 单价, 类型), ...])
+        """
+        with self._lock:
+            record = self._records.get(user_id)
+            if record is None:
+                return None
+            self._records.move_to_end(user_id)
+            return record.version, [(name, entry[0], entry[1], entry[2]) for name, entry in record.items.items()]
+
+    def rebuild(self, user_id, rows):
+        """
+        由背包表记录重建用户的聚合数据
+
+        参数:
+            rows: query_backpack 返回的 (id, user_id, item_name, item_count, item_type, item_value) 列表
+        """
+        record = BackpackRecord()
+        for row in rows:
+            _, _, item_name, item_count, item_type, item_value = row
+            if item_count <= 0:
+                continue
+            entry = record.items.setdefault(item_name, [0, item_value, item_type])
+            entry[0] += item_count
+            record.total_teas += item_count
+            record.total_value += item_count * entry[1]
+        record.varieties = len(record.items)
+        with self._lock:
+            self._records[user_id] = record
+            self._records.move_to_end(user_id)
+            while len(self._records) > self.max_users:
+                self._records.popitem(last=False)
+        self._notify(user_id, record)
+        return record
+
+    def load(self, user_id, db_backpack):
+        """获取用户的聚合数据，未缓存时通过背包接口重建"""
+        record = self.get(user_id)
+        if record is None:
+            record = self.rebuild(user_id, db_backpack.query_backpack())
+        return record
+
+    def rebuild_all(self, rows):
+        """
+        由整张背包表重建所有用户的聚合数据
+
+        参数:
+            rows: 按用户分组前的背包表记录迭代器，格式同 rebuild
+        """
+        grouped = {}
+        for row in rows:
+            grouped.setdefault(row[1], []).append(row)
+        with self._lock:
+            self._records.clear()
+        if self.on_reset:
+            # 背包已清空的用户不会出现在 rows 中，由监听方丢弃其旧数据
+            self.on_reset()
+        for user_id, user_rows in grouped.items():
+            self.rebuild(user_id, user_rows)
+        return len(grouped)
+
+    def on_add(self, user_id, item_name, count, value, item_type):
+        """背包新增物品后更新聚合数据（已有同名物品时沿用原单价）"""
+        with self._lock:
+            record = self._records.get(user_id)
+            if record is None:
+                return
+            entry = record.items.get(item_name)
+            if entry is None:
+                entry = record.items[item_name] = [0, value, item_type]
+                record.varieties += 1
+            entry[0] += count
+            record.total_teas += count
+            record.total_value += count * entry[1]
+            record.version = next(_versions)
+        self._notify(user_id, record)
+
+    def on_remove(self, user_id, item_name, count):
+        """背包移除物品后更新聚合数据"""
+        with self._lock:
+            record = self._records.get(user_id)
+            if record is None:
+                return
+            entry = record.items.get(item_name)
+            if entry is None:
+                # 与存储不一致，丢弃缓存等待下次重建
+                del self._records[user_id]
+                return
+            count = min(count, entry[0])
+            entry[0] -= count
+            record.total_teas -= count
+            record.total_value -= count * entry[1]
+            if entry[0] <= 0:
+                del record.items[item_name]
+                record.varieties -= 1
+            record.version = next(_versions)
+        self._notify(user_id, record)
+
+    def _notify(self, user_id, record):
+        if self.listener:
+            self.listener(user_id, record)
+
+    def invalidate(self, user_id=None):
+        """丢弃指定用户（或全部用户）的聚合数据"""
+        with self._lock:
+            if user_id is None:
+                self._records.clear()
+            else:
+                self._records.pop(user_id, None)
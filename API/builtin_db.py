@@ -0,0 +1,392 @@
+import datetime
+import os
+import random
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from .task_engine import TASK_CLAIMED, TASK_COMPLETED
+
+# 按版本号顺序执行的结构迁移，当前版本记录在 PRAGMA user_version 中
+# 表结构与 sqlite_fastpath.SCHEMA 一致，内置存储下直连快速路径的全部功能都可用
+MIGRATIONS = (
+    # 1: 初始结构
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        user_id TEXT PRIMARY KEY,
+        sign_in_count INTEGER NOT NULL DEFAULT 0,
+        last_sign_in_date TEXT,
+        sign_in_coins REAL NOT NULL DEFAULT 0
+    );
+    CREATE TABLE IF NOT EXISTS economy (
+        user_id TEXT PRIMARY KEY,
+        economy REAL NOT NULL DEFAULT 0
+    );
+    CREATE TABLE IF NOT EXISTS tasks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL,
+        task_id TEXT NOT NULL,
+        task_name TEXT NOT NULL,
+        task_description TEXT NOT NULL DEFAULT '',
+        task_progress INTEGER NOT NULL DEFAULT 0,
+        task_target INTEGER NOT NULL,
+        reward INTEGER NOT NULL DEFAULT 0,
+        status TEXT NOT NULL DEFAULT '进行中',
+        task_type TEXT NOT NULL,
+        UNIQUE (user_id, task_id)
+    );
+    CREATE INDEX IF NOT EXISTS idx_tasks_type ON tasks (task_type);
+    CREATE TABLE IF NOT EXISTS backpack (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT NOT NULL,
+        item_name TEXT NOT NULL,
+        item_count INTEGER NOT NULL DEFAULT 0,
+        item_type TEXT NOT NULL DEFAULT '',
+        item_value REAL NOT NULL DEFAULT 0,
+        UNIQUE (user_id, item_name)
+    );
+    CREATE TABLE IF NOT EXISTS tea_store (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tea_name TEXT NOT NULL,
+        quantity INTEGER NOT NULL DEFAULT 0,
+        tea_type TEXT NOT NULL DEFAULT '',
+        price REAL NOT NULL DEFAULT 0,
+        description TEXT NOT NULL DEFAULT ''
+    );
+    """,
+)
+
+# 每日随机挑战：(名称, 描述, 目标, 奖励)
+DAILY_CHALLENGES = (
+    ("喝两杯茶", "喝两杯茶", 2, 40),
+    ("茶艺表演", "进行一次茶艺展示", 1, 30),
+    ("采购达人", "购买3份茶叶", 3, 45),
+    ("品鉴新茶", "品尝2种不同的茶叶", 2, 40),
+)
+
+
+def _today():
+    return datetime.datetime.now().strftime("%Y-%m-%d")
+
+
+class BuiltinStorage:
+    def __init__(self, db_file, timeout=5.0):
+        """
+        内置的 SQLite 存储，在数据库插件 astrbot_plugin_furry_cgsjk 不可用时提供相同的 get_databases 接口
+
+        使用 WAL 模式，每个线程一个长连接；SQL 语句固定，由连接的语句缓存复用预编译结果。
+
+        参数:
+            db_file: SQLite 数据库文件路径，目录不存在时自动创建
+            timeout: 等待数据库锁的超时时间（秒）
+        """
+        os.makedirs(os.path.dirname(db_file) or ".", exist_ok=True)
+        self.db_file = db_file
+        self.timeout = timeout
+        self.config = {}
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self.schema_version = self._migrate()
+
+    def connection(self):
+        """获取当前线程的数据库连接（每个线程一个连接，按需创建）"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=self.timeout, isolation_level=None,
+                                   check_same_thread=False, cached_statements=256)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute(f"PRAGMA busy_timeout = {int(self.timeout * 1000)}")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _migrate(self):
+        """执行尚未应用的结构迁移，返回当前结构版本"""
+        conn = self.connection()
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for target in range(version + 1, len(MIGRATIONS) + 1):
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for statement in MIGRATIONS[target - 1].split(";"):
+                    if statement.strip():
+                        conn.execute(statement)
+                conn.execute(f"PRAGMA user_version = {target}")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+            version = target
+        return version
+
+    @contextmanager
+    def get_databases(self, config, db_path, user_id):
+        """与数据库插件相同的接口：返回 (用户, 经济, 任务, 背包, 商店) 五个接口对象"""
+        conn = self.connection()
+        user_id = str(user_id)
+        yield (_UserDB(conn, user_id), _EconomyDB(conn, user_id), _TaskDB(conn, user_id),
+               _BackpackDB(conn, user_id), _StoreDB(conn))
+
+    def get_db_path(self):
+        """数据库文件路径"""
+        return self.db_file
+
+    def close(self):
+        """关闭所有线程创建的连接"""
+        with self._lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._connections.clear()
+        self._local = threading.local()
+
+
+class _UserDB:
+    def __init__(self, conn, user_id):
+        self.conn = conn
+        self.user_id = user_id
+
+    def _row(self):
+        return self.conn.execute(
+            "SELECT sign_in_count, last_sign_in_date, sign_in_coins FROM users WHERE user_id = ?", (self.user_id,)
+        ).fetchone()
+
+    def query_sign_in_count(self):
+        row = self._row()
+        return (row[0] if row else 0,)
+
+    def query_last_sign_in_date(self):
+        row = self._row()
+        return row[1] if row else None
+
+    def query_sign_in_coins(self):
+        row = self._row()
+        return row[2] if row else 0
+
+    def update_sign_in(self, coins):
+        self.conn.execute(
+            "INSERT INTO users (user_id, sign_in_count, last_sign_in_date, sign_in_coins) VALUES (?, 1, ?, ?) "
+            "ON CONFLICT(user_id) DO UPDATE SET sign_in_count = sign_in_count + 1, "
+            "last_sign_in_date = excluded.last_sign_in_date, sign_in_coins = excluded.sign_in_coins",
+            (self.user_id, _today(), coins),
+        )
+
+
+class _EconomyDB:
+    def __init__(self, conn, user_id):
+        self.conn = conn
+        self.user_id = user_id
+
+    def get_economy(self):
+        row = self.conn.execute("SELECT economy FROM economy WHERE user_id = ?", (self.user_id,)).fetchone()
+        return row[0] if row else 0.0
+
+    def add_economy(self, amount):
+        self.conn.execute(
+            "INSERT INTO economy (user_id, economy) VALUES (?, ?) "
+            "ON CONFLICT(user_id) DO UPDATE SET economy = economy + excluded.economy",
+            (self.user_id, amount),
+        )
+
+    def reduce_economy(self, amount):
+        self.add_economy(-amount)
+
+
+class _TaskDB:
+    def __init__(self, conn, user_id):
+        self.conn = conn
+        self.user_id = user_id
+
+    def get_user_tasks(self):
+        return self.conn.execute(
+            "SELECT id, user_id, task_id, task_name, task_description, task_progress, task_target, reward, status, task_type "
+            "FROM tasks WHERE user_id = ? ORDER BY id",
+            (self.user_id,),
+        ).fetchall()
+
+    def get_task_by_id(self, task_id):
+        return self.conn.execute(
+            "SELECT id, user_id, task_id, task_name, task_description, task_progress, task_target, reward, status, task_type "
+            "FROM tasks WHERE user_id = ? AND task_id = ?",
+            (self.user_id, task_id),
+        ).fetchone()
+
+    def create_task(self, task_id, task_name, task_description, task_target, reward, task_type):
+        self.conn.execute(
+            "INSERT OR IGNORE INTO tasks (user_id, task_id, task_name, task_description, task_target, reward, task_type) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (self.user_id, task_id, task_name, task_description, task_target, reward, task_type),
+        )
+
+    def update_daily_random_task(self):
+        """保证用户有且只有今天的随机挑战"""
+        task_id = f"daily_random_{datetime.datetime.now().strftime('%Y%m%d')}"
+        self.conn.execute(
+            "DELETE FROM tasks WHERE user_id = ? AND task_id LIKE 'daily_random_%' AND task_id != ?",
+            (self.user_id, task_id),
+        )
+        name, description, target, reward = random.choice(DAILY_CHALLENGES)
+        self.create_task(task_id, f"今日挑战: {name}", description, target, reward, '每日任务')
+
+    def update_task_progress(self, task_id, progress):
+        self.conn.execute(
+            "UPDATE tasks SET task_progress = ? WHERE user_id = ? AND task_id = ?", (progress, self.user_id, task_id)
+        )
+
+    def complete_task(self, task_id):
+        self.conn.execute(
+            "UPDATE tasks SET status = ? WHERE user_id = ? AND task_id = ? AND status != ?",
+            (TASK_COMPLETED, self.user_id, task_id, TASK_CLAIMED),
+        )
+
+    def claim_reward(self, task_id):
+        cursor = self.conn.execute(
+            "UPDATE tasks SET status = ? WHERE user_id = ? AND task_id = ? AND status = ?",
+            (TASK_CLAIMED, self.user_id, task_id, TASK_COMPLETED),
+        )
+        return cursor.rowcount > 0
+
+
+class _BackpackDB:
+    def __init__(self, conn, user_id):
+        self.conn = conn
+        self.user_id = user_id
+
+    def query_backpack(self):
+        return self.conn.execute(
+            "SELECT id, user_id, item_name, item_count, item_type, item_value FROM backpack "
+            "WHERE user_id = ? AND item_count > 0 ORDER BY id",
+            (self.user_id,),
+        ).fetchall()
+
+    def add_item(self, item_name, item_count, item_type, item_value):
+        self.conn.execute(
+            "INSERT INTO backpack (user_id, item_name, item_count, item_type, item_value) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(user_id, item_name) DO UPDATE SET item_count = item_count + excluded.item_count",
+            (self.user_id, item_name, item_count, item_type, item_value),
+        )
+
+    def remove_item(self, item_name, item_count):
+        cursor = self.conn.execute(
+            "UPDATE backpack SET item_count = item_count - ? WHERE user_id = ? AND item_name = ? AND item_count >= ?",
+            (item_count, self.user_id, item_name, item_count),
+        )
+        if cursor.rowcount == 0:
+            return False
+        self.conn.execute(
+            "DELETE FROM backpack WHERE user_id = ? AND item_name = ? AND item_count <= 0", (self.user_id, item_name)
+        )
+        return True
+
+
+class _StoreDB:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def get_all_tea_store(self):
+        return self.conn.execute(
+            "SELECT id, tea_name, quantity, tea_type, price, description FROM tea_store ORDER BY id"
+        ).fetchall()
+
+    def get_all_tea_store_with_continuous_id(self):
+        return [(index,) + tuple(row[1:]) for index, row in enumerate(self.get_all_tea_store(), start=1)]
+
+    def get_actual_id_by_continuous_id(self, continuous_id):
+        if continuous_id <= 0:
+            return None
+        row = self.conn.execute(
+            "SELECT id FROM tea_store ORDER BY id LIMIT 1 OFFSET ?", (continuous_id - 1,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def get_tea_store_item(self, tea_id):
+        return self.conn.execute(
+            "SELECT id, tea_name, quantity, tea_type, price, description FROM tea_store WHERE id = ?", (tea_id,)
+        ).fetchone()
+
+    def update_tea_quantity(self, tea_id, delta):
+        self.conn.execute("UPDATE tea_store SET quantity = quantity + ? WHERE id = ?", (delta, tea_id))
+
+    def add_tea_to_store(self, tea_name, quantity, tea_type, price, description):
+        cursor = self.conn.execute(
+            "INSERT INTO tea_store (tea_name, quantity, tea_type, price, description) VALUES (?, ?, ?, ?, ?)",
+            (tea_name, quantity, tea_type, price, description),
+        )
+        return cursor.lastrowid
+
+    def remove_tea_from_store(self, tea_id):
+        self.conn.execute("DELETE FROM tea_store WHERE id = ?", (tea_id,))
+
+    def restock_tea(self, tea_id, quantity):
+        self.update_tea_quantity(tea_id, quantity)
+        return self.get_tea_store_item(tea_id)
+
+
+def benchmark(get_databases, db_path, users=200, rounds=5):
+    """
+    对一个 get_databases 实现执行典型命令序列（签到、查余额、购买、查背包、查任务），返回每秒会话数
+    """
+    import time
+
+    with get_databases({}, db_path, "admin") as (_, _, _, _, db_store):
+        if not db_store.get_all_tea_store():
+            db_store.add_tea_to_store("龙井", 10 ** 9, "绿茶", 1, "基准测试")
+    sessions = 0
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for user in range(users):
+            with get_databases({}, db_path, str(user)) as (db_user, db_economy, db_task, db_backpack, db_store):
+                db_user.query_sign_in_count()
+                db_user.update_sign_in(10)
+                db_economy.add_economy(10)
+            with get_databases({}, db_path, str(user)) as (db_user, db_economy, db_task, db_backpack, db_store):
+                tea_id = db_store.get_actual_id_by_continuous_id(1)
+                db_store.get_tea_store_item(tea_id)
+                db_economy.reduce_economy(1)
+                db_backpack.add_item("龙井", 1, "绿茶", 1)
+                db_store.update_tea_quantity(tea_id, -1)
+            with get_databases({}, db_path, str(user)) as (db_user, db_economy, db_task, db_backpack, db_store):
+                db_economy.get_economy()
+                db_backpack.query_backpack()
+                db_task.get_user_tasks()
+            sessions += 3
+    return sessions / (time.perf_counter() - start)
+
+
+def _load_database_plugin():
+    """
+    尝试在 AstrBot 环境中加载数据库插件 astrbot_plugin_furry_cgsjk，返回 (get_databases, 数据库路径)
+
+    需要在 AstrBot 根目录下运行，且插件已安装在 data/plugins 中；加载失败时抛出异常。
+    """
+    import importlib
+
+    module = importlib.import_module("data.plugins.astrbot_plugin_furry_cgsjk.main")
+    for value in vars(module).values():
+        if isinstance(value, type) and hasattr(value, "get_databases") and hasattr(value, "get_db_path"):
+            plugin = value(None)
+            return plugin.get_databases, plugin.get_db_path()
+    raise ImportError("数据库插件中没有提供 get_databases 的插件类")
+
+
+if __name__ == "__main__":
+    # 基准测试：内置存储的典型命令序列吞吐；在 AstrBot 环境中运行时同时测试数据库插件，否则只输出内置存储的结果
+    import tempfile
+
+    workdir = tempfile.mkdtemp()
+    users, rounds = 50, 2
+    storage = BuiltinStorage(os.path.join(workdir, "builtin.db"))
+    print(f"内置存储: {benchmark(storage.get_databases, storage.db_file, users, rounds):.0f} 会话/秒")
+    storage.close()
+
+    try:
+        plugin_get_databases, plugin_db_path = _load_database_plugin()
+    except Exception as e:
+        print(f"未与数据库插件对比（无法加载 astrbot_plugin_furry_cgsjk: {e}）")
+    else:
+        # 注意：会向数据库插件的数据库写入基准测试用户与商品，请使用测试环境
+        print(f"数据库插件: {benchmark(plugin_get_databases, plugin_db_path, users, rounds):.0f} 会话/秒")
@@ -0,0 +1,89 @@
+MINUTES_PER_DAY = 1440
+
+# 默认营业时段（虚拟时间）：早茶 1.2 倍，下午茶 1.5 倍，其余时间打烊不加成
+DEFAULT_WINDOWS = [
+    {"name": "早茶", "start": "08:00", "end": "15:00", "multiplier": 1.2},
+    {"name": "下午茶", "start": "15:00", "end": "22:00", "multiplier": 1.5},
+]
+
+
+class BusinessPeriod:
+    __slots__ = ("name", "multiplier", "is_open")
+
+    def __init__(self, name, multiplier=1.0, is_open=True):
+        """
+        茶馆的一个营业时段
+
+        参数:
+            name: 时段名称
+            multiplier: 该时段购买价格与奖励的倍率
+            is_open: 是否为营业时段（打烊时段为 False）
+        """
+        self.name = name
+        self.multiplier = multiplier
+        self.is_open = is_open
+
+    def describe(self):
+        """时段说明，如“下午茶（价格与奖励 ×1.5）”"""
+        if not self.is_open:
+            return f"{self.name}（无加成）"
+        return f"{self.name}（价格与奖励 ×{self.multiplier:g}）"
+
+
+def _parse_minute(text):
+    """把 "HH:MM" 转换为当天的第几分钟，"24:00" 表示一天结束"""
+    try:
+        hour, minute = (int(part) for part in str(text).split(":"))
+    except ValueError:
+        raise ValueError(f"时间格式应为 HH:MM: {text}")
+    if not (0 <= hour <= 24 and 0 <= minute < 60) or (hour == 24 and minute):
+        raise ValueError(f"时间超出范围: {text}")
+    return hour * 60 + minute
+
+
+class BusinessHours:
+    def __init__(self, clock, windows=DEFAULT_WINDOWS, closed_name="打烊"):
+        """
+        虚拟营业时段倍率表
+
+        初始化时为一周中的每一天预先生成按分钟索引的时段表，查询当前倍率只需由虚拟时间算出
+        星期与当天分钟数后取表，不做任何时间比较。时段可以跨越午夜（结束早于开始），
+        重叠时排在后面的时段优先。
+
+        参数:
+            clock: VirtualClock
+            windows: 时段列表，每项包含 name、start、end（"HH:MM"，开始与结束不能相同）、multiplier，
+                     可选 weekdays（0 为星期一）限定生效的星期；格式无效时抛出 ValueError
+            closed_name: 不在任何时段内时的名称
+        """
+        self.clock = clock
+        if not isinstance(windows, (list, tuple)):
+            raise ValueError("营业时段配置应为列表")
+        closed = BusinessPeriod(closed_name, 1.0, is_open=False)
+        self._tables = [[closed] * MINUTES_PER_DAY for _ in range(7)]
+        for index, window in enumerate(windows, start=1):
+            try:
+                period = BusinessPeriod(str(window["name"]), float(window["multiplier"]))
+                start, end = _parse_minute(window["start"]), _parse_minute(window["end"])
+                weekdays = [int(day) % 7 for day in window.get("weekdays", range(7))]
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError(f"第 {index} 个营业时段配置无效: {e}")
+            if period.multiplier <= 0:
+                raise ValueError(f"第 {index} 个营业时段的倍率必须大于 0")
+            if start == end:
+                # 开始与结束相同多半是笔误，不视为全天营业（全天营业请使用 00:00-24:00）
+                raise ValueError(f"第 {index} 个营业时段的开始与结束时间相同")
+            minutes = range(start, end) if start < end else [*range(start, MINUTES_PER_DAY), *range(0, end)]
+            for weekday in weekdays:
+                table = self._tables[weekday]
+                for minute in minutes:
+                    table[minute] = period
+
+    def at(self, virtual_seconds):
+        """虚拟时间（距 1970-01-01 的秒数）所在的时段"""
+        day, second = divmod(int(virtual_seconds), 86400)
+        return self._tables[(day + 3) % 7][second // 60]  # 1970-01-01 是星期四
+
+    def current(self):
+        """当前虚拟时间所在的时段"""
+        return self.at(self.clock.virtual_seconds())
@@ -0,0 +1,213 @@
+import csv
+import io
+import itertools
+import json
+import math
+import threading
+
+# 全局递增的版本号，每次商品目录变化（上下架、库存变化）后更新
+_versions = itertools.count(1)
+
+# 导入时接受的字段名（含中文表头） -> 标准字段名
+FIELD_ALIASES = {
+    "tea_name": "tea_name", "name": "tea_name", "茶叶名称": "tea_name", "名称": "tea_name",
+    "quantity": "quantity", "stock": "quantity", "库存": "quantity", "数量": "quantity",
+    "tea_type": "tea_type", "type": "tea_type", "类型": "tea_type",
+    "price": "price", "价格": "price",
+    "description": "description", "desc": "description", "描述": "description",
+}
+FIELDS = ("tea_name", "quantity", "tea_type", "price", "description")
+
+
+class CatalogueIndex:
+    def __init__(self):
+        """
+        商店商品目录的内存索引：按实际ID排序的商品列表与 显示ID -> 实际ID 的映射
+
+        上下架与批量导入后整体重建一次；购买、补货只更新对应商品的库存。
+        未加载时返回 None，由调用方从数据库读取后重建。
+        """
+        self._rows = None  # [[实际ID, 名称, 库存, 类型, 价格, 描述], ...]，按实际ID排序
+        self._positions = {}  # 实际ID -> 在 _rows 中的下标
+        self._lock = threading.Lock()
+        self.version = next(_versions)
+        self.rebuilds = 0
+
+    @property
+    def loaded(self):
+        return self._rows is not None
+
+    def rebuild(self, rows):
+        """
+        由 get_all_tea_store 返回的 (id, tea_name, quantity, tea_type, price, description) 记录重建索引，
+        返回连续ID形式的商品列表
+        """
+        ordered = sorted((list(row) for row in rows), key=lambda row: row[0])
+        with self._lock:
+            self._rows = ordered
+            self._positions = {row[0]: index for index, row in enumerate(ordered)}
+            self.version = next(_versions)
+            self.rebuilds += 1
+            return self._listing()
+
+    def _listing(self):
+        return [(index,) + tuple(row[1:]) for index, row in enumerate(self._rows, start=1)]
+
+    def listing(self):
+        """连续ID形式的商品列表 [(显示ID, 名称, 库存, 类型, 价格, 描述), ...]，未加载时返回 None"""
+        with self._lock:
+            if self._rows is None:
+                return None
+            return self._listing()
+
+    def page(self, offset, limit):
+        """连续ID形式的一页商品，返回 (记录列表, 商品总数, 版本号)，未加载时返回 None"""
+        with self._lock:
+            if self._rows is None:
+                return None
+            rows = self._rows[offset:offset + limit]
+            return ([(index,) + tuple(row[1:]) for index, row in enumerate(rows, start=offset + 1)],
+                    len(self._rows), self.version)
+
+    def actual_id(self, display_id):
+        """显示ID对应的实际ID，未加载或不存在时返回 None"""
+        with self._lock:
+            if self._rows is None or not 0 < display_id <= len(self._rows):
+                return None
+            return self._rows[display_id - 1][0]
+
+    def update_stock(self, tea_id, quantity):
+        """更新某个商品的库存"""
+        with self._lock:
+            index = self._positions.get(tea_id)
+            if index is not None and self._rows[index][2] != quantity:
+                self._rows[index][2] = quantity
+                self.version = next(_versions)
+
+    def invalidate(self):
+        """丢弃索引，下次访问时重建"""
+        with self._lock:
+            self._rows = None
+            self._positions = {}
+            self.version = next(_versions)
+
+
+class CatalogueImportError(ValueError):
+    """批量导入的数据无法解析或校验失败，errors 为逐条的错误说明"""
+
+    def __init__(self, errors):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+def parse_catalogue(text, fmt=None):
+    """
+    解析批量导入的商品数据
+
+    参数:
+        text: JSON 数组（或 {"teas": [...]}）、JSONL（每行一个对象）或 CSV（可带表头）文本
+        fmt: json / jsonl / csv，为空时自动识别
+
+    返回:
+        原始记录字典列表
+    """
+    text = text.strip().lstrip("﻿")
+    if not text:
+        raise CatalogueImportError(["导入内容为空"])
+    if fmt is None:
+        if text.startswith("["):
+            fmt = "json"
+        elif text.startswith("{"):
+            fmt = "jsonl" if "\n" in text and text.splitlines()[0].rstrip().endswith("}") else "json"
+        else:
+            fmt = "csv"
+
+    if fmt == "json":
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise CatalogueImportError([f"JSON 解析失败: {e}"])
+        if isinstance(data, dict):
+            data = data.get("teas", [data])
+        if not isinstance(data, list):
+            raise CatalogueImportError(["JSON 内容应为商品数组"])
+        return data
+    if fmt == "jsonl":
+        records = []
+        errors = []
+        for line_no, line in enumerate(text.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                errors.append(f"第 {line_no} 行 JSON 解析失败: {e}")
+        if errors:
+            raise CatalogueImportError(errors)
+        return records
+    if fmt == "csv":
+        rows = [row for row in csv.reader(io.StringIO(text)) if any(cell.strip() for cell in row)]
+        if rows and rows[0] and rows[0][0].strip() in FIELD_ALIASES:
+            header = [cell.strip() for cell in rows[0]]
+            rows = rows[1:]
+        else:
+            header = list(FIELDS)
+        # 多出的列不能直接丢弃（如描述中未加引号的逗号会截断描述）
+        errors = [f"第 {index} 条: 列数 {len(row)} 多于 {len(header)} 列，包含逗号的内容请加引号"
+                  for index, row in enumerate(rows, start=1) if len(row) > len(header)]
+        if errors:
+            raise CatalogueImportError(errors)
+        return [dict(zip(header, row)) for row in rows]
+    raise CatalogueImportError([f"不支持的格式: {fmt}"])
+
+
+def validate_catalogue(records):
+    """
+    校验并规范化全部记录，任何一条不合法都会抛出 CatalogueImportError（包含所有错误）
+
+    返回:
+        [(tea_name, quantity, tea_type, price, description), ...]
+    """
+    teas = []
+    errors = []
+    seen = set()
+    for index, record in enumerate(records, start=1):
+        if not isinstance(record, dict):
+            errors.append(f"第 {index} 条: 应为对象")
+            continue
+        fields = {}
+        for key, value in record.items():
+            field = FIELD_ALIASES.get(str(key).strip())
+            if field:
+                fields[field] = value.strip() if isinstance(value, str) else value
+        tea_name = str(fields.get("tea_name") or "").strip()
+        tea_type = str(fields.get("tea_type") or "").strip()
+        description = str(fields.get("description") or "").strip()
+        if not tea_name:
+            errors.append(f"第 {index} 条: 缺少茶叶名称")
+        elif tea_name in seen:
+            errors.append(f"第 {index} 条: 茶叶名称 {tea_name} 重复")
+        if not tea_type:
+            errors.append(f"第 {index} 条: 缺少类型")
+        try:
+            quantity = int(fields.get("quantity"))
+            if quantity < 0:
+                raise ValueError
+        except (TypeError, ValueError):
+            errors.append(f"第 {index} 条: 库存必须是非负整数")
+            quantity = None
+        try:
+            price = float(fields.get("price"))
+            # nan、inf 等非有限值会破坏后续的金额计算
+            if not math.isfinite(price) or price < 0:
+                raise ValueError
+        except (TypeError, ValueError):
+            errors.append(f"第 {index} 条: 价格必须是非负数字")
+            price = None
+        seen.add(tea_name)
+        teas.append((tea_name, quantity, tea_type, price, description))
+    if not teas and not errors:
+        errors.append("没有可导入的商品")
+    if errors:
+        raise CatalogueImportError(errors)
+    return teas
@@ -0,0 +1,326 @@
+# 命令前的唤醒词，命令可以带唤醒词（雪泷购买）也可以不带（购买）
+WAKE_WORDS = ("雪泷",)
+
+_INVALID = object()
+
+
+class Arg:
+    __slots__ = ("name", "type", "label", "greedy", "rest", "optional", "default")
+
+    def __init__(self, name, type=str, label=None, greedy=False, rest=False, optional=False, default=None):
+        """
+        命令参数声明
+
+        参数:
+            name: 参数名
+            type: int / float / str
+            label: 用户可能写在参数前的标签（如“库存50”中的“库存”），解析时去掉
+            greedy: 可以由多个词组成，取能使后续参数全部解析成功的最短组合
+            rest: 取剩余全部文本（保留原有空白），只能是最后一个参数
+            optional: 可省略，省略时取 default
+        """
+        self.name = name
+        self.type = type
+        self.label = label
+        self.greedy = greedy
+        self.rest = rest
+        self.optional = optional
+        self.default = default
+
+    def convert(self, text):
+        if self.label and text.startswith(self.label):
+            text = text[len(self.label):].strip()
+        if self.type is str:
+            return text if text else _INVALID
+        try:
+            return self.type(text)
+        except ValueError:
+            return _INVALID
+
+
+class CommandSchema:
+    __slots__ = ("name", "args", "usage", "invalid", "required", "simple")
+
+    def __init__(self, name, args=(), usage="", invalid="参数错误"):
+        """
+        命令的参数模式
+
+        参数:
+            name: 命令名（不含唤醒词）
+            args: Arg 列表
+            usage: 用法说明，参数不足时提示
+            invalid: 参数类型错误时的提示
+        """
+        self.name = name
+        self.args = tuple(args)
+        self.usage = usage
+        self.invalid = invalid
+        self.required = sum(1 for arg in self.args if not arg.optional)
+        # 没有多词参数时按位置一次转换，无需回溯
+        self.simple = not any(arg.greedy for arg in self.args)
+
+
+class CommandArgumentError(ValueError):
+    """命令参数不足或类型错误，str(e) 即为给用户的提示"""
+
+
+class ParsedCommand:
+    __slots__ = ("command", "text", "values")
+
+    def __init__(self, command, text, values):
+        self.command = command
+        self.text = text  # 去掉命令前缀后的原始参数文本
+        self.values = values
+
+    def __getitem__(self, name):
+        return self.values[name]
+
+    def get(self, name, default=None):
+        return self.values.get(name, default)
+
+    @property
+    def empty(self):
+        return not self.text
+
+
+# 插件各命令的参数模式
+COMMANDS = (
+    CommandSchema("商店", [Arg("page", int, optional=True, default=1)],
+                  usage="雪泷商店 <页码>", invalid="参数错误，页码必须是数字"),
+    CommandSchema("背包", [Arg("page", int, optional=True, default=1)],
+                  usage="雪泷背包 <页码>", invalid="参数错误，页码必须是数字"),
+    CommandSchema("商店图", [Arg("page", int, optional=True, default=1)],
+                  usage="雪泷商店图 <页码>", invalid="参数错误，页码必须是数字"),
+    CommandSchema("背包图", [Arg("page", int, optional=True, default=1)],
+                  usage="雪泷背包图 <页码>", invalid="参数错误，页码必须是数字"),
+    CommandSchema("任务列表", [Arg("page", int, optional=True, default=1)],
+                  usage="雪泷任务列表 <页码>", invalid="参数错误，页码必须是数字"),
+    CommandSchema("购买", [Arg("tea_id", int, optional=True), Arg("quantity", int, optional=True)],
+                  usage="雪泷购买 <商品ID> <数量>", invalid="参数错误，商品ID和数量必须是数字"),
+    CommandSchema("喝茶", [Arg("tea_name", rest=True)], usage="雪泷喝茶 <茶叶名称>"),
+    CommandSchema("领取奖励", [Arg("task_name", rest=True)], usage="雪泷领取奖励 <任务名称>"),
+    CommandSchema("上架", [
+        Arg("tea_name", label="茶叶名称", greedy=True),
+        Arg("quantity", int, label="库存"),
+        Arg("tea_type", label="类型"),
+        Arg("price", float, label="价格"),
+        Arg("description", label="描述", rest=True),
+    ], usage="雪泷上架 <茶叶名称> <库存> <类型> <价格> <描述>", invalid="参数错误，库存必须是整数，价格必须是数字"),
+    CommandSchema("批量上架", [Arg("payload", rest=True, optional=True, default="")], usage="雪泷批量上架 <商品数据>"),
+    CommandSchema("下架", [Arg("tea_id", int)], usage="雪泷下架 <商品ID>", invalid="参数错误，商品ID必须是数字"),
+    CommandSchema("补货", [Arg("tea_id", int), Arg("quantity", int)],
+                  usage="雪泷补货 <商品ID> <补货数量>", invalid="参数错误，商品ID和补货数量必须是数字"),
+    CommandSchema("限时抢购", [Arg("tea_id", int, optional=True)],
+                  usage="雪泷限时抢购 <商品ID>", invalid="参数错误，商品ID必须是数字"),
+    CommandSchema("导入数据", [Arg("file_name", optional=True)], usage="雪泷导入数据 <文件名>"),
+)
+
+
+class CommandParser:
+    def __init__(self, schemas=COMMANDS, wake_words=WAKE_WORDS):
+        """
+        预编译的命令参数解析器
+
+        初始化时为每个命令生成带/不带唤醒词的全部别名，组成 别名 -> 命令 的前缀表；
+        每条消息只拼接一次文本、查一次前缀表、分词一次，再按命令的参数模式转换类型。
+        """
+        self.schemas = {schema.name: schema for schema in schemas}
+        self.wake_words = tuple(wake_words)
+        self._aliases = {}
+        for schema in schemas:
+            self._aliases[schema.name] = schema
+            for wake_word in wake_words:
+                self._aliases[wake_word + schema.name] = schema
+        # 从长到短匹配，"雪泷批量上架" 不会被当成 "雪泷" + "批量上架" 以外的命令
+        self._lengths = sorted({len(alias) for alias in self._aliases}, reverse=True)
+
+    @staticmethod
+    def message_text(event):
+        """拼接消息中的全部文本段"""
+        message = event.message_obj.message
+        if isinstance(message, list):
+            return "".join(segment.text for segment in message if getattr(segment, "type", None) == "Plain")
+        return str(message)
+
+    def split(self, text):
+        """从消息文本开头识别命令，返回 (命令模式, 参数文本)，未识别时返回 (None, text)"""
+        text = text.lstrip()
+        for length in self._lengths:
+            schema = self._aliases.get(text[:length])
+            if schema is not None:
+                return schema, text[length:].strip()
+        return None, text.strip()
+
+    def arguments(self, event, command):
+        """
+        消息中命令之后的参数文本，连续空白合并为一个空格，用于判断两条命令是否相同
+
+        参数:
+            command: 命令名（不含唤醒词），不要求在 COMMANDS 中声明
+        """
+        text = " ".join(self.message_text(event).split())
+        for prefix in [wake_word + command for wake_word in self.wake_words] + [command]:
+            if text.startswith(prefix):
+                return text[len(prefix):].lstrip()
+        return text
+
+    def usage(self, command):
+        """参数不足时给用户的提示"""
+        return f"参数不足，请使用 {self.schemas[command].usage}"
+
+    def parse(self, event, command, args=()):
+        """
+        解析一条命令消息
+
+        参数:
+            event: 消息事件
+            command: 处理该消息的命令名
+            args: 框架传入的参数，消息文本无法识别命令时作为备选
+
+        返回:
+            ParsedCommand，参数不足或类型错误时抛出 CommandArgumentError
+        """
+        schema = self.schemas[command]
+        matched, text = self.split(self.message_text(event))
+        if matched is not schema:
+            # 消息文本中找不到该命令（如经过框架改写），改用框架传入的参数
+            text = " ".join(str(arg) for arg in args).strip()
+        return ParsedCommand(command, text, self.bind(schema, text))
+
+    def bind(self, schema, text):
+        """按参数模式把参数文本转换为 {参数名: 值}"""
+        words = text.split()
+        if len(words) < schema.required:
+            raise CommandArgumentError(self.usage(schema.name))
+        values = {}
+        if schema.simple:
+            for position, arg in enumerate(schema.args):
+                if position >= len(words):
+                    values[arg.name] = arg.default
+                    continue
+                value = arg.convert(self._remainder(text, position) if arg.rest else words[position])
+                if value is _INVALID:
+                    raise CommandArgumentError(schema.invalid)
+                values[arg.name] = value
+            return values
+        if not self._match(schema.args, 0, words, 0, text, values):
+            raise CommandArgumentError(schema.invalid)
+        return values
+
+    def _match(self, args, index, words, position, text, values):
+        if index == len(args):
+            return True  # 多余的参数忽略
+        arg = args[index]
+        if position == len(words):
+            if not arg.optional:
+                return False
+            values[arg.name] = arg.default
+            return self._match(args, index + 1, words, position, text, values)
+        if arg.rest:
+            value = arg.convert(self._remainder(text, position))
+            if value is _INVALID:
+                return False
+            values[arg.name] = value
+            return True
+        spans = range(1, len(words) - position + 1) if arg.greedy else (1,)
+        for span in spans:
+            value = arg.convert(" ".join(words[position:position + span]) if span > 1 else words[position])
+            if value is _INVALID:
+                continue
+            values[arg.name] = value
+            if self._match(args, index + 1, words, position + span, text, values):
+                return True
+        return False
+
+    @staticmethod
+    def _remainder(text, position):
+        """跳过前 position 个词后的剩余原始文本（保留换行等空白）"""
+        if position == 0:
+            return text.strip()
+        rest = text.split(None, position)
+        return rest[position].strip() if len(rest) > position else ""
+
+
+if __name__ == "__main__":
+    # 微基准：对比各命令原有的逐条解析方式与预编译解析器的单条消息解析耗时
+    import logging
+    import timeit
+
+    # 原有解析代码每条消息输出的调试日志（INFO 级别，输出到空处理器）
+    legacy_logger = logging.getLogger("teahouse.legacy_parse")
+    legacy_logger.setLevel(logging.INFO)
+    legacy_logger.addHandler(logging.NullHandler())
+    legacy_logger.propagate = False
+
+    class Plain:
+        type = "Plain"
+
+        def __init__(self, text):
+            self.text = text
+
+    class Event:
+        def __init__(self, text):
+            class MessageObj:
+                message = [Plain(text)]
+            self.message_obj = MessageObj()
+
+        def __repr__(self):
+            return f"Event({self.message_obj.message[0].text!r})"
+
+    def legacy_add_tea(event, args):
+        legacy_logger.info(f"上架命令接收到参数: {args}, 参数数量: {len(args)}")
+        legacy_logger.info(f"完整消息内容: {event.message_obj.message}")
+        message_text = ""
+        for item in event.message_obj.message:
+            message_text += item.text if hasattr(item, "text") else str(item)
+        message = message_text
+        if message.startswith("雪泷上架"):
+            message = message[4:].strip()
+        elif message.startswith("上架"):
+            message = message[2:].strip()
+        parts = message.split()
+        tea_name, quantity_str, tea_type, price_str = parts[0], parts[1], parts[2], parts[3]
+        description = " ".join(parts[4:])
+        potential_name_parts = [parts[0]]
+        name_endings = ["茶", "清茶", "绿茶", "红茶", "乌龙茶", "白茶", "黑茶", "花茶", "奶茶"]
+        i = 1
+        while i < len(parts) - 3:
+            potential_name_parts.append(parts[i])
+            potential_name = " ".join(potential_name_parts)
+            if any(potential_name.endswith(ending) for ending in name_endings):
+                tea_name = potential_name
+                remaining_parts = parts[i + 1:]
+                if len(remaining_parts) >= 4:
+                    quantity_str, tea_type, price_str = remaining_parts[0], remaining_parts[1], remaining_parts[2]
+                    description = " ".join(remaining_parts[3:])
+                break
+            i += 1
+        for label in ("茶叶名称",):
+            if tea_name.startswith(label):
+                tea_name = tea_name[len(label):]
+        return tea_name, int(quantity_str), tea_type, float(price_str), description
+
+    def legacy_buy(event, args):
+        legacy_logger.info(f"购买命令接收到参数: {args}, 参数数量: {len(args)}")
+        plain_texts = [seg.text for seg in event.message_obj.message if hasattr(seg, "type") and seg.type == "Plain"]
+        full_text = "".join(plain_texts)
+        if full_text.startswith("雪泷购买"):
+            params = full_text[len("雪泷购买"):].strip().split()
+        elif full_text.startswith("购买"):
+            params = full_text[2:].strip().split()
+        else:
+            params = list(args)
+        legacy_logger.info(f"解析后的参数: {params}")
+        return int(params[0]), int(params[1])
+
+    parser = CommandParser()
+    cases = [
+        ("购买", "雪泷购买 3 2", legacy_buy),
+        ("上架", "雪泷上架 正山 小种 红茶 50 红茶 28.5 桐木关 烟熏 香气", legacy_add_tea),
+    ]
+    rounds = 100000
+    for command, text, legacy in cases:
+        event, args = Event(text), tuple(text.split()[1:])
+        legacy_us = timeit.timeit(lambda: legacy(event, args), number=rounds) / rounds * 1e6
+        parser_us = timeit.timeit(lambda: parser.parse(event, command), number=rounds) / rounds * 1e6
+        print(f"{command}: 原解析 {legacy_us:.2f}µs/条，预编译解析器 {parser_us:.2f}µs/条 -> {parser.parse(event, command).values}")
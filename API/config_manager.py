@@ -0,0 +1,142 @@
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger("astrbot")
+
+
+class ConfigSnapshot:
+    __slots__ = ("version", "value", "raw")
+
+    def __init__(self, version, value, raw):
+        """
+        某个配置文件在某一时刻的不可变快照
+
+        参数:
+            version: 版本号，内容变化并通过校验后递增
+            value: 编译/校验后的配置对象
+            raw: 文件中的原始 JSON 数据，用于判断内容是否真的变化
+        """
+        self.version = version
+        self.value = value
+        self.raw = raw
+
+
+class _WatchedFile:
+    __slots__ = ("path", "parse", "snapshot", "mtime", "reloads", "failures", "last_error")
+
+    def __init__(self, path, parse, snapshot):
+        self.path = path
+        self.parse = parse
+        self.snapshot = snapshot
+        self.mtime = None
+        self.reloads = 0
+        self.failures = 0
+        self.last_error = ""
+
+
+class ConfigManager:
+    def __init__(self, check_interval=1.0, clock=time.monotonic):
+        """
+        按文件修改时间热加载的 JSON 配置管理器
+
+        每个配置文件注册一个解析函数，把 JSON 数据校验并转换为不可变的配置对象（如管理员集合为 frozenset）。
+        读取配置时最多每 check_interval 秒检查一次全部文件的修改时间，变化后重新解析，
+        通过校验才整体替换快照；校验失败时记录错误并继续使用之前的快照。
+        内容没有实际变化（只改了修改时间）时版本号不变，依赖版本号的缓存不会失效。
+
+        参数:
+            check_interval: 两次检查文件修改时间的最短间隔（秒）
+            clock: 返回单调递增秒数的时钟
+        """
+        self.check_interval = check_interval
+        self.clock = clock
+        self._files = {}
+        self._lock = threading.Lock()
+        self._checked = clock()
+
+    def watch(self, name, path, parse, default):
+        """
+        注册一个配置文件并立即加载；文件不存在时以默认配置创建
+
+        参数:
+            name: 配置名
+            path: JSON 文件路径
+            parse: 接收 JSON 数据、返回配置对象的函数，数据无效时抛出异常（通常为 ValueError）
+            default: 默认的 JSON 数据，文件缺失或首次加载失败时使用
+        """
+        if not os.path.exists(path):
+            try:
+                with open(path, "w", encoding="utf-8") as f:
+                    json.dump(default, f, ensure_ascii=False, indent=2)
+            except OSError as e:
+                logger.error(f"创建默认配置文件 {os.path.basename(path)} 失败: {e}")
+        entry = _WatchedFile(path, parse, ConfigSnapshot(0, parse(default), default))
+        self._files[name] = entry
+        self._reload(name, entry, initial=True)
+        return entry.snapshot.value
+
+    def current(self, name):
+        """获取配置的当前快照（版本号与配置对象一起读取，二者总是对应）"""
+        self.poll()
+        return self._files[name].snapshot
+
+    def get(self, name):
+        """获取配置的当前配置对象"""
+        return self.current(name).value
+
+    def poll(self, force=False):
+        """距上次检查超过 check_interval 秒（或 force 为 True）时检查全部文件，返回重新加载的配置名"""
+        now = self.clock()
+        if not force and now - self._checked < self.check_interval:
+            return []
+        with self._lock:
+            self._checked = now
+            return [name for name, entry in self._files.items() if self._reload(name, entry)]
+
+    def _reload(self, name, entry, initial=False):
+        try:
+            mtime = os.stat(entry.path).st_mtime_ns
+        except OSError:
+            return False
+        if mtime == entry.mtime:
+            return False
+        entry.mtime = mtime
+        try:
+            with open(entry.path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+            if raw == entry.snapshot.raw:
+                return False
+            value = entry.parse(raw)
+        except Exception as e:
+            # 类型错误等任何解析异常都不能影响读取配置的命令，记录后继续使用之前的快照
+            entry.failures += 1
+            entry.last_error = str(e)
+            logger.error(f"配置 {os.path.basename(entry.path)} 无效，继续使用之前的配置: {e}")
+            return False
+        # 解析完成后一次性替换快照，读取方不会看到半更新的配置
+        entry.snapshot = ConfigSnapshot(entry.snapshot.version + 1, value, raw)
+        entry.last_error = ""
+        if initial:
+            return True
+        entry.reloads += 1
+        logger.info(f"已重新加载配置 {os.path.basename(entry.path)}（版本 {entry.snapshot.version}）")
+        return True
+
+    def stats(self):
+        """获取各配置的版本号与重新加载情况"""
+        return {
+            name: {"version": entry.snapshot.version, "reloads": entry.reloads,
+                   "failures": entry.failures, "last_error": entry.last_error}
+            for name, entry in self._files.items()
+        }
+
+
+def parse_admins(data):
+    """校验 admins.json，返回管理员ID的 frozenset"""
+    admins = data.get("admins") if isinstance(data, dict) else None
+    if not isinstance(admins, list):
+        raise ValueError("admins.json 需要包含 admins 列表")
+    return frozenset(str(admin) for admin in admins)
@@ -0,0 +1,277 @@
+import hashlib
+import itertools
+import json
+import os
+
+FORMAT = "teahouse-export"
+VERSION = 1
+
+# 导出/导入的玩家数据表：表名 -> (定位一行的键列, 其余数据列)
+# 自增 id 不导出，导入时按键列更新已有记录或插入新记录，重复导入同一批数据结果不变
+TABLES = {
+    "users": (("user_id",), ("sign_in_count", "last_sign_in_date", "sign_in_coins")),
+    "economy": (("user_id",), ("economy",)),
+    "tasks": (("user_id", "task_id"), ("task_name", "task_description", "task_progress",
+                                       "task_target", "reward", "status", "task_type")),
+    "backpack": (("user_id", "item_name"), ("item_count", "item_type", "item_value")),
+}
+
+# 导入进度在状态库中的范围，键为导出文件的 sha256
+CHECKPOINT_SCOPE = "data_import"
+
+
+class DataTransferError(ValueError):
+    """导出文件格式错误、校验和不匹配或目标存储不支持"""
+
+
+def export_rows(fastpath, tables=None):
+    """
+    逐行读取玩家数据，生成 (表名, 行字典)
+
+    参数:
+        fastpath: 已完成探测的 SQLiteFastPath
+        tables: 要导出的表名，默认为全部支持的表
+    """
+    for table in tables or [table for table in TABLES if fastpath.supports(table)]:
+        keys, values = TABLES[table]
+        columns = keys + values
+        for row in fastpath.iter_rows(f"SELECT {', '.join(columns)} FROM {table}"):
+            yield table, dict(zip(columns, row))
+
+
+def write_export(path, records, tables, created_at=""):
+    """
+    将记录流式写入 JSONL 导出文件：首行为文件头，末行为记录数与校验和
+
+    先写入 .part 临时文件，完成后再改名，中途失败不会留下不完整的导出文件。
+
+    返回:
+        {"records": 总条数, "tables": {表名: 条数}, "sha256": 校验和}
+    """
+    digest = hashlib.sha256()
+    counts = dict.fromkeys(tables, 0)
+    temp_path = path + ".part"
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(temp_path, "w", encoding="utf-8", newline="\n") as f:
+        def emit(obj):
+            line = json.dumps(obj, ensure_ascii=False) + "\n"
+            digest.update(line.encode("utf-8"))
+            f.write(line)
+
+        emit({"format": FORMAT, "version": VERSION, "created_at": created_at, "tables": list(tables)})
+        for table, row in records:
+            emit({"table": table, "row": row})
+            counts[table] += 1
+        total = sum(counts.values())
+        f.write(json.dumps({"end": True, "records": total, "sha256": digest.hexdigest()}) + "\n")
+    os.replace(temp_path, path)
+    return {"records": total, "tables": counts, "sha256": digest.hexdigest()}
+
+
+def _lines(path):
+    with open(path, "r", encoding="utf-8") as f:
+        yield from f
+
+
+def _parse(line, line_no):
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError as e:
+        raise DataTransferError(f"第 {line_no} 行 JSON 解析失败: {e}")
+
+
+def verify_export(path):
+    """
+    逐行校验导出文件的文件头、记录数与校验和，内存占用与文件大小无关
+
+    返回:
+        文件头字典，附加 records 与 sha256
+    """
+    digest = hashlib.sha256()
+    header = footer = None
+    records = 0
+    for line_no, line in enumerate(_lines(path), start=1):
+        if footer is not None:
+            if line.strip():
+                raise DataTransferError(f"第 {line_no} 行: 结束标记之后还有内容")
+            continue
+        if line_no == 1:
+            header = _parse(line, line_no)
+            if not isinstance(header, dict) or header.get("format") != FORMAT:
+                raise DataTransferError("不是茶馆数据导出文件")
+            if header.get("version") != VERSION:
+                raise DataTransferError(f"不支持的导出文件版本: {header.get('version')}")
+        elif line.startswith('{"end"'):
+            footer = _parse(line, line_no)
+            continue
+        else:
+            records += 1
+        digest.update(line.encode("utf-8"))
+    if header is None:
+        raise DataTransferError("导出文件为空")
+    if footer is None:
+        raise DataTransferError("导出文件不完整：缺少结束标记")
+    if footer.get("records") != records:
+        raise DataTransferError(f"记录数不匹配：文件声明 {footer.get('records')} 条，实际 {records} 条")
+    if footer.get("sha256") != digest.hexdigest():
+        raise DataTransferError("校验和不匹配，导出文件可能已损坏或被修改")
+    return dict(header, records=records, sha256=footer["sha256"])
+
+
+def iter_export(path, start=0):
+    """
+    逐条读取导出文件中的记录，生成 (表名, 行字典)，跳过前 start 条
+
+    调用前应先通过 verify_export 校验文件。
+    """
+    index = 0
+    for line_no, line in enumerate(_lines(path), start=1):
+        if line_no == 1 or line.startswith('{"end"') or not line.strip():
+            continue
+        index += 1
+        if index <= start:
+            continue
+        record = _parse(line, line_no)
+        table = record.get("table")
+        row = record.get("row")
+        if table not in TABLES or not isinstance(row, dict):
+            raise DataTransferError(f"第 {line_no} 行: 无法识别的记录")
+        keys, _ = TABLES[table]
+        if any(row.get(key) is None for key in keys):
+            raise DataTransferError(f"第 {line_no} 行: {table} 记录缺少 {', '.join(keys)}")
+        yield table, row
+
+
+def chunked(iterable, size):
+    """将可迭代对象按 size 条一组切分"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _upsert(conn, table, row):
+    keys, values = TABLES[table]
+    columns = [column for column in values if column in row]
+    where = " AND ".join(f"{key} = ?" for key in keys)
+    key_params = [row[key] for key in keys]
+    if columns:
+        cursor = conn.execute(
+            f"UPDATE {table} SET {', '.join(f'{column} = ?' for column in columns)} WHERE {where}",
+            [row[column] for column in columns] + key_params,
+        )
+        updated = cursor.rowcount > 0
+    else:
+        updated = conn.execute(f"SELECT 1 FROM {table} WHERE {where}", key_params).fetchone() is not None
+    if not updated:
+        insert_columns = list(keys) + columns
+        conn.execute(
+            f"INSERT INTO {table} ({', '.join(insert_columns)}) VALUES ({', '.join('?' * len(insert_columns))})",
+            [row[column] for column in insert_columns],
+        )
+
+
+class DataImporter:
+    def __init__(self, fastpath, checkpoints=None, chunk_size=1000):
+        """
+        从导出文件分批导入玩家数据，支持中断后续传
+
+        每 chunk_size 条记录在一个事务中写入，提交后把已导入条数记录到状态库。
+        续传时从记录的位置继续；检查点晚于提交时重复写入的记录按键列覆盖，结果不变。
+
+        参数:
+            fastpath: 已完成探测的 SQLiteFastPath
+            checkpoints: StateStore，为 None 时不支持续传
+            chunk_size: 每个事务写入的记录数
+        """
+        self.fastpath = fastpath
+        self.checkpoints = checkpoints
+        self.chunk_size = max(int(chunk_size), 1)
+
+    def run(self, path, on_chunk=None):
+        """
+        校验并导入一个导出文件（在数据库线程中调用）
+
+        参数:
+            path: 导出文件路径
+            on_chunk: 每提交一批后调用 on_chunk(已导入条数, 总条数)
+
+        返回:
+            {"records": 总条数, "imported": 本次导入条数, "resumed_from": 续传起点, "sha256": 校验和}
+        """
+        info = verify_export(path)
+        unsupported = [table for table in info.get("tables", []) if not self.fastpath.supports(table)]
+        if unsupported:
+            raise DataTransferError(f"当前存储不支持导入这些表: {', '.join(unsupported)}")
+
+        key = info["sha256"]
+        start = 0
+        if self.checkpoints:
+            checkpoint = self.checkpoints.get(CHECKPOINT_SCOPE, key)
+            if checkpoint and checkpoint[0] == "running":
+                start = checkpoint[1]
+
+        applied = start
+        for chunk in chunked(iter_export(path, start), self.chunk_size):
+            with self.fastpath.transaction() as conn:
+                for table, row in chunk:
+                    _upsert(conn, table, row)
+            applied += len(chunk)
+            if self.checkpoints:
+                self.checkpoints.put(CHECKPOINT_SCOPE, key, "running", applied)
+            if on_chunk:
+                on_chunk(applied, info["records"])
+        if self.checkpoints:
+            self.checkpoints.put(CHECKPOINT_SCOPE, key, "done", applied)
+        return {"records": info["records"], "imported": applied - start, "resumed_from": start, "sha256": key}
+
+
+if __name__ == "__main__":
+    # 演示：在临时内置存储中生成 20 万行玩家数据，导出后导入到另一个库，并统计峰值内存
+    import sys
+    import tempfile
+    import time
+    import tracemalloc
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from API.builtin_db import BuiltinStorage
+    from API.sqlite_fastpath import SQLiteFastPath
+    from API.state_store import StateStore
+
+    users = 50000
+    work_dir = tempfile.mkdtemp()
+    source = BuiltinStorage(os.path.join(work_dir, "source.db"))
+    target = BuiltinStorage(os.path.join(work_dir, "target.db"))
+    source_path, target_path = source.db_file, target.db_file
+    source.close()
+    target.close()
+
+    source_fastpath = SQLiteFastPath(source_path)
+    source_fastpath.probe()
+    with source_fastpath.transaction() as conn:
+        conn.executemany("INSERT INTO users VALUES (?, ?, '2024-01-01', ?)",
+                         [(str(user), user % 30, user % 100) for user in range(users)])
+        conn.executemany("INSERT INTO economy VALUES (?, ?)", [(str(user), user * 3) for user in range(users)])
+        conn.executemany("INSERT INTO backpack (user_id, item_name, item_count, item_type, item_value) VALUES (?, ?, ?, '绿茶', 10)",
+                         [(str(user), f"茶{tea}", tea + 1) for user in range(users) for tea in range(2)])
+
+    export_path = os.path.join(work_dir, "export.jsonl")
+    tracemalloc.start()
+    start = time.perf_counter()
+    tables = [table for table in TABLES if source_fastpath.supports(table)]
+    summary = write_export(export_path, export_rows(source_fastpath, tables), tables)
+    print(f"导出 {summary['records']} 条，耗时 {time.perf_counter() - start:.2f}s，"
+          f"峰值内存 {tracemalloc.get_traced_memory()[1] / 1024:.0f} KiB，文件 {os.path.getsize(export_path) / 1024 / 1024:.1f} MiB")
+
+    tracemalloc.reset_peak()
+    target_fastpath = SQLiteFastPath(target_path)
+    target_fastpath.probe()
+    store = StateStore(os.path.join(work_dir, "state.db"))
+    start = time.perf_counter()
+    result = DataImporter(target_fastpath, store).run(export_path)
+    print(f"导入 {result['imported']} 条，耗时 {time.perf_counter() - start:.2f}s，"
+          f"峰值内存 {tracemalloc.get_traced_memory()[1] / 1024:.0f} KiB")
+    total = target_fastpath.connection().execute("SELECT SUM(economy) FROM economy").fetchone()[0]
+    print(f"目标库金币合计 {total}，与源库一致: {total == sum(user * 3 for user in range(users))}")
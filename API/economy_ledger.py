@@ -0,0 +1,166 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from .flush_loop import FlushLoop
+
+
+class EconomyLedger:
+    def __init__(self, apply_deltas, flush_interval_ms=200, max_entries=100, listener=None):
+        """
+        金币写后缓冲账本：奖励类入账先累积在内存中，按时间或条数阈值合并成一次批量写入
+
+        参数:
+            apply_deltas: 同步函数，接收 用户ID -> 金币变化量 的字典并写入存储；不能在一个事务中写入时，
+                          应在每位用户写入成功后将其从字典中移除，失败时只有仍留在字典中的金额会放回缓冲
+            flush_interval_ms: 最长缓冲时间（毫秒）
+            max_entries: 累积的入账条数达到该值时立即刷写
+            listener: 可选，每笔入账后以 (用户ID, 金额) 调用，用于同步排行榜等派生数据
+        """
+        self.apply_deltas = apply_deltas
+        self.flush_interval = max(flush_interval_ms, 1) / 1000
+        self.max_entries = max(int(max_entries), 1)
+        self.listener = listener
+
+        # _lock 只保护内存中的待写入金额，入账时不会被刷写阻塞；
+        # _commit_lock 在刷写期间持有，保证“数据库余额 + 待写入金额”的读取不会与提交交错
+        self._lock = threading.Lock()
+        self._commit_lock = threading.RLock()
+        self._pending = {}
+        self._entries = 0
+        # 每位用户余额的版本号，余额变化时递增；_epoch 在整体变化（如导入数据）时递增
+        self._versions = {}
+        self._epoch = 0
+        self._flusher = FlushLoop(self.flush, self.flush_interval, "economy_flush")
+        # 运行指标
+        self.flushes = 0
+        self.flushed_entries = 0
+        self.failed_flushes = 0
+        self.last_flush_ms = 0.0
+
+    def credit(self, user_id, amount):
+        """为用户记入一笔待写入的金币"""
+        if not amount:
+            return
+        with self._lock:
+            self._pending[user_id] = self._pending.get(user_id, 0) + amount
+            self._entries += 1
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            full = self._entries >= self.max_entries
+        if self.listener:
+            self.listener(user_id, amount)
+        if full:
+            self._flusher.wake()
+
+    def pending(self, user_id):
+        """获取用户尚未写入存储的金币"""
+        with self._lock:
+            return self._pending.get(user_id, 0)
+
+    def version(self, user_id):
+        """
+        用户余额的版本号，入账或 touch 后变化；刷写只是把金额移入数据库，余额视图不变，版本号也不变
+
+        只反映经过本插件的余额变化，其他插件直接修改数据库时不会更新。
+        """
+        with self._lock:
+            return self._epoch, self._versions.get(user_id, 0)
+
+    def touch(self, user_id=None):
+        """标记用户（或全部用户）的余额已在账本之外变化，如扣款购买或导入数据"""
+        with self._lock:
+            if user_id is None:
+                self._epoch += 1
+                self._versions.clear()
+            else:
+                self._versions[user_id] = self._versions.get(user_id, 0) + 1
+
+    def read_balance(self, user_id, db_economy):
+        """
+        读取与缓冲一致的余额视图：数据库余额 + 待写入金额
+
+        需在会话中的任何写操作之前调用，避免与刷写事务互相等待。
+        """
+        with self._commit_lock:
+            return db_economy.get_economy() + self.pending(user_id)
+
+    def settle(self, user_id, db_economy):
+        """
+        将用户的待写入金额立即写入存储，并返回结算后的余额
+
+        扣款前调用，确保扣款基于包含全部入账的真实余额进行。
+        """
+        with self.draining(user_id) as amount:
+            if amount:
+                db_economy.add_economy(amount)
+            return db_economy.get_economy()
+
+    @contextmanager
+    def draining(self, user_id):
+        """
+        取出用户的待写入金额，交由调用方在自己的事务中写入
+
+        with 块内抛出异常时金额会放回缓冲；期间刷写与一致性读取会等待。
+        """
+        with self._commit_lock:
+            with self._lock:
+                amount = self._pending.pop(user_id, 0)
+            try:
+                yield amount
+            except BaseException:
+                if amount:
+                    self._restore({user_id: amount}, 0)
+                raise
+
+    def _restore(self, batch, entries):
+        with self._lock:
+            for user_id, amount in batch.items():
+                self._pending[user_id] = self._pending.get(user_id, 0) + amount
+            self._entries += entries
+
+    def flush(self):
+        """同步刷写全部待写入金额（在数据库线程中调用）"""
+        with self._commit_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                batch, self._pending = self._pending, {}
+                entries, self._entries = self._entries, 0
+            started = time.perf_counter()
+            users = len(batch)
+            try:
+                self.apply_deltas(batch)
+            except BaseException:
+                # 写入失败时只把尚未写入的金额放回缓冲，等待下一次刷写；已写入的用户不会重复入账
+                self._restore(batch, entries if batch else 0)
+                self.failed_flushes += 1
+                raise
+            self.flushes += 1
+            self.flushed_entries += entries
+            self.last_flush_ms = (time.perf_counter() - started) * 1000
+            return users
+
+    def start(self, executor):
+        """
+        启动后台刷写协程
+
+        参数:
+            executor: 提供 async run(func, op=...) 的执行器（如 AsyncDatabase）
+        """
+        self._flusher.start(executor)
+
+    async def close(self):
+        """停止后台刷写并把剩余金额持久化"""
+        await self._flusher.close()
+
+    def stats(self):
+        """获取账本运行指标"""
+        with self._lock:
+            return {
+                "pending_users": len(self._pending),
+                "pending_entries": self._entries,
+                "flushes": self.flushes,
+                "flushed_entries": self.flushed_entries,
+                "failed_flushes": self.failed_flushes,
+                "last_flush_ms": self.last_flush_ms,
+            }
@@ -0,0 +1,208 @@
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger("astrbot")
+
+
+class FlashSale:
+    def __init__(self, allocate, batch_size=32, batch_window_ms=10):
+        """
+        限时抢购：被标记商品的购买请求进入先进先出队列，由单个分配协程按批次处理
+
+        每一批在数据库线程中用一个事务按到达顺序分配库存，结果逐个交还给等待的请求。
+        同一商品的购买不再互相争抢同一行，先到先得。
+
+        参数:
+            allocate: 同步函数，接收 [(用户ID, 商品实际ID, 数量), ...]，返回一一对应的结果列表
+            batch_size: 每批最多处理的请求数
+            batch_window_ms: 收到第一个请求后最多再等待多久凑满一批（毫秒）
+        """
+        self.allocate = allocate
+        self.batch_size = max(int(batch_size), 1)
+        self.batch_window = max(batch_window_ms, 0) / 1000
+        self.items = set()  # 处于抢购模式的商品实际ID
+        self._queue = None
+        self._task = None
+        self._executor = None
+        self._batch = []  # 已从队列取出、尚未交还结果的请求
+        self._allocation = None  # 当前批次在数据库线程中的分配
+        # 运行指标
+        self.requests = 0
+        self.batches = 0
+        self.granted = 0
+        self.max_batch = 0
+
+    def enable(self, tea_id):
+        """将商品标记为限时抢购"""
+        self.items.add(tea_id)
+
+    def disable(self, tea_id):
+        """取消商品的限时抢购标记"""
+        self.items.discard(tea_id)
+
+    def is_active(self, tea_id):
+        return tea_id in self.items
+
+    def start(self, executor):
+        """
+        启动分配协程
+
+        参数:
+            executor: 提供 async run(func, *args, op=...) 的执行器（如 AsyncDatabase）
+        """
+        self._executor = executor
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def submit(self, user_id, tea_id, quantity):
+        """提交一个购买请求并等待分配结果（结果格式同 PurchaseEngine.purchase）"""
+        if self._task is None:
+            # 分配协程已停止（插件卸载中），排队的请求不会再被处理
+            raise RuntimeError("限时抢购已停止")
+        future = asyncio.get_running_loop().create_future()
+        self.requests += 1
+        self._queue.put_nowait(((user_id, tea_id, quantity), future))
+        return await future
+
+    async def _next_batch(self):
+        # 取出的请求立即记录在实例上，分配协程被取消时 close 仍能找到它们
+        batch = self._batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.batch_size:
+            if self._queue.empty():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+            else:
+                batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            # 等待期间被取消的请求不再分配
+            batch = self._batch = [(request, future) for request, future in batch if not future.done()]
+            if not batch:
+                continue
+            self._allocation = asyncio.ensure_future(
+                self._executor.run(self.allocate, [request for request, _ in batch], op="flash_sale"))
+            # asyncio.wait 被取消时不会取消分配本身，close 可以等待它完成
+            await asyncio.wait([self._allocation])
+            self._deliver()
+
+    def _deliver(self):
+        """把当前批次的分配结果（或异常）交还给等待的请求"""
+        batch, allocation = self._batch, self._allocation
+        self._batch, self._allocation = [], None
+        error = RuntimeError("限时抢购已停止") if allocation.cancelled() else allocation.exception()
+        if error is not None:
+            logger.error(f"限时抢购批次分配失败: {error}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        self.batches += 1
+        self.max_batch = max(self.max_batch, len(batch))
+        for (_, future), result in zip(batch, allocation.result()):
+            if result.get("status") == "ok":
+                self.granted += 1
+            if not future.done():
+                future.set_result(result)
+
+    async def close(self):
+        """
+        停止分配协程：已交给数据库线程的批次会提交，等待它完成并交还结果；
+        其余未分配的请求以异常结束
+        """
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._allocation is not None:
+            await asyncio.wait([self._allocation])
+            self._deliver()
+        stopped = RuntimeError("限时抢购已停止")
+        pending = self._batch
+        self._batch = []
+        while self._queue is not None and not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        for _, future in pending:
+            if not future.done():
+                future.set_exception(stopped)
+
+    def stats(self):
+        """获取限时抢购运行指标"""
+        return {
+            "items": len(self.items),
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "requests": self.requests,
+            "batches": self.batches,
+            "granted": self.granted,
+            "max_batch": self.max_batch,
+        }
+
+
+if __name__ == "__main__":
+    # 基准测试：100 位用户同时抢购同一件商品，对比逐个事务购买与限时抢购批量分配
+    import os
+    import sys
+    import tempfile
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from API.async_db import AsyncDatabase
+    from API.builtin_db import BuiltinStorage
+    from API.purchase import PurchaseEngine
+    from API.sqlite_fastpath import SQLiteFastPath
+
+    buyers, stock = 100, 60
+
+    def prepare(name):
+        storage = BuiltinStorage(os.path.join(tempfile.mkdtemp(), name))
+        with storage.get_databases({}, storage.db_file, "admin") as (_, _, _, _, db_store):
+            tea_id = db_store.add_tea_to_store("限量龙井", stock, "绿茶", 10, "基准测试")
+        for user in range(buyers):
+            with storage.get_databases({}, storage.db_file, str(user)) as (_, db_economy, _, _, _):
+                db_economy.add_economy(100)
+        fastpath = SQLiteFastPath(storage.db_file)
+        fastpath.probe()
+        executor = AsyncDatabase(storage.get_databases, {}, storage.db_file, max_workers=4, max_pending=buyers)
+        return storage, fastpath, executor, PurchaseEngine(fastpath), tea_id
+
+    def sold(fastpath, tea_id):
+        return stock - fastpath.connection().execute("SELECT quantity FROM tea_store WHERE id = ?", (tea_id,)).fetchone()[0]
+
+    async def direct():
+        storage, fastpath, executor, engine, tea_id = prepare("direct.db")
+        start = time.perf_counter()
+        results = await asyncio.gather(*[
+            executor.run(engine.purchase, str(user), 1, 1, op="buy") for user in range(buyers)
+        ])
+        elapsed = time.perf_counter() - start
+        granted = sum(result["status"] == "ok" for result in results)
+        print(f"逐个事务: {buyers / elapsed:.0f} 请求/秒，成交 {granted}，库存扣减 {sold(fastpath, tea_id)}")
+        executor.shutdown()
+
+    async def batched():
+        storage, fastpath, executor, engine, tea_id = prepare("flash.db")
+        sale = FlashSale(engine.purchase_batch)
+        sale.enable(tea_id)
+        sale.start(executor)
+        start = time.perf_counter()
+        results = await asyncio.gather(*[sale.submit(str(user), tea_id, 1) for user in range(buyers)])
+        elapsed = time.perf_counter() - start
+        granted = sum(result["status"] == "ok" for result in results)
+        print(f"限时抢购: {buyers / elapsed:.0f} 请求/秒，成交 {granted}，库存扣减 {sold(fastpath, tea_id)}，"
+              f"批次 {sale.batches}（最大 {sale.max_batch}）")
+        await sale.close()
+        executor.shutdown()
+
+    asyncio.run(direct())
+    asyncio.run(batched())
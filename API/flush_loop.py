@@ -0,0 +1,65 @@
+import asyncio
+import logging
+
+logger = logging.getLogger("astrbot")
+
+
+class FlushLoop:
+    def __init__(self, flush, interval, name):
+        """
+        后台刷写协程：每隔 interval 秒或被唤醒时，在数据库线程中调用一次 flush
+
+        参数:
+            flush: 同步刷写函数
+            interval: 刷写间隔（秒）
+            name: 用于日志与指标的名称
+        """
+        self.flush = flush
+        self.interval = interval
+        self.name = name
+        self._loop = None
+        self._wake = None
+        self._task = None
+        self._executor = None
+
+    def start(self, executor):
+        """
+        启动后台刷写
+
+        参数:
+            executor: 提供 async run(func, op=...) 的执行器（如 AsyncDatabase）
+        """
+        self._executor = executor
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    def wake(self):
+        """请求尽快刷写，可在任意线程中调用"""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self._executor.run(self.flush, op=self.name)
+            except Exception as e:
+                logger.error(f"{self.name} 刷写失败，将在下次重试: {e}")
+
+    async def close(self):
+        """停止后台刷写并执行最后一次刷写"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._loop = None
+        if self._executor:
+            await self._executor.run(self.flush, op=self.name)
@@ -0,0 +1,281 @@
+import datetime
+import random
+import threading
+
+_MAX_LEVEL = 32
+
+
+class _Node:
+    __slots__ = ("key", "next", "width")
+
+    def __init__(self, key, level):
+        self.key = key
+        self.next = [None] * level
+        self.width = [1] * level  # 第 i 层到下一个节点跨过的底层节点数
+
+
+class IndexableSkipList:
+    def __init__(self):
+        """
+        可按序号访问的跳表：插入、删除、查询排名、按排名取值都是期望 O(log n)
+
+        每层指针记录跨过的节点数，沿路径累加即可得到排名。
+        """
+        self._head = _Node(None, _MAX_LEVEL)
+        self._head.width = [0] * _MAX_LEVEL
+        self._level = 1
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    @staticmethod
+    def _random_level():
+        level = 1
+        while level < _MAX_LEVEL and random.random() < 0.5:
+            level += 1
+        return level
+
+    def _search_path(self, key):
+        """返回每一层上最后一个小于 key 的节点及其排名（从 0 开始，头节点为 -1）"""
+        update = [self._head] * _MAX_LEVEL
+        ranks = [-1] * _MAX_LEVEL
+        node, rank = self._head, -1
+        for level in reversed(range(self._level)):
+            while node.next[level] is not None and node.next[level].key < key:
+                rank += node.width[level]
+                node = node.next[level]
+            update[level] = node
+            ranks[level] = rank
+        return update, ranks
+
+    def insert(self, key):
+        """插入一个键（键需互不相同）"""
+        update, ranks = self._search_path(key)
+        level = self._random_level()
+        if level > self._level:
+            for i in range(self._level, level):
+                update[i] = self._head
+                ranks[i] = -1
+                self._head.width[i] = self.size + 1
+            self._level = level
+        node = _Node(key, level)
+        position = ranks[0] + 1  # 新节点的排名
+        for i in range(level):
+            prev = update[i]
+            node.next[i] = prev.next[i]
+            prev.next[i] = node
+            # prev 原来跨过的节点被新节点分成两段
+            node.width[i] = prev.width[i] - (position - ranks[i]) + 1
+            prev.width[i] = position - ranks[i]
+        for i in range(level, self._level):
+            update[i].width[i] += 1
+        self.size += 1
+
+    def remove(self, key):
+        """删除一个键，不存在时返回 False"""
+        update, _ = self._search_path(key)
+        node = update[0].next[0]
+        if node is None or node.key != key:
+            return False
+        for i in range(self._level):
+            if update[i].next[i] is node:
+                update[i].width[i] += node.width[i] - 1
+                update[i].next[i] = node.next[i]
+            else:
+                update[i].width[i] -= 1
+        while self._level > 1 and self._head.next[self._level - 1] is None:
+            self._level -= 1
+        self.size -= 1
+        return True
+
+    def rank(self, key):
+        """返回键的排名（从 0 开始），不存在时返回 None"""
+        update, ranks = self._search_path(key)
+        node = update[0].next[0]
+        if node is None or node.key != key:
+            return None
+        return ranks[0] + 1
+
+    def slice(self, start, count):
+        """按排名从 start 开始取最多 count 个键"""
+        if start < 0 or start >= self.size or count <= 0:
+            return []
+        node, rank = self._head, -1
+        for level in reversed(range(self._level)):
+            while node.next[level] is not None and rank + node.width[level] <= start:
+                rank += node.width[level]
+                node = node.next[level]
+        keys = []
+        while node is not None and len(keys) < count:
+            keys.append(node.key)
+            node = node.next[0]
+        return keys
+
+
+class Leaderboard:
+    def __init__(self, name):
+        """
+        排行榜：分数从高到低排序，分数相同按用户ID排序
+
+        参数:
+            name: 排行榜名称
+        """
+        self.name = name
+        self._scores = {}  # 用户ID -> 分数
+        self._index = IndexableSkipList()  # 键为 (-分数, 用户ID)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._scores)
+
+    def _set(self, user_id, score):
+        old = self._scores.get(user_id)
+        if old == score:
+            return
+        if old is not None:
+            self._index.remove((-old, user_id))
+        self._scores[user_id] = score
+        self._index.insert((-score, user_id))
+
+    def set(self, user_id, score):
+        """设置用户的分数"""
+        with self._lock:
+            self._set(str(user_id), score)
+
+    def adjust(self, user_id, delta):
+        """在已知分数的基础上增减；分数未知的用户忽略（等待下次获得完整分数时再加入）"""
+        user_id = str(user_id)
+        with self._lock:
+            old = self._scores.get(user_id)
+            if old is not None and delta:
+                self._set(user_id, old + delta)
+
+    def discard(self, user_id):
+        """移出排行榜"""
+        user_id = str(user_id)
+        with self._lock:
+            old = self._scores.pop(user_id, None)
+            if old is not None:
+                self._index.remove((-old, user_id))
+
+    def rebuild(self, pairs):
+        """
+        由存储中的 (用户ID, 分数) 重建排行榜，返回用户数
+
+        已在内存中的较新分数会被覆盖，因此应在服务开始处理命令前调用。
+        """
+        with self._lock:
+            self._scores.clear()
+            self._index = IndexableSkipList()
+            for user_id, score in pairs:
+                self._set(str(user_id), score)
+            return len(self._scores)
+
+    def top(self, k, offset=0):
+        """获取排名 offset+1 起的前 k 名，返回 [(名次, 用户ID, 分数), ...]"""
+        with self._lock:
+            keys = self._index.slice(offset, k)
+        return [(offset + i + 1, user_id, -negative) for i, (negative, user_id) in enumerate(keys)]
+
+    def rank(self, user_id):
+        """获取用户的 (名次, 分数)，不在榜上时返回 None"""
+        user_id = str(user_id)
+        with self._lock:
+            score = self._scores.get(user_id)
+            if score is None:
+                return None
+            return self._index.rank((-score, user_id)) + 1, score
+
+
+def mask_user_id(user_id):
+    """遮盖用户ID的中间部分，如 12****89"""
+    user_id = str(user_id)
+    if len(user_id) <= 4:
+        return "*" * len(user_id)
+    return user_id[:2] + "*" * (len(user_id) - 4) + user_id[-2:]
+
+
+class DisplayNames:
+    def __init__(self, store, scope="display_name"):
+        """
+        排行榜显示的用户昵称：全部保存在内存中，昵称变化时写入状态库，重启后仍能显示
+
+        参数:
+            store: StateStore 实例
+            scope: 状态范围名称
+        """
+        self.store = store
+        self.scope = scope
+        self._names = store.load_scope(scope)  # 用户ID -> 昵称
+        self._lock = threading.Lock()
+
+    def remember(self, user_id, name):
+        """记录用户的昵称，只有变化时才写入状态库（在数据库线程中调用）"""
+        user_id = str(user_id)
+        if not name:
+            return
+        with self._lock:
+            if self._names.get(user_id) == name:
+                return
+            self._names[user_id] = name
+        self.store.put(self.scope, user_id, name)
+
+    def get(self, user_id):
+        """用户的昵称，未知时返回遮盖后的用户ID"""
+        return self._names.get(str(user_id)) or mask_user_id(user_id)
+
+
+class SignInStreaks:
+    def __init__(self, store, board, scope="sign_in_streak"):
+        """
+        连续签到天数：按用户保存最近一次签到日期与连续天数（状态库），并同步到排行榜
+
+        断签的用户在下次签到前仍保留记录，但每天第一次查看排行榜时会被移出榜单。
+
+        参数:
+            store: StateStore 实例
+            board: 连续签到天数的 Leaderboard
+            scope: 状态范围名称
+        """
+        self.store = store
+        self.board = board
+        self.scope = scope
+        self._lock = threading.Lock()
+        self._streaks = {}  # 用户ID -> (最近签到日期, 连续天数)
+        self._expired_day = None
+
+    @staticmethod
+    def _yesterday(day):
+        return (datetime.date.fromisoformat(day) - datetime.timedelta(days=1)).isoformat()
+
+    def load(self, today):
+        """由状态库重建连续签到记录与排行榜，返回仍在连续中的人数（在数据库线程中调用）"""
+        streaks = {str(user_id): (day, streak) for user_id, day, streak in self.store.load_entries(self.scope)}
+        with self._lock:
+            self._streaks = streaks
+            self._expired_day = None
+        return self.expire(today)
+
+    def record(self, user_id, day):
+        """记录用户在 day（YYYY-MM-DD）签到，返回连续签到天数（在数据库线程中调用）"""
+        user_id = str(user_id)
+        with self._lock:
+            last_day, streak = self._streaks.get(user_id, (None, 0))
+            if last_day == day:
+                return streak
+            streak = streak + 1 if last_day == self._yesterday(day) else 1
+            self._streaks[user_id] = (day, streak)
+            self.board.set(user_id, streak)
+        self.store.put(self.scope, user_id, day, streak)
+        return streak
+
+    def expire(self, today):
+        """把昨天和今天都没有签到的用户移出榜单，每天只检查一次，返回榜上人数"""
+        with self._lock:
+            if self._expired_day == today:
+                return len(self.board)
+            self._expired_day = today
+            active = {today, self._yesterday(today)}
+            current = [(user_id, streak) for user_id, (day, streak) in self._streaks.items() if day in active]
+            return self.board.rebuild(current)
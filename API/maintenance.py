@@ -0,0 +1,136 @@
+import asyncio
+import datetime
+import logging
+import time
+
+logger = logging.getLogger("astrbot")
+
+# 周期名 -> 由当前时间计算周期标识的函数
+PERIODS = {
+    "daily": lambda now: now.date().isoformat(),
+    "weekly": lambda now: now.strftime("%G-W%V"),
+}
+
+
+class PeriodClock:
+    def __init__(self, mode="real", timezone=None, virtual_clock=None):
+        """
+        计算日/周周期边界的时钟
+
+        参数:
+            mode: real 使用真实时间（可指定时区），virtual 使用 VirtualClock 的虚拟时间
+            timezone: 时区名称（如 Asia/Shanghai），为空时使用系统本地时区
+            virtual_clock: virtual 模式下使用的 VirtualClock 实例
+        """
+        self.mode = mode
+        self.virtual_clock = virtual_clock
+        self.tzinfo = None
+        if mode == "virtual" and virtual_clock is None:
+            raise ValueError("virtual 模式需要提供 VirtualClock")
+        if timezone:
+            from zoneinfo import ZoneInfo
+            self.tzinfo = ZoneInfo(timezone)
+
+    def now(self):
+        """当前时间（不带时区信息）"""
+        if self.mode == "virtual":
+            return self.virtual_clock.get_virtual_time()
+        if self.tzinfo is not None:
+            return datetime.datetime.now(self.tzinfo).replace(tzinfo=None)
+        return datetime.datetime.now()
+
+    def periods(self, now=None):
+        """当前所处的各周期标识，如 {"daily": "2025-01-01", "weekly": "2025-W01"}"""
+        now = now or self.now()
+        return {name: period(now) for name, period in PERIODS.items()}
+
+    def seconds_until_rollover(self):
+        """距离下一个日边界（周边界总是同时是日边界）的真实秒数"""
+        now = self.now()
+        midnight = datetime.datetime.combine(now.date() + datetime.timedelta(days=1), datetime.time())
+        seconds = (midnight - now).total_seconds()
+        if self.mode == "virtual":
+            seconds /= self.virtual_clock.time_ratio
+        return max(seconds, 0.0)
+
+
+class PeriodicResetJob:
+    def __init__(self, clock, store, jobs, max_sleep=3600):
+        """
+        在日/周边界批量执行重置任务的后台作业
+
+        上次执行的周期保存在状态库中，插件停机错过边界后，下次启动会立即补执行一次。
+        首次启动只记录当前周期，不执行重置。
+
+        参数:
+            clock: PeriodClock 实例
+            store: StateStore 实例
+            jobs: 周期名 (daily / weekly) -> 同步重置函数，在数据库线程中执行，返回影响的行数（不支持时返回 None）
+            max_sleep: 两次检查之间的最长等待时间（秒）
+        """
+        self.clock = clock
+        self.store = store
+        self.jobs = jobs
+        self.max_sleep = max_sleep
+        self._executor = None
+        self._task = None
+        self.reports = {}  # 周期名 -> 最近一次执行的报告
+
+    def start(self, executor):
+        """
+        启动后台作业
+
+        参数:
+            executor: 提供 async run(func, op=...) 的执行器（如 AsyncDatabase）
+        """
+        self._executor = executor
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await self._executor.run(self.run_due, op="periodic_reset")
+            except Exception as e:
+                logger.error(f"周期重置作业失败，将在下次检查时重试: {e}")
+            # 越过边界后稍等片刻再检查，避免时钟误差导致提前执行
+            await asyncio.sleep(min(self.clock.seconds_until_rollover() + 1, self.max_sleep))
+
+    def run_due(self):
+        """执行所有已到期的重置（在数据库线程中调用），返回本次执行的报告列表"""
+        periods = self.clock.periods()
+        reports = []
+        for name, job in self.jobs.items():
+            period = periods[name]
+            last = self.store.get("maintenance", name)
+            if last is None:
+                self.store.put("maintenance", name, period)
+                continue
+            if last[0] == period:
+                continue
+            start = time.perf_counter()
+            rows = job()
+            report = {
+                "period": period,
+                "previous": last[0],
+                "rows": rows,
+                "duration_ms": (time.perf_counter() - start) * 1000,
+                "finished_at": datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            }
+            self.store.put("maintenance", name, period)
+            self.reports[name] = report
+            reports.append(report)
+            if rows is None:
+                logger.info(f"{name} 周期重置跳过（存储不支持批量重置）: {last[0]} -> {period}")
+            else:
+                logger.info(f"{name} 周期重置完成: {last[0]} -> {period}，影响 {rows} 行，耗时 {report['duration_ms']:.1f}ms")
+        return reports
+
+    async def close(self):
+        """停止后台作业"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
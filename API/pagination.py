@@ -0,0 +1,84 @@
+DEFAULT_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 50
+GRID_PAGE_SIZE = 20  # 图片网格每页 4 行 × 5 列
+
+
+class Page:
+    __slots__ = ("items", "number", "size", "total")
+
+    def __init__(self, items, number, size, total):
+        """
+        列表的一页
+
+        参数:
+            items: 本页的记录
+            number: 页码（从 1 开始）
+            size: 每页条数
+            total: 全部记录数
+        """
+        self.items = items
+        self.number = number
+        self.size = size
+        self.total = total
+
+    @property
+    def pages(self):
+        return max(1, -(-self.total // self.size))
+
+    @property
+    def offset(self):
+        return (self.number - 1) * self.size
+
+    @property
+    def has_next(self):
+        return self.number < self.pages
+
+
+def page_size(value, default=DEFAULT_PAGE_SIZE):
+    """将配置中的每页条数限制在 1 ~ MAX_PAGE_SIZE 之间"""
+    try:
+        return min(max(int(value), 1), MAX_PAGE_SIZE)
+    except (TypeError, ValueError):
+        return default
+
+
+def page_bounds(number, size):
+    """页码对应的 (页码, 偏移量)，页码小于 1 时按第 1 页处理"""
+    number = max(int(number or 1), 1)
+    return number, (number - 1) * size
+
+
+def paginate(rows, number, size):
+    """从已在内存中的完整列表切出一页"""
+    number, offset = page_bounds(number, size)
+    return Page(rows[offset:offset + size], number, size, len(rows))
+
+
+def truncate(text, limit):
+    """超过 limit 个字符的文本截断并加省略号"""
+    text = str(text)
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+def render_page(page, header, render_item, command, footer=()):
+    """
+    将一页记录渲染为消息文本：先收集所有行，最后一次拼接
+
+    参数:
+        page: Page
+        header: 标题行（可以是多行列表）
+        render_item: 接收一条记录，返回该记录的文本行列表
+        command: 翻页命令（如 "雪泷商店"），用于提示下一页
+        footer: 页脚行
+    """
+    if not page.items:
+        return f"页码超出范围，共 {page.pages} 页，请使用 {command} <页码> 查看"
+    lines = [header] if isinstance(header, str) else list(header)
+    for item in page.items:
+        lines.extend(render_item(item))
+    lines.extend(footer)
+    if page.pages > 1:
+        lines.append(f"第 {page.number}/{page.pages} 页，共 {page.total} 项")
+        if page.has_next:
+            lines.append(f"发送 {command} {page.number + 1} 查看下一页")
+    return "\n".join(lines)
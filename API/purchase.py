@@ -0,0 +1,180 @@
+class PurchaseEngine:
+    def __init__(self, fastpath):
+        """
+        茶叶购买流程：查询商品、校验余额、扣款、扣库存、入背包在一个事务内完成
+
+        参数:
+            fastpath: SQLiteFastPath 实例
+        """
+        self.fastpath = fastpath
+
+    @property
+    def available(self):
+        """数据库结构是否支持单事务购买"""
+        return self.fastpath is not None and self.fastpath.supports("economy", "backpack", "tea_store")
+
+    def purchase(self, user_id, display_id, quantity, pending_credit=0, multiplier=1):
+        """
+        在一个事务中完成一次购买
+
+        库存与余额都使用带条件的 UPDATE 扣减（quantity >= n / economy >= 总价），
+        并发购买不会超卖，也不会出现扣了金币却没有茶叶的中间状态。
+
+        参数:
+            user_id: 购买者ID
+            display_id: 商店中显示的连续商品ID
+            quantity: 购买数量
+            pending_credit: 需要先一并写入的待入账金币（来自金币账本）
+            multiplier: 价格倍率（营业时段加成），总价按倍率计算，背包中记录的单价不变
+
+        返回:
+            一个字典，status 为 ok / not_found / no_stock / no_money 之一，
+            并包含 tea_name、tea_type、price、total_price、multiplier、stock、balance 等信息
+        """
+        with self.fastpath.transaction() as conn:
+            self._credit(conn, user_id, pending_credit)
+            # 连续ID即按实际ID排序后的序号
+            row = conn.execute(
+                "SELECT id, tea_name, quantity, tea_type, price FROM tea_store ORDER BY id LIMIT 1 OFFSET ?",
+                (display_id - 1,),
+            ).fetchone() if display_id > 0 else None
+            return self._purchase_row(conn, user_id, row, quantity, multiplier)
+
+    def purchase_batch(self, requests, pending_credits=None, multiplier=1):
+        """
+        在一个事务中按顺序处理一批购买请求（限时抢购），每个请求的结果互不影响
+
+        参数:
+            requests: [(用户ID, 商品实际ID, 购买数量), ...]
+            pending_credits: 用户ID -> 需要先一并写入的待入账金币
+            multiplier: 本批统一使用的价格倍率
+
+        返回:
+            与 requests 一一对应的结果字典列表，格式同 purchase
+        """
+        results = []
+        with self.fastpath.transaction() as conn:
+            for user_id, amount in (pending_credits or {}).items():
+                self._credit(conn, user_id, amount)
+            for user_id, tea_id, quantity in requests:
+                row = conn.execute(
+                    "SELECT id, tea_name, quantity, tea_type, price FROM tea_store WHERE id = ?", (tea_id,)
+                ).fetchone()
+                results.append(self._purchase_row(conn, user_id, row, quantity, multiplier))
+        return results
+
+    @staticmethod
+    def _credit(conn, user_id, amount):
+        if amount:
+            cursor = conn.execute("UPDATE economy SET economy = economy + ? WHERE user_id = ?", (amount, user_id))
+            if cursor.rowcount == 0:
+                conn.execute("INSERT INTO economy (user_id, economy) VALUES (?, ?)", (user_id, amount))
+
+    @staticmethod
+    def total_price(price, quantity, multiplier=1):
+        """按倍率计算总价，有倍率时保留两位小数"""
+        total = price * quantity
+        return total if multiplier == 1 else round(total * multiplier, 2)
+
+    @staticmethod
+    def _purchase_row(conn, user_id, row, quantity, multiplier=1):
+        """在调用方的事务中购买一件商品，row 为 (id, tea_name, quantity, tea_type, price) 或 None"""
+        if not row:
+            return {"status": "not_found"}
+        tea_id, tea_name, stock, tea_type, price = row
+        total_price = PurchaseEngine.total_price(price, quantity, multiplier)
+        result = {
+            "tea_id": tea_id,
+            "tea_name": tea_name,
+            "tea_type": tea_type,
+            "price": price,
+            "total_price": total_price,
+            "multiplier": multiplier,
+            "stock": stock,
+        }
+
+        conn.execute("SAVEPOINT purchase")
+        cursor = conn.execute(
+            "UPDATE tea_store SET quantity = quantity - ? WHERE id = ? AND quantity >= ?",
+            (quantity, tea_id, quantity),
+        )
+        if cursor.rowcount == 0:
+            conn.execute("ROLLBACK TO purchase")
+            conn.execute("RELEASE purchase")
+            result["status"] = "no_stock"
+            return result
+
+        cursor = conn.execute(
+            "UPDATE economy SET economy = economy - ? WHERE user_id = ? AND economy >= ?",
+            (total_price, user_id, total_price),
+        )
+        if cursor.rowcount == 0:
+            conn.execute("ROLLBACK TO purchase")
+            conn.execute("RELEASE purchase")
+            balance = conn.execute("SELECT economy FROM economy WHERE user_id = ?", (user_id,)).fetchone()
+            result["status"] = "no_money"
+            result["balance"] = balance[0] if balance else 0
+            return result
+
+        cursor = conn.execute(
+            "UPDATE backpack SET item_count = item_count + ? WHERE user_id = ? AND item_name = ?",
+            (quantity, user_id, tea_name),
+        )
+        if cursor.rowcount == 0:
+            conn.execute(
+                "INSERT INTO backpack (user_id, item_name, item_count, item_type, item_value) VALUES (?, ?, ?, ?, ?)",
+                (user_id, tea_name, quantity, tea_type, price),
+            )
+        conn.execute("RELEASE purchase")
+
+        result["status"] = "ok"
+        result["stock"] = stock - quantity
+        result["balance"] = conn.execute("SELECT economy FROM economy WHERE user_id = ?", (user_id,)).fetchone()[0]
+        return result
+
+    @staticmethod
+    def purchase_with_handles(db_economy, db_backpack, db_store, display_id, quantity, balance, multiplier=1):
+        """
+        数据库结构不支持单事务时，使用数据库插件的逐步接口完成购买，返回值与 purchase 相同
+
+        参数:
+            balance: 已结算的用户余额
+            multiplier: 价格倍率
+        """
+        # 使用新的方法通过连续ID获取实际ID
+        tea_id = db_store.get_actual_id_by_continuous_id(display_id)
+        return PurchaseEngine.purchase_item_with_handles(db_economy, db_backpack, db_store, tea_id, quantity, balance,
+                                                         multiplier)
+
+    @staticmethod
+    def purchase_item_with_handles(db_economy, db_backpack, db_store, tea_id, quantity, balance, multiplier=1):
+        """按商品实际ID使用数据库插件的逐步接口完成购买，返回值与 purchase 相同"""
+        tea_item = db_store.get_tea_store_item(tea_id) if tea_id else None
+        if not tea_item:
+            return {"status": "not_found"}
+        _, tea_name, stock, tea_type, price, _ = tea_item
+        total_price = PurchaseEngine.total_price(price, quantity, multiplier)
+        result = {
+            "tea_id": tea_id,
+            "tea_name": tea_name,
+            "tea_type": tea_type,
+            "price": price,
+            "total_price": total_price,
+            "multiplier": multiplier,
+            "stock": stock,
+            "balance": balance,
+        }
+        if stock < quantity:
+            result["status"] = "no_stock"
+            return result
+        if balance < total_price:
+            result["status"] = "no_money"
+            return result
+
+        db_economy.reduce_economy(total_price)
+        db_backpack.add_item(tea_name, quantity, tea_type, price)
+        db_store.update_tea_quantity(tea_id, -quantity)
+        result["status"] = "ok"
+        result["stock"] = stock - quantity
+        result["balance"] = balance - total_price
+        return result
@@ -0,0 +1,140 @@
+import math
+import time
+from collections import OrderedDict
+
+# 各命令消耗的令牌数：渲染图片、下载头像最贵，读取列表次之，其余命令消耗 1 个
+DEFAULT_COSTS = {
+    "签到": 5,
+    "商店图": 5,
+    "背包图": 5,
+    "更新头像": 5,
+    "商店": 2,
+    "背包": 2,
+    "任务列表": 2,
+    "茶艺展示": 2,
+    "购买": 2,
+}
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens, updated):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class BucketSpec:
+    __slots__ = ("burst", "rate")
+
+    def __init__(self, burst, rate):
+        """
+        令牌桶参数
+
+        参数:
+            burst: 桶容量，即允许的突发消耗
+            rate: 每秒补充的令牌数
+        """
+        self.burst = max(float(burst), 1.0)
+        self.rate = max(float(rate), 0.001)
+
+    @property
+    def refill_seconds(self):
+        """空桶补满所需的秒数"""
+        return self.burst / self.rate
+
+
+class RateLimiter:
+    def __init__(self, user, group, global_, costs=None, default_cost=1, idle_seconds=300, clock=time.monotonic):
+        """
+        按用户、群和全局三级令牌桶限流，命令按开销消耗不同数量的令牌
+
+        一次请求需要三个桶同时有足够令牌才会放行，放行后三个桶一起扣减，被拒绝时不扣减。
+        桶在首次使用时创建（满桶），按最近使用顺序保存；空闲超过 idle_seconds
+        （至少为补满时间，此时桶已满，清理与保留等价）的桶在后续请求时从最旧一端清理，
+        内存占用与活跃用户/群数量成正比。
+
+        参数:
+            user / group / global_: BucketSpec，三级令牌桶参数
+            costs: 命令名 -> 消耗的令牌数
+            default_cost: 未列出的命令消耗的令牌数
+            idle_seconds: 桶空闲多久后可被清理（秒）
+            clock: 返回单调递增秒数的时钟
+        """
+        self.specs = {"user": user, "group": group, "global": global_}
+        self.costs = dict(costs or {})
+        self.default_cost = default_cost
+        self.idle_seconds = max(idle_seconds, user.refill_seconds, group.refill_seconds)
+        self.clock = clock
+        self._buckets = OrderedDict()
+        self._global = _Bucket(global_.burst, clock())
+        # 运行指标
+        self.allowed = 0
+        self.limited = 0
+        self.evicted = 0
+
+    def cost(self, command):
+        """命令消耗的令牌数"""
+        return self.costs.get(command, self.default_cost)
+
+    def _bucket(self, kind, key, now):
+        bucket = self._buckets.get((kind, key))
+        if bucket is None:
+            bucket = self._buckets[(kind, key)] = _Bucket(self.specs[kind].burst, now)
+        else:
+            self._buckets.move_to_end((kind, key))
+        return bucket
+
+    @staticmethod
+    def _refill(bucket, spec, now):
+        if now > bucket.updated:
+            bucket.tokens = min(spec.burst, bucket.tokens + (now - bucket.updated) * spec.rate)
+            bucket.updated = now
+
+    def acquire(self, command, user_id, group_id=None):
+        """
+        为一次命令请求申请令牌
+
+        参数:
+            command: 命令名，用于查找开销
+            user_id: 用户ID
+            group_id: 群ID，私聊时为空
+
+        返回:
+            0 表示放行，否则为需要等待的秒数（向上取整，至少 1）
+        """
+        now = self.clock()
+        self._evict(now)
+        cost = self.cost(command)
+        buckets = [(self._bucket("user", user_id, now), self.specs["user"]), (self._global, self.specs["global"])]
+        if group_id:
+            buckets.append((self._bucket("group", group_id, now), self.specs["group"]))
+
+        wait = 0.0
+        for bucket, spec in buckets:
+            self._refill(bucket, spec, now)
+            # 开销超过桶容量的命令按桶容量计算，满桶时总能执行
+            need = min(cost, spec.burst)
+            if bucket.tokens < need:
+                wait = max(wait, (need - bucket.tokens) / spec.rate)
+        if wait:
+            self.limited += 1
+            return max(1, math.ceil(wait))
+        for bucket, spec in buckets:
+            bucket.tokens -= min(cost, spec.burst)
+        self.allowed += 1
+        return 0
+
+    def _evict(self, now):
+        """从最久未使用的一端清理空闲的桶，每个桶只会被清理一次，均摊 O(1)"""
+        deadline = now - self.idle_seconds
+        while self._buckets:
+            key, bucket = next(iter(self._buckets.items()))
+            if bucket.updated >= deadline:
+                break
+            del self._buckets[key]
+            self.evicted += 1
+
+    def stats(self):
+        """获取限流器运行指标"""
+        return {"buckets": len(self._buckets), "allowed": self.allowed, "limited": self.limited, "evicted": self.evicted}
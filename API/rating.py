@@ -0,0 +1,68 @@
+import bisect
+
+DEFAULT_REQUIREMENT_TEXT = "还需收集 {count} 种茶叶"
+
+
+class RatingConfigError(ValueError):
+    """评级配置格式错误"""
+
+
+def _text(config, key, default):
+    value = config.get(key, default)
+    if not isinstance(value, str):
+        raise RatingConfigError(f"{key} 必须是字符串")
+    return value
+
+
+class RatingTiers:
+    def __init__(self, config):
+        """
+        由评级配置编译出的评级表：各等级按最低种类数排序，查询时二分查找
+
+        等级区间由相邻等级的 min_varieties 决定，max_varieties 仅作说明，不参与判断。
+
+        参数:
+            config: rating_config.json 的内容
+        """
+        ratings = config.get("ratings") if isinstance(config, dict) else None
+        if not isinstance(ratings, list) or not ratings:
+            raise RatingConfigError("缺少 ratings 列表")
+        tiers = []
+        for index, rating in enumerate(ratings, start=1):
+            try:
+                tiers.append((int(rating["min_varieties"]), str(rating["name"]), str(rating.get("description", ""))))
+            except (KeyError, TypeError, ValueError) as e:
+                raise RatingConfigError(f"第 {index} 个等级缺少 name 或 min_varieties 无效: {e}")
+        tiers.sort(key=lambda tier: tier[0])
+        self.thresholds = [tier[0] for tier in tiers]
+        if len(set(self.thresholds)) != len(self.thresholds):
+            raise RatingConfigError("存在 min_varieties 相同的等级")
+        self.names = [tier[1] for tier in tiers]
+        self.descriptions = [tier[2] for tier in tiers]
+        self.next_rating_text = _text(config, "next_rating_text", "下一等级")
+        self.max_rating_text = _text(config, "max_rating_text", "恭喜您达到最高等级！")
+        self.requirement_text = _text(config, "requirement_text", DEFAULT_REQUIREMENT_TEXT)
+        # 提前检查模板，避免无效的模板通过热加载后在每次查询时出错
+        try:
+            self.requirement_text.format(count=0)
+        except (AttributeError, IndexError, KeyError, TypeError, ValueError) as e:
+            raise RatingConfigError(f"requirement_text 只能使用 {{count}} 占位符: {e!r}")
+
+    def rate(self, varieties):
+        """
+        按收藏种类数评级
+
+        返回:
+            (等级名, 等级描述, 下一等级名, 升级还需的种类数)；未达到最低等级时等级名与描述为 None，
+            已是最高等级时下一等级名为 None
+        """
+        index = bisect.bisect_right(self.thresholds, varieties) - 1
+        name = self.names[index] if index >= 0 else None
+        description = self.descriptions[index] if index >= 0 else None
+        if index + 1 < len(self.thresholds):
+            return name, description, self.names[index + 1], self.thresholds[index + 1] - varieties
+        return name, description, None, 0
+
+    def requirement(self, count):
+        """升级要求文本"""
+        return self.requirement_text.format(count=count)
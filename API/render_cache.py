@@ -0,0 +1,61 @@
+import asyncio
+from collections import OrderedDict
+
+
+class RenderCache:
+    def __init__(self, max_entries=256):
+        """
+        渲染结果缓存：键中包含数据版本号（如背包版本、商品目录版本），内容变化后自然失效
+
+        同一个键的并发渲染只执行一次，其余请求等待同一结果；超过 max_entries 时淘汰最久未使用的结果。
+
+        参数:
+            max_entries: 最多缓存的渲染结果数
+        """
+        self.max_entries = max_entries
+        self._results = OrderedDict()
+        self._pending = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def get_or_render(self, key, render):
+        """
+        获取键对应的渲染结果，未缓存时调用 await render() 渲染
+
+        参数:
+            key: 可哈希的缓存键
+            render: 无参数的协程函数，返回渲染结果（如图片地址）
+        """
+        if key in self._results:
+            self._results.move_to_end(key)
+            self.hits += 1
+            return self._results[key]
+        pending = self._pending.get(key)
+        if pending is not None:
+            self.hits += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            result = await render()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # 没有其他等待者时避免 "exception was never retrieved" 警告
+            future.exception()
+            raise
+        finally:
+            self._pending.pop(key, None)
+        future.set_result(result)
+        self._results[key] = result
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+        return result
+
+    def stats(self):
+        """获取缓存命中情况"""
+        return {"entries": len(self._results), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,44 @@
+from collections import OrderedDict
+
+
+class ResponseCache:
+    def __init__(self, max_entries=512):
+        """
+        只读命令的回复缓存：键中包含回复所依赖数据的版本号，数据变化后旧回复自然不再命中
+
+        超过 max_entries 时淘汰最久未使用的回复；max_entries 为 0 时不缓存。
+
+        参数:
+            max_entries: 最多缓存的回复数
+        """
+        self.max_entries = max(int(max_entries), 0)
+        self._replies = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """获取键对应的回复，未缓存时返回 None"""
+        reply = self._replies.get(key)
+        if reply is None:
+            self.misses += 1
+            return None
+        self._replies.move_to_end(key)
+        self.hits += 1
+        return reply
+
+    def put(self, key, reply):
+        """缓存一条回复"""
+        if not self.max_entries:
+            return
+        self._replies[key] = reply
+        self._replies.move_to_end(key)
+        while len(self._replies) > self.max_entries:
+            self._replies.popitem(last=False)
+
+    def clear(self):
+        """丢弃全部回复"""
+        self._replies.clear()
+
+    def stats(self):
+        """获取缓存命中情况"""
+        return {"entries": len(self._replies), "hits": self.hits, "misses": self.misses}
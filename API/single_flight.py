@@ -0,0 +1,63 @@
+import asyncio
+import copy
+
+
+class CommandSingleFlight:
+    def __init__(self):
+        """
+        命令级请求合并：同一用户以相同参数重复发送的命令，在前一条仍在处理时不再重复执行
+
+        重复请求可以等待并共享前一条命令的回复（适合只读命令），也可以直接收到“处理中”提示（适合修改类命令）。
+        """
+        self._inflight = {}
+        # 运行指标
+        self.leaders = 0
+        self.shared = 0
+        self.rejected = 0
+
+    async def run(self, key, start, busy=None):
+        """
+        执行一条命令，或合并到正在处理的相同命令上
+
+        参数:
+            key: 可哈希的请求键，如 (用户ID, 命令名, 规范化后的参数)
+            start: 无参数函数，返回处理该命令的异步生成器
+            busy: 可选，重复请求到达时调用 busy() 生成提示并返回；为 None 时等待并共享原请求的回复
+
+        原请求异常结束或被取消时，等待中的重复请求不产生回复。
+        """
+        future = self._inflight.get(key)
+        if future is not None:
+            if busy is not None:
+                self.rejected += 1
+                yield busy()
+                return
+            self.shared += 1
+            await asyncio.wait([future])
+            if future.cancelled():
+                return
+            for result in future.result():
+                # 回复对象在发送流程中可能被修改，每个请求各用一份
+                yield copy.deepcopy(result)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        self.leaders += 1
+        results = []
+        try:
+            async for result in start():
+                if busy is None:
+                    # 发送前留一份副本，供等待中的重复请求使用
+                    results.append(copy.deepcopy(result))
+                yield result
+            future.set_result(results)
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+            if not future.done():
+                future.cancel()
+
+    def stats(self):
+        """获取请求合并运行指标"""
+        return {"in_flight": len(self._inflight), "leaders": self.leaders, "shared": self.shared, "rejected": self.rejected}
@@ -0,0 +1,206 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from .task_engine import TASK_CLAIMED, TASK_COMPLETED, TASK_IN_PROGRESS, TASK_STATUSES
+
+# 快速路径的 SQL 所针对的内置存储结构版本（PRAGMA user_version）；结构升级后需核对 SQL 再更新
+BUILTIN_SCHEMA_VERSION = 1
+
+# 约定的表结构：只有探测到数据库文件中存在包含这些列的表时，才对该表启用直连快速路径，
+# 否则调用方应回退到数据库插件提供的逐用户接口。列名一致并不能保证含义一致（如任务状态取值、
+# 商品显示ID的编号方式），因此只应对结构已确认的数据库文件探测，见 probe 的 schema_version
+SCHEMA = {
+    "users": ("user_id", "sign_in_count", "last_sign_in_date", "sign_in_coins"),
+    "economy": ("user_id", "economy"),
+    "backpack": ("id", "user_id", "item_name", "item_count", "item_type", "item_value"),
+    "tea_store": ("id", "tea_name", "quantity", "tea_type", "price", "description"),
+    "tasks": ("id", "user_id", "task_id", "task_name", "task_description", "task_progress",
+              "task_target", "reward", "status", "task_type"),
+}
+
+
+class SQLiteFastPath:
+    def __init__(self, db_file, timeout=5.0):
+        """
+        直接连接数据库文件执行批量/事务操作的快速路径
+
+        参数:
+            db_file: SQLite 数据库文件路径
+            timeout: 等待数据库锁的超时时间（秒）
+        """
+        self.db_file = db_file
+        self.timeout = timeout
+        self.tables = frozenset()
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def probe(self, schema_version=None):
+        """
+        探测数据库文件中符合约定结构的表，返回可启用快速路径的表名集合
+
+        参数:
+            schema_version: 可选，期望的 PRAGMA user_version；不一致时不启用任何表
+        """
+        tables = set()
+        if self.db_file and os.path.exists(self.db_file):
+            try:
+                conn = self.connection()
+                if schema_version is not None and conn.execute("PRAGMA user_version").fetchone()[0] != schema_version:
+                    self.tables = frozenset()
+                    return self.tables
+                for table, columns in SCHEMA.items():
+                    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+                    if existing and set(columns) <= existing:
+                        tables.add(table)
+                if "tasks" in tables and self._unknown_task_statuses(conn):
+                    # 任务状态取值与约定不同时，批量写入与重置会写出对方不认识的状态
+                    tables.discard("tasks")
+            except sqlite3.DatabaseError:
+                tables.clear()
+        self.tables = frozenset(tables)
+        return self.tables
+
+    @staticmethod
+    def _unknown_task_statuses(conn):
+        """tasks 表中不属于约定取值的状态"""
+        placeholders = ", ".join("?" * len(TASK_STATUSES))
+        return [row[0] for row in conn.execute(
+            f"SELECT DISTINCT status FROM tasks WHERE status NOT IN ({placeholders}) LIMIT 10", TASK_STATUSES)]
+
+    def supports(self, *tables):
+        """判断指定的表是否都可以走快速路径"""
+        return all(table in self.tables for table in tables)
+
+    def _require(self, *tables):
+        """写入前确认表已通过探测，未通过时拒绝写入，避免按约定结构写坏未知结构的表"""
+        missing = [table for table in tables if table not in self.tables]
+        if missing:
+            raise RuntimeError(f"表 {', '.join(missing)} 未通过结构探测，不能使用直连快速路径")
+
+    def connection(self):
+        """获取当前线程的数据库连接（每个线程一个连接，按需创建）"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+            conn.execute(f"PRAGMA busy_timeout = {int(self.timeout * 1000)}")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """开启一个写事务，正常退出时提交，发生异常时回滚"""
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def iter_rows(self, sql, params=(), chunk_size=500):
+        """逐批读取查询结果，内存占用与结果总量无关"""
+        cursor = self.connection().execute(sql, params)
+        try:
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            cursor.close()
+
+    def store_page(self, offset, limit):
+        """按实际ID顺序读取商店的一页商品，返回 (记录列表, 商品总数)"""
+        conn = self.connection()
+        total = conn.execute("SELECT COUNT(*) FROM tea_store").fetchone()[0]
+        rows = conn.execute(
+            "SELECT id, tea_name, quantity, tea_type, price, description FROM tea_store ORDER BY id LIMIT ? OFFSET ?",
+            (limit, offset),
+        ).fetchall()
+        return rows, total
+
+    def backpack_page(self, user_id, offset, limit):
+        """读取用户背包的一页物品，返回 (记录列表, 物品种类总数)"""
+        conn = self.connection()
+        total = conn.execute(
+            "SELECT COUNT(*) FROM backpack WHERE user_id = ? AND item_count > 0", (user_id,)
+        ).fetchone()[0]
+        rows = conn.execute(
+            "SELECT id, user_id, item_name, item_count, item_type, item_value FROM backpack "
+            "WHERE user_id = ? AND item_count > 0 ORDER BY id LIMIT ? OFFSET ?",
+            (user_id, limit, offset),
+        ).fetchall()
+        return rows, total
+
+    def add_economy_batch(self, deltas):
+        """
+        在一个事务中为多个用户累加金币
+
+        参数:
+            deltas: 用户ID -> 金币变化量 的字典
+        """
+        self._require("economy")
+        with self.transaction() as conn:
+            for user_id, delta in deltas.items():
+                cursor = conn.execute("UPDATE economy SET economy = economy + ? WHERE user_id = ?", (delta, user_id))
+                if cursor.rowcount == 0:
+                    conn.execute("INSERT INTO economy (user_id, economy) VALUES (?, ?)", (user_id, delta))
+
+    def update_task_progress_batch(self, updates):
+        """
+        在一个事务中批量写入任务进度
+
+        参数:
+            updates: [(用户ID, 任务ID, 进度, 是否完成), ...]
+        """
+        self._require("tasks")
+        with self.transaction() as conn:
+            conn.executemany(
+                "UPDATE tasks SET task_progress = ?, "
+                "status = CASE WHEN ? AND status != ? THEN ? ELSE status END "
+                "WHERE user_id = ? AND task_id = ?",
+                [(progress, 1 if completed else 0, TASK_CLAIMED, TASK_COMPLETED, user_id, task_id)
+                 for user_id, task_id, progress, completed in updates],
+            )
+
+    def insert_teas(self, teas):
+        """
+        在一个事务中批量上架商品，返回上架数量
+
+        参数:
+            teas: [(tea_name, quantity, tea_type, price, description), ...]
+        """
+        self._require("tea_store")
+        with self.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO tea_store (tea_name, quantity, tea_type, price, description) VALUES (?, ?, ?, ?, ?)",
+                teas,
+            )
+        return len(teas)
+
+    def reset_tasks(self, task_type):
+        """用一条语句重置所有用户指定类型任务的进度与状态，返回影响的行数"""
+        self._require("tasks")
+        with self.transaction() as conn:
+            return conn.execute(
+                "UPDATE tasks SET task_progress = 0, status = ? "
+                "WHERE task_type = ? AND (task_progress != 0 OR status != ?)",
+                (TASK_IN_PROGRESS, task_type, TASK_IN_PROGRESS),
+            ).rowcount
+
+    def close(self):
+        """关闭所有线程创建的连接"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
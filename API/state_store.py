@@ -0,0 +1,148 @@
+import os
+import sqlite3
+import threading
+
+
+class StateStore:
+    def __init__(self, db_file, timeout=5.0):
+        """
+        插件自有的小型状态库，保存按用户、按周期的轻量状态（如任务初始化日期）
+
+        与数据库插件的数据分开存放，表结构为 (scope, user_id) -> (period, value)。
+
+        参数:
+            db_file: SQLite 数据库文件路径，目录不存在时自动创建
+            timeout: 等待数据库锁的超时时间（秒）
+        """
+        os.makedirs(os.path.dirname(db_file) or ".", exist_ok=True)
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_file, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS user_state ("
+            "scope TEXT NOT NULL, user_id TEXT NOT NULL, period TEXT NOT NULL, value INTEGER NOT NULL DEFAULT 0, "
+            "PRIMARY KEY (scope, user_id))"
+        )
+        # 茶叶名称 -> 紧凑整数编号，用于按位记录茶叶种类
+        self._conn.execute("CREATE TABLE IF NOT EXISTS tea_ids (tea_name TEXT PRIMARY KEY, tea_id INTEGER NOT NULL UNIQUE)")
+
+    def get(self, scope, user_id):
+        """读取一条状态，返回 (period, value)，不存在时返回 None"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT period, value FROM user_state WHERE scope = ? AND user_id = ?", (scope, str(user_id))
+            ).fetchone()
+
+    def put(self, scope, user_id, period, value=0):
+        """写入（覆盖）一条状态"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO user_state (scope, user_id, period, value) VALUES (?, ?, ?, ?)",
+                (scope, str(user_id), period, value),
+            )
+
+    def put_many(self, scope, rows):
+        """
+        在一个事务中批量写入状态
+
+        参数:
+            rows: [(用户ID, 周期, 值), ...]
+        """
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO user_state (scope, user_id, period, value) VALUES (?, ?, ?, ?)",
+                    [(scope, str(user_id), period, value) for user_id, period, value in rows],
+                )
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def load_scope(self, scope):
+        """读取指定范围内的全部状态，返回 {用户ID: period}"""
+        with self._lock:
+            return dict(self._conn.execute("SELECT user_id, period FROM user_state WHERE scope = ?", (scope,)))
+
+    def load_entries(self, scope):
+        """读取指定范围内的全部状态，返回 [(用户ID, period, value), ...]"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT user_id, period, value FROM user_state WHERE scope = ?", (scope,)
+            ).fetchall()
+
+    def purge(self, scope, keep_period):
+        """删除指定范围内周期不等于 keep_period 的过期状态，返回删除条数"""
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM user_state WHERE scope = ? AND period != ?", (scope, keep_period)
+            ).rowcount
+
+    def load_tea_ids(self):
+        """读取全部茶叶编号，返回 {茶叶名称: 编号}"""
+        with self._lock:
+            return dict(self._conn.execute("SELECT tea_name, tea_id FROM tea_ids"))
+
+    def add_tea_id(self, tea_name, tea_id):
+        """保存一个新的茶叶编号"""
+        with self._lock:
+            self._conn.execute("INSERT OR IGNORE INTO tea_ids (tea_name, tea_id) VALUES (?, ?)", (tea_name, tea_id))
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+
+class PeriodStamps:
+    def __init__(self, store, scope):
+        """
+        按用户记录某项工作最近完成于哪个周期（如哪一天），内存与状态库各保存一份
+
+        参数:
+            store: StateStore 实例
+            scope: 状态范围名称
+        """
+        self.store = store
+        self.scope = scope
+        self._stamps = {}  # 用户ID -> 周期
+        self._period = None  # 最近一次记录的周期，周期切换时清空内存中的旧记录
+        self._lock = threading.Lock()
+
+    def is_current(self, user_id, period):
+        """仅检查内存，判断用户在该周期内是否已完成（不访问数据库，可在事件循环中调用）"""
+        with self._lock:
+            return self._stamps.get(user_id) == period
+
+    def check(self, user_id, period):
+        """判断用户在该周期内是否已完成，内存未命中时读取状态库（在数据库线程中调用）"""
+        if self.is_current(user_id, period):
+            return True
+        row = self.store.get(self.scope, user_id)
+        if row and row[0] == period:
+            self._remember(user_id, period)
+            return True
+        return False
+
+    def mark(self, user_id, period):
+        """记录用户在该周期内已完成（在数据库线程中调用）"""
+        self.store.put(self.scope, user_id, period)
+        self._remember(user_id, period)
+
+    def _remember(self, user_id, period):
+        with self._lock:
+            if period != self._period:
+                self._stamps.clear()
+                self._period = period
+            self._stamps[user_id] = period
+
+    def clear(self, user_id=None):
+        """丢弃内存中的记录（不影响状态库）"""
+        with self._lock:
+            if user_id is None:
+                self._stamps.clear()
+            else:
+                self._stamps.pop(user_id, None)
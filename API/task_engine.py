@@ -0,0 +1,282 @@
+import datetime
+import threading
+
+from .flush_loop import FlushLoop
+
+# 任务状态取值，与数据库插件 astrbot_plugin_furry_cgsjk 的 tasks.status 一致；
+# 直连快速路径与内置存储共用，探测数据库时会核对已有数据只使用这些取值
+TASK_IN_PROGRESS = "进行中"
+TASK_COMPLETED = "已完成"
+TASK_CLAIMED = "已领取"
+TASK_STATUSES = (TASK_IN_PROGRESS, TASK_COMPLETED, TASK_CLAIMED)
+
+# 领域事件
+TEA_BOUGHT = "tea_bought"
+TEA_DRUNK = "tea_drunk"
+SIGNED_IN = "signed_in"
+
+
+class TaskDefinition:
+    def __init__(self, task_id, name, description, target, reward, task_type, handlers):
+        """
+        任务定义：通过 handlers 订阅领域事件
+
+        参数:
+            task_id: 任务ID
+            name: 任务名称
+            description: 任务描述
+            target: 目标进度
+            reward: 奖励金币
+            task_type: 每日任务 / 每周任务 / 特殊任务
+            handlers: 事件名 -> 函数(当前进度, 事件数据) -> 新进度
+        """
+        self.task_id = task_id
+        self.name = name
+        self.description = description
+        self.target = target
+        self.reward = reward
+        self.task_type = task_type
+        self.handlers = handlers
+
+
+def _count(progress, payload):
+    return progress + payload.get("count", 1)
+
+
+def _count_distinct(progress, payload):
+    # 事件数据中的 distinct 表示这是当天首次出现的种类
+    return progress + 1 if payload.get("distinct", True) else progress
+
+
+# 默认任务
+DEFAULT_TASKS = (
+    TaskDefinition('daily_drink_tea', '品茶师', '品尝3种不同的茶叶', 3, 50, '每日任务', {TEA_DRUNK: _count_distinct}),
+    TaskDefinition('daily_buy_tea', '采购员', '购买茶叶2次', 2, 30, '每日任务', {TEA_BOUGHT: _count}),
+    TaskDefinition('weekly_collect_tea', '收藏家', '收集5种不同的茶叶', 5, 100, '每周任务',
+                   {TEA_BOUGHT: lambda progress, payload: max(progress, payload.get("varieties", 0))}),
+)
+
+
+class _TaskState:
+    __slots__ = ("progress", "target", "status", "dirty")
+
+    def __init__(self, progress, target, status):
+        self.progress = progress
+        self.target = target
+        self.status = status
+        self.dirty = False
+
+
+class TaskEngine:
+    def __init__(self, apply_updates, definitions=DEFAULT_TASKS, flush_interval_ms=1000, max_dirty=200, today=None):
+        """
+        事件驱动的任务进度引擎
+
+        任务定义订阅领域事件（买茶、喝茶、签到），进度保存在内存中的每用户状态里，
+        脏数据由后台协程批量写回存储。每位用户每天只在首次触发事件时读取一次任务表。
+
+        参数:
+            apply_updates: 同步函数，接收 [(用户ID, 任务ID, 进度, 是否完成), ...] 并批量写入存储；不能在一个事务中
+                           写入时，应把写入成功的记录从列表中移除，失败时只有仍留在列表中的记录会重新标记为待写回
+            definitions: 任务定义列表
+            flush_interval_ms: 批量写回间隔（毫秒）
+            max_dirty: 待写回的任务数达到该值时立即写回
+            today: 无参数函数，返回当前日期标识（如 PeriodClock 的日周期），默认使用系统本地日期
+        """
+        self.apply_updates = apply_updates
+        self.today = today or (lambda: datetime.date.today().isoformat())
+        self.definitions = {definition.task_id: definition for definition in definitions}
+        self.max_dirty = max(int(max_dirty), 1)
+        # 事件名 -> 订阅该事件的任务定义
+        self._subscriptions = {}
+        for definition in self.definitions.values():
+            for event in definition.handlers:
+                self._subscriptions.setdefault(event, []).append(definition)
+
+        self._lock = threading.Lock()
+        self._commit_lock = threading.Lock()
+        self._states = {}  # 用户ID -> (加载日期, 任务ID -> _TaskState)
+        self._dirty = {}  # (用户ID, 任务ID) -> _TaskState
+        self._flusher = FlushLoop(self.flush, max(flush_interval_ms, 1) / 1000, "task_flush")
+        # 运行指标
+        self.loads = 0
+        self.events = 0
+        self.flushes = 0
+        self.flushed_tasks = 0
+
+    def _load(self, user_id, db_task):
+        today = self.today()
+        with self._lock:
+            cached = self._states.get(user_id)
+            if cached and cached[0] == today:
+                return cached[1]
+        if cached:
+            # 跨天重新加载前先写回前一天的进度
+            self.flush_user(user_id, db_task)
+        tasks = {}
+        for row in db_task.get_user_tasks():
+            # id, user_id, task_id, task_name, task_description, task_progress, task_target, reward, status, task_type
+            task_id = row[2]
+            if task_id in self.definitions:
+                tasks[task_id] = _TaskState(row[5], row[6], row[8])
+        with self._lock:
+            cached = self._states.get(user_id)
+            if cached and cached[0] == today:
+                # 其他线程已经加载
+                return cached[1]
+            self._states[user_id] = (today, tasks)
+            self.loads += 1
+        return tasks
+
+    def emit(self, user_id, event, db_task, **payload):
+        """
+        分发一个领域事件，更新订阅了该事件的任务进度
+
+        参数:
+            user_id: 用户ID
+            event: 事件名
+            db_task: 用户的任务数据库接口，仅在首次加载任务状态时使用
+            payload: 事件数据
+        """
+        definitions = self._subscriptions.get(event)
+        if not definitions:
+            return
+        tasks = self._load(user_id, db_task)
+        wake = False
+        with self._lock:
+            self.events += 1
+            for definition in definitions:
+                state = tasks.get(definition.task_id)
+                if state is None or state.status in (TASK_COMPLETED, TASK_CLAIMED):
+                    continue
+                progress = min(definition.handlers[event](state.progress, payload), state.target)
+                if progress == state.progress:
+                    continue
+                state.progress = progress
+                if progress >= state.target:
+                    state.status = TASK_COMPLETED
+                state.dirty = True
+                self._dirty[(user_id, definition.task_id)] = state
+            wake = len(self._dirty) >= self.max_dirty
+        if wake:
+            self._flusher.wake()
+
+    def overlay(self, user_id, rows):
+        """用内存中的任务状态（可能尚未写回）覆盖任务表记录，返回新的记录列表"""
+        with self._lock:
+            cached = self._states.get(user_id)
+            if not cached:
+                return rows
+            tasks = cached[1]
+            result = []
+            for row in rows:
+                state = tasks.get(row[2])
+                if state is not None:
+                    row = tuple(row[:5]) + (state.progress, row[6], row[7], state.status) + tuple(row[9:])
+                result.append(row)
+            return result
+
+    def mark_claimed(self, user_id, task_id):
+        """任务奖励领取后同步内存状态"""
+        with self._lock:
+            cached = self._states.get(user_id)
+            if cached and task_id in cached[1]:
+                cached[1][task_id].status = TASK_CLAIMED
+
+    def invalidate(self, user_id, db_task):
+        """丢弃用户的任务状态（未写回的进度先写回），下次事件时重新加载"""
+        self.flush_user(user_id, db_task)
+        with self._lock:
+            self._states.pop(user_id, None)
+
+    def _take_dirty(self, user_id=None):
+        with self._lock:
+            keys = [key for key in self._dirty if user_id is None or key[0] == user_id]
+            updates = []
+            for key in keys:
+                state = self._dirty.pop(key)
+                state.dirty = False
+                updates.append((key[0], key[1], state.progress, state.status == TASK_COMPLETED, state))
+            return updates
+
+    def _restore_dirty(self, updates):
+        with self._lock:
+            for user_id, task_id, _, _, state in updates:
+                state.dirty = True
+                self._dirty.setdefault((user_id, task_id), state)
+
+    def flush(self):
+        """将所有待写回的任务进度批量写入存储（在数据库线程中调用）"""
+        with self._commit_lock:
+            updates = self._take_dirty()
+            if not updates:
+                return 0
+            self._apply(updates)
+            self.flushes += 1
+            self.flushed_tasks += len(updates)
+            return len(updates)
+
+    def _apply(self, updates):
+        pending = [update[:4] for update in updates]
+        try:
+            self.apply_updates(pending)
+        except BaseException:
+            # 只把尚未写入的记录重新标记为待写回
+            remaining = {(user_id, task_id) for user_id, task_id, _, _ in pending}
+            self._restore_dirty([update for update in updates if (update[0], update[1]) in remaining])
+            raise
+
+    def flush_user(self, user_id, db_task):
+        """通过用户自己的任务数据库接口立即写回该用户的进度（在数据库线程中调用）"""
+        with self._commit_lock:
+            updates = self._take_dirty(user_id)
+            written = 0
+            try:
+                for _, task_id, progress, completed, _ in updates:
+                    db_task.update_task_progress(task_id, progress)
+                    if completed:
+                        db_task.complete_task(task_id)
+                    written += 1
+            except BaseException:
+                self._restore_dirty(updates[written:])
+                raise
+            self.flushed_tasks += len(updates)
+            return len(updates)
+
+    def reset(self, apply):
+        """
+        先写回全部待写回的进度，再执行批量重置，最后丢弃所有用户的内存状态（在数据库线程中调用）
+
+        参数:
+            apply: 执行重置的同步函数，其返回值原样返回
+        """
+        with self._commit_lock:
+            updates = self._take_dirty()
+            if updates:
+                self._apply(updates)
+                self.flushes += 1
+                self.flushed_tasks += len(updates)
+            result = apply()
+            with self._lock:
+                self._states.clear()
+            return result
+
+    def start(self, executor):
+        """启动后台批量写回"""
+        self._flusher.start(executor)
+
+    async def close(self):
+        """停止后台写回并把剩余进度持久化"""
+        await self._flusher.close()
+
+    def stats(self):
+        """获取任务引擎运行指标"""
+        with self._lock:
+            return {
+                "users": len(self._states),
+                "dirty": len(self._dirty),
+                "loads": self.loads,
+                "events": self.events,
+                "flushes": self.flushes,
+                "flushed_tasks": self.flushed_tasks,
+            }
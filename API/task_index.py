@@ -0,0 +1,147 @@
+import difflib
+import threading
+from collections import OrderedDict
+
+# 每日随机任务名称的前缀
+CHALLENGE_PREFIXES = ("今日挑战: ", "今日挑战:", "今日挑战：")
+
+
+def normalize_task_name(text):
+    """规范化任务名称：去掉随机任务前缀、空白并转为小写"""
+    text = text.strip()
+    for prefix in CHALLENGE_PREFIXES:
+        if text.startswith(prefix):
+            text = text[len(prefix):]
+            break
+    return "".join(text.split()).lower()
+
+
+class _TrieNode:
+    __slots__ = ("children", "task_ids")
+
+    def __init__(self):
+        self.children = {}
+        self.task_ids = set()  # 经过该节点的任务
+
+
+class _Trie:
+    def __init__(self):
+        self.root = _TrieNode()
+
+    def insert(self, key, task_id):
+        node = self.root
+        for char in key:
+            node = node.children.setdefault(char, _TrieNode())
+            node.task_ids.add(task_id)
+
+    def walk(self, key):
+        """沿 key 向下查找，返回 (匹配的字符数, 最深节点上的任务集合)"""
+        node = self.root
+        depth = 0
+        for char in key:
+            child = node.children.get(char)
+            if child is None:
+                break
+            node = child
+            depth += 1
+        return depth, node.task_ids
+
+
+class TaskIndex:
+    def __init__(self, rows):
+        """
+        单个用户的任务名称索引
+
+        精确名称与描述使用哈希表；规范化后的别名（去掉“今日挑战: ”前缀等）单独建表；
+        部分输入通过前缀树匹配，随机任务另建后缀树以兼容只输入名称结尾的写法。
+
+        参数:
+            rows: get_user_tasks 返回的任务记录
+        """
+        self.names = {}  # 任务名称 -> 任务ID
+        self.descriptions = {}  # 任务描述 -> 任务ID
+        self.aliases = {}  # 规范化名称/描述 -> 任务ID
+        self.labels = {}  # 任务ID -> 规范化名称，用于生成建议
+        self._prefixes = _Trie()
+        self._suffixes = _Trie()
+        for row in rows:
+            # id, user_id, task_id, task_name, task_description, task_progress, task_target, reward, status, task_type
+            task_id, task_name, task_description = row[2], row[3], row[4]
+            self.names.setdefault(task_name, task_id)
+            self.descriptions.setdefault(task_description, task_id)
+            alias = normalize_task_name(task_name)
+            self.labels[task_id] = alias
+            for key in (alias, normalize_task_name(task_description)):
+                if key:
+                    self.aliases.setdefault(key, task_id)
+                    self._prefixes.insert(key, task_id)
+            if task_name.startswith(CHALLENGE_PREFIXES):
+                self._suffixes.insert(alias[::-1], task_id)
+
+    def resolve(self, text):
+        """
+        按 精确名称 > 描述 > 规范化别名 > 唯一前缀 > 随机任务唯一后缀 的顺序解析任务，未找到时返回 None
+        """
+        task_id = self.names.get(text)
+        if task_id is None:
+            task_id = self.descriptions.get(text)
+        if task_id is not None:
+            return task_id
+        key = normalize_task_name(text)
+        if not key:
+            return None
+        task_id = self.aliases.get(key)
+        if task_id is not None:
+            return task_id
+        for trie, probe in ((self._prefixes, key), (self._suffixes, key[::-1])):
+            depth, task_ids = trie.walk(probe)
+            if depth == len(probe) and len(task_ids) == 1:
+                return next(iter(task_ids))
+        return None
+
+    def suggest(self, text, limit=3):
+        """返回与输入最接近的任务ID列表，按相似度从高到低排序"""
+        key = normalize_task_name(text)
+        _, shared = self._prefixes.walk(key)
+        scored = []
+        for task_id, label in self.labels.items():
+            score = difflib.SequenceMatcher(None, key, label).ratio()
+            if task_id in shared:
+                score += 1
+            scored.append((score, task_id))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [task_id for score, task_id in scored[:limit] if score > 0]
+
+
+class TaskIndexCache:
+    def __init__(self, max_users=10000):
+        """
+        按用户缓存任务名称索引，用户的任务集合（任务ID、名称、描述）变化时重建
+
+        参数:
+            max_users: 最多缓存的用户数
+        """
+        self.max_users = max_users
+        self._indexes = OrderedDict()  # 用户ID -> (任务签名, TaskIndex)
+        self._lock = threading.Lock()
+        # 运行指标
+        self.hits = 0
+        self.builds = 0
+
+    def get(self, user_id, rows):
+        """获取与当前任务记录一致的索引"""
+        signature = tuple((row[2], row[3], row[4]) for row in rows)
+        with self._lock:
+            cached = self._indexes.get(user_id)
+            if cached and cached[0] == signature:
+                self._indexes.move_to_end(user_id)
+                self.hits += 1
+                return cached[1]
+        index = TaskIndex(rows)
+        with self._lock:
+            self._indexes[user_id] = (signature, index)
+            self._indexes.move_to_end(user_id)
+            while len(self._indexes) > self.max_users:
+                self._indexes.popitem(last=False)
+            self.builds += 1
+        return index
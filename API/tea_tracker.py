@@ -0,0 +1,80 @@
+import threading
+
+
+class DistinctTeaTracker:
+    def __init__(self, store, scope="drunk_teas"):
+        """
+        按用户记录当天品尝过的茶叶种类，用于“品尝N种不同的茶叶”类任务
+
+        茶叶名称被编号为紧凑的整数，每位用户当天的记录是一个整数位图（第 i 位表示编号为 i 的茶叶），
+        判断与记录都是 O(1)。每天的第一条记录会覆盖前一天的位图；只有出现新种类时才写入状态库。
+
+        参数:
+            store: StateStore 实例
+            scope: 状态范围名称
+        """
+        self.store = store
+        self.scope = scope
+        self._lock = threading.Lock()
+        self._tea_ids = store.load_tea_ids()  # 茶叶名称 -> 编号
+        self._next_id = max(self._tea_ids.values(), default=-1) + 1
+        self._masks = {}  # 用户ID -> 当天位图
+        self._day = None  # 内存中位图所属的日期，日期切换时清空
+
+    def _tea_bit(self, tea_name):
+        with self._lock:
+            tea_id = self._tea_ids.get(tea_name)
+            if tea_id is None:
+                tea_id = self._tea_ids[tea_name] = self._next_id
+                self._next_id += 1
+                created = True
+            else:
+                created = False
+        if created:
+            self.store.add_tea_id(tea_name, tea_id)
+        return 1 << tea_id
+
+    def _mask(self, user_id, day):
+        with self._lock:
+            if day != self._day:
+                self._masks.clear()
+                self._day = day
+            mask = self._masks.get(user_id)
+        if mask is None:
+            row = self.store.get(self.scope, user_id)
+            mask = _decode(row[1]) if row and row[0] == day else 0
+            with self._lock:
+                mask = self._masks.setdefault(user_id, mask)
+        return mask
+
+    def add(self, user_id, tea_name, day):
+        """
+        记录用户当天品尝了一种茶叶（在数据库线程中调用）
+
+        返回:
+            这是否是用户当天第一次品尝该种茶叶
+        """
+        bit = self._tea_bit(tea_name)
+        mask = self._mask(user_id, day)
+        if mask & bit:
+            return False
+        with self._lock:
+            mask = self._masks.get(user_id, mask) | bit
+            self._masks[user_id] = mask
+        self.store.put(self.scope, user_id, day, _encode(mask))
+        return True
+
+    def count(self, user_id, day):
+        """获取用户当天品尝过的茶叶种类数"""
+        return bin(self._mask(user_id, day)).count("1")
+
+
+def _encode(mask):
+    # 位图可能超过 64 位整数范围，以小端字节串保存
+    return mask.to_bytes(max(1, (mask.bit_length() + 7) // 8), "little")
+
+
+def _decode(value):
+    if isinstance(value, bytes):
+        return int.from_bytes(value, "little")
+    return int(value or 0)
@@ -0,0 +1,74 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+
+class _LockEntry:
+    __slots__ = ("lock", "users", "last_used")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0
+        self.last_used = time.monotonic()
+
+
+class KeyedLockManager:
+    def __init__(self, shards=16, idle_seconds=60):
+        """
+        按键（用户ID）串行化的异步锁管理器
+
+        同一用户的修改类命令依次执行，不同用户之间互不等待。锁在首次使用时创建，
+        空闲超过 idle_seconds 后被清理；清理按分片增量进行，每次加锁最多扫描一个分片。
+
+        参数:
+            shards: 分片数量
+            idle_seconds: 锁空闲多久后可被清理（秒）
+        """
+        self._shards = [dict() for _ in range(max(1, int(shards)))]
+        self.idle_seconds = idle_seconds
+        self._sweep_cursor = 0
+        # 运行指标
+        self.acquisitions = 0
+        self.contended = 0
+        self.evicted = 0
+
+    def _shard(self, key):
+        return self._shards[hash(key) % len(self._shards)]
+
+    @asynccontextmanager
+    async def hold(self, key):
+        """获取指定键的锁，with 块结束后释放"""
+        shard = self._shard(key)
+        entry = shard.get(key)
+        if entry is None:
+            entry = shard[key] = _LockEntry()
+        entry.users += 1
+        self.acquisitions += 1
+        if entry.lock.locked():
+            self.contended += 1
+        try:
+            async with entry.lock:
+                yield
+        finally:
+            entry.users -= 1
+            entry.last_used = time.monotonic()
+            self._sweep_one()
+
+    def _sweep_one(self):
+        """清理一个分片中的空闲锁"""
+        shard = self._shards[self._sweep_cursor]
+        self._sweep_cursor = (self._sweep_cursor + 1) % len(self._shards)
+        deadline = time.monotonic() - self.idle_seconds
+        idle = [key for key, entry in shard.items() if entry.users == 0 and entry.last_used < deadline]
+        for key in idle:
+            del shard[key]
+        self.evicted += len(idle)
+
+    def stats(self):
+        """获取锁管理器运行指标"""
+        return {
+            "active": sum(len(shard) for shard in self._shards),
+            "acquisitions": self.acquisitions,
+            "contended": self.contended,
+            "evicted": self.evicted,
+        }
@@ -2,8 +2,15 @@ import time
 from datetime import datetime, timedelta
 import calendar
 
+DAY_SECONDS = 86400
+LUNAR_CYCLE_DAYS = 29.53  # 近似朔望月周期
+_EPOCH = datetime(1970, 1, 1)
+_MOON_REFERENCE_DAY = (datetime(2024, 1, 1) - _EPOCH).days  # 月相估算的起点（以 1970-01-01 起的天数计）
+WEEKDAYS = ["星期一", "星期二", "星期三", "星期四", "星期五", "星期六", "星期日"]
+
+
 class VirtualClock:
-    def __init__(self, start_real_time=None, start_virtual_time=None, time_ratio=12):
+    def __init__(self, start_real_time=None, start_virtual_time=None, time_ratio=12, resolution=1.0):
         """
         初始化虚拟时钟
         
@@ -11,12 +18,19 @@ class VirtualClock:
             start_real_time: 真实世界的参考时间(datetime对象)，默认为程序启动时间
             start_virtual_time: 虚拟时间的起始时间(datetime对象)，默认为程序启动时间
             time_ratio: 虚拟时间相对于真实时间的流逝比例，默认为12 (2小时=1虚拟天)
+            resolution: 时钟数据的刷新间隔（真实秒），同一间隔内的 get_virtual_clock_data 复用同一份结果
         """
         self.real_start = start_real_time if start_real_time else datetime.now()
         self.virtual_start = start_virtual_time if start_virtual_time else self.real_start
         
         # 时间流逝比例: 真实时间2小时 = 虚拟时间1天
         self.time_ratio = time_ratio  # 虚拟时间速度是真实时间的12倍 (24h/2h=12)
+        self.resolution = max(float(resolution), 0.001)
+        # 批量计算使用的常量：真实起点的时间戳、虚拟起点距 1970-01-01 的秒数
+        self._real_start_ts = self.real_start.timestamp()
+        self._virtual_start_seconds = (self.virtual_start - _EPOCH).total_seconds()
+        self._tick = None
+        self._snapshot = None
 
         self.moon_phases = {
             0: ("Moon-full.png", "满月"),
@@ -29,12 +43,17 @@ class VirtualClock:
             7: ("Moon-8.png", "盈凸月")
         }
 
-    def get_virtual_time(self):
-        """获取当前的虚拟时间"""
-        real_elapsed = datetime.now() - self.real_start
+    def get_virtual_time(self, real_now=None):
+        """获取当前（或真实时间 real_now 对应）的虚拟时间"""
+        real_elapsed = (real_now or datetime.now()) - self.real_start
         virtual_elapsed = real_elapsed * self.time_ratio
         return self.virtual_start + virtual_elapsed
 
+    def virtual_seconds(self, real_timestamp=None):
+        """当前（或真实时间戳 real_timestamp 对应）的虚拟时间距 1970-01-01 00:00:00 的秒数，不创建 datetime"""
+        real = time.time() if real_timestamp is None else real_timestamp
+        return self._virtual_start_seconds + (real - self._real_start_ts) * self.time_ratio
+
     def get_moon_phase(self, date):
         """
         计算给定日期的月相。使用简单的基于日期的估算方法。
@@ -46,14 +65,20 @@ class VirtualClock:
         返回:
             (图像文件名, 月相名称) 
         """
-        days_into_cycle = (date - datetime(2024,1,1)).days % 29.53  # 近似朔望月周期
-        phase_index = int(days_into_cycle / (29.53 / 8)) % 8
-        return self.moon_phases[phase_index]
+        return self.moon_phases[self.moon_phase_index((date - _EPOCH).days)]
+
+    @staticmethod
+    def moon_phase_index(epoch_day):
+        """由 1970-01-01 起的天数估算月相序号（0~7）"""
+        days_into_cycle = (epoch_day - _MOON_REFERENCE_DAY) % LUNAR_CYCLE_DAYS
+        return int(days_into_cycle / (LUNAR_CYCLE_DAYS / 8)) % 8
 
     def get_virtual_clock_data(self):
         """
         获取当前的虚拟时钟数据，包括时间、日期、月相信息。
 
+        同一个 resolution 间隔内只计算一次，之后返回该结果的副本。
+
         返回：
             一个字典，包含以下键：
             - real_time (str): 真实时间，格式为 '%Y-%m-%d %H:%M:%S'
@@ -66,11 +91,19 @@ class VirtualClock:
             - moon_phase_image (str): 月相图像文件名
             - moon_phase_name (str): 月相名称
         """
-        virtual_now = self.get_virtual_time()
+        tick = int(time.time() // self.resolution)
+        if tick != self._tick:
+            self._snapshot = self._compute_clock_data()
+            self._tick = tick
+        return dict(self._snapshot)
+
+    def _compute_clock_data(self):
+        # 真实时间只取一次，虚拟时间由同一时刻推算
         real_now = datetime.now()
+        virtual_now = self.get_virtual_time(real_now)
 
         # 使用中文星期几
-        weekday_chinese = ["星期一", "星期二", "星期三", "星期四", "星期五", "星期六", "星期日"][virtual_now.weekday()]
+        weekday_chinese = WEEKDAYS[virtual_now.weekday()]
 
         moon_phase_image, moon_phase_name = self.get_moon_phase(virtual_now)
 
@@ -88,6 +121,54 @@ class VirtualClock:
         }
 
 
+    def batch(self, timestamps):
+        """
+        批量计算一组真实时间戳（秒）对应的虚拟时间信息，用于排期和大量事件日志的统计
+
+        安装了 NumPy 时按数组整体计算，否则逐个计算，两者结果相同。
+
+        参数:
+            timestamps: 真实时间戳序列（time.time() 形式）
+
+        返回:
+            字典，每项与输入等长（NumPy 可用时为数组，否则为列表）：
+            - virtual_seconds: 虚拟时间距 1970-01-01 00:00:00 的秒数
+            - day_number: 虚拟日期是第几天（与 get_virtual_clock_data 相同）
+            - seconds_of_day: 虚拟时间在当天的秒数（0~86399）
+            - weekday: 虚拟星期几（0 为星期一）
+            - moon_phase: 月相序号（0~7，对应 moon_phases）
+        """
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+        if np is None:
+            return self._batch_python(timestamps)
+
+        real = np.asarray(timestamps, dtype=np.float64)
+        virtual = self._virtual_start_seconds + (real - self._real_start_ts) * self.time_ratio
+        epoch_day = np.floor_divide(virtual, DAY_SECONDS)
+        days_into_cycle = np.mod(epoch_day - _MOON_REFERENCE_DAY, LUNAR_CYCLE_DAYS)
+        return {
+            "virtual_seconds": virtual,
+            "day_number": np.floor_divide(virtual - self._virtual_start_seconds, DAY_SECONDS).astype(np.int64) + 1,
+            "seconds_of_day": np.mod(virtual, DAY_SECONDS),
+            "weekday": np.mod(epoch_day + 3, 7).astype(np.int64),  # 1970-01-01 是星期四
+            "moon_phase": np.mod(np.floor(days_into_cycle / (LUNAR_CYCLE_DAYS / 8)), 8).astype(np.int64),
+        }
+
+    def _batch_python(self, timestamps):
+        result = {"virtual_seconds": [], "day_number": [], "seconds_of_day": [], "weekday": [], "moon_phase": []}
+        for real in timestamps:
+            virtual = self._virtual_start_seconds + (real - self._real_start_ts) * self.time_ratio
+            epoch_day = int(virtual // DAY_SECONDS)
+            result["virtual_seconds"].append(virtual)
+            result["day_number"].append(int((virtual - self._virtual_start_seconds) // DAY_SECONDS) + 1)
+            result["seconds_of_day"].append(virtual % DAY_SECONDS)
+            result["weekday"].append((epoch_day + 3) % 7)  # 1970-01-01 是星期四
+            result["moon_phase"].append(self.moon_phase_index(epoch_day))
+        return result
+
     def run_clock(self, duration=10, interval=1):
         """运行虚拟时钟一段时间，并返回数据列表。
 
@@ -139,3 +220,25 @@ if __name__ == "__main__":
     # 运行虚拟时钟一段时间并获取数据
     # clock_data_list = clock.run_clock(duration=5, interval=0.5) #运行5秒，每隔0.5秒返回一次数据
     # print(clock_data_list)
+
+    # 批量计算：10 万个真实时间戳，与逐个用 datetime 计算的结果对比
+    import random
+    base = start_real.timestamp()
+    stamps = [base + random.uniform(0, 30 * DAY_SECONDS) for _ in range(100000)]
+    clock.batch(stamps[:1])  # 预先导入 NumPy，不计入耗时
+    started = time.perf_counter()
+    batch = clock.batch(stamps)
+    batch_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    expected = []
+    for stamp in stamps:
+        virtual_now = clock.get_virtual_time(datetime.fromtimestamp(stamp))
+        expected.append(((virtual_now - clock.virtual_start).days + 1, WEEKDAYS[virtual_now.weekday()],
+                         clock.get_moon_phase(virtual_now)[1]))
+    loop_ms = (time.perf_counter() - started) * 1000
+    matched = sum(
+        1 for i, (day_number, weekday, moon) in enumerate(expected)
+        if batch["day_number"][i] == day_number and WEEKDAYS[batch["weekday"][i]] == weekday
+        and clock.moon_phases[batch["moon_phase"][i]][1] == moon
+    )
+    print(f"批量计算 {len(stamps)} 个时间戳: {batch_ms:.1f}ms，逐个计算: {loop_ms:.1f}ms，结果一致 {matched}/{len(stamps)}")
@@ -12,6 +12,31 @@ sys.path.append(os.path.dirname(__file__))
 # 使用绝对导入方式导入API模块
 from API.SignIn import create_check_in_card
 from API.virtual_time import VirtualClock
+from API.async_db import AsyncDatabase
+from API.economy_ledger import EconomyLedger
+from API.sqlite_fastpath import BUILTIN_SCHEMA_VERSION, SQLiteFastPath
+from API.purchase import PurchaseEngine
+from API.flash_sale import FlashSale
+from API.command_parser import CommandParser, CommandArgumentError
+from API.pagination import GRID_PAGE_SIZE, Page, page_bounds, page_size, paginate, render_page, truncate
+from API.render_cache import RenderCache
+from API.rate_limiter import DEFAULT_COSTS, BucketSpec, RateLimiter
+from API.response_cache import ResponseCache
+from API.single_flight import CommandSingleFlight
+from API.rating import RatingTiers
+from API.config_manager import ConfigManager, parse_admins
+from API.business_hours import DEFAULT_WINDOWS, BusinessHours
+from API.data_transfer import DataImporter, DataTransferError, TABLES as TRANSFER_TABLES, export_rows, write_export
+from API.user_locks import KeyedLockManager
+from API.backpack_stats import BackpackAggregates
+from API.task_engine import TaskEngine, DEFAULT_TASKS, TEA_BOUGHT, TEA_DRUNK, SIGNED_IN
+from API.state_store import StateStore, PeriodStamps
+from API.task_index import TaskIndexCache
+from API.tea_tracker import DistinctTeaTracker
+from API.maintenance import PeriodClock, PeriodicResetJob
+from API.leaderboard import Leaderboard, DisplayNames, SignInStreaks
+from API.builtin_db import BuiltinStorage
+from API.catalogue import CatalogueIndex, CatalogueImportError, parse_catalogue, validate_catalogue
 
 
 
@@ -26,6 +51,8 @@ import json
 import time
 import random
 import re
+import functools
+from contextlib import ExitStack
 from typing import Optional, Dict, Any
 
 
@@ -62,20 +89,25 @@ TMPL = '''
 .inventory-item strong {
     font-size: 36px; /* Set font size for bold text */
 }
+
+/* inventory-title / inventory-footer classes: title above and page info below the grid */
+.inventory-title, .inventory-footer {
+    font-size: 48px; /* Match the inventory font size */
+    margin: 10px; /* Set spacing around the title and footer */
+}
 </style>
 
+<h1 class="inventory-title">{{ title }}</h1>
 <div class="inventory">
 {% for item in items %}  <!-- Loop through each item in the items list -->
     <div class="inventory-item"> <!-- Each item slot -->
-        <p><strong>ID:</strong> {{ item.id }}</p> <!-- Display item ID -->
-        <p><strong>UserId:</strong> {{ item.user_id }}</p> <!-- Display item UserId -->
-        <p><strong>Item Name:</strong> {{ item.item_name }}</p> <!-- Display item name -->
-        <p><strong>Item Count:</strong> {{ item.item_count }}</p> <!-- Display item count -->
-        <p><strong>Item Type:</strong> {{ item.item_type }}</p> <!-- Display item type -->
-        <p><strong>Item Value:</strong> {{ item.item_value }}</p> <!-- Display item value -->
+    {% for label, value in item %}
+        <p><strong>{{ label }}:</strong> {{ value }}</p> <!-- Display one field of the item -->
+    {% endfor %}
     </div>
 {% endfor %} <!-- End loop -->
 </div>
+{% if footer %}<p class="inventory-footer">{{ footer }}</p>{% endif %}
 '''
 
 def get_formatted_time():
@@ -164,6 +196,25 @@ async def download_image(user_id, PP_PATH, max_retries=3):
     return False  # 下载失败，返回 False
 
 
+def single_flight(command, share=True):
+    """
+    命令级请求合并装饰器：同一用户以相同参数重复发送的命令在前一条处理完之前不会再次执行
+
+    参数:
+        command: 命令名，与参数文本一起组成请求键
+        share: True 时重复请求共享前一条的回复（只读命令），False 时回复“处理中”提示（修改类命令）
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        async def wrapper(self, event, *args, **kwargs):
+            key = (event.get_sender_id(), command, self.commands.arguments(event, command))
+            busy = None if share else (lambda: event.plain_result("相同的指令正在处理中，请稍候~"))
+            async for result in self.single_flight.run(key, lambda: handler(self, event, *args, **kwargs), busy):
+                yield result
+        return wrapper
+    return decorator
+
+
 class TeaHousePlugin(Star):
     # 插件元数据
     namespace = "furryhm"
@@ -192,60 +243,72 @@ class TeaHousePlugin(Star):
         self.database_plugin_activated = False
         self.database_plugin_config = None
         self.database_plugin = None
-        # 管理员配置文件路径
+        self.database_plugin_version = None
+        self.builtin_storage = None
+        # 管理员与评级配置文件路径
         self.admin_config_path = os.path.join(self.PLUGIN_DIR, "admins.json")
-        self.admins = self._load_admins()
-        # 评级配置文件路径
         self.rating_config_path = os.path.join(self.PLUGIN_DIR, "rating_config.json")
-        self.rating_config = self._load_rating_config()
+        # 热加载的配置：管理员集合（frozenset）与编译后的评级表，文件修改后无需重启即可生效
+        self.config = ConfigManager()
+        self.config.watch("admins", self.admin_config_path, parse_admins, {"admins": []})
+        self.config.watch("rating", self.rating_config_path, RatingTiers, self._get_default_rating_config())
+        # 插件运行配置文件路径
+        self.plugin_config_path = os.path.join(self.PLUGIN_DIR, "teahouse_config.json")
+        self.plugin_config = self._load_plugin_config()
+        # 数据库异步门面、直连快速路径与金币写后缓冲，在数据库插件加载后初始化
+        self.db = None
+        self.fastpath = None
+        self.economy_ledger = None
+        self.purchase_engine = None
+        self.flash_sale = None
+        self.task_engine = None
+        self.reset_job = None
+        # 判断日/周边界的时钟，任务重置、每日任务初始化、品茶记录与任务引擎共用
+        self.period_clock = None
+        # 预编译的命令参数解析器
+        self.commands = CommandParser()
+        # 同一用户的修改类命令串行执行，只读命令不加锁
+        self.user_locks = KeyedLockManager()
+        # 排行榜：金币、连续签到天数、收藏种类数，随入账/购买/签到/背包变化增量维护
+        self.leaderboards = {
+            "coins": Leaderboard("富豪榜"),
+            "sign_in": Leaderboard("连续签到榜"),
+            "collection": Leaderboard("收藏榜"),
+        }
+        # 商店商品目录索引，上下架后重建、购买和补货时更新库存
+        self.catalogue = CatalogueIndex()
+        # 背包/商店图片缓存，键中包含背包版本或商品目录版本
+        self.render_cache = RenderCache()
+        # 只读命令的回复缓存，键中包含商品目录、背包、余额的版本号
+        self.response_cache = ResponseCache(self.plugin_config.get("response_cache_size", 512))
+        # 按用户、群、全局限流，防止个别用户刷屏占满渲染和数据库资源
+        self.rate_limiter = self._create_rate_limiter()
+        self._rate_limit_replies = {}
+        # 同一用户重复发送的相同命令只执行一次
+        self.single_flight = CommandSingleFlight()
+        # 背包聚合数据（种类数、总数量、总价值），随背包增减增量维护
+        self.backpack_stats = BackpackAggregates(
+            listener=self._update_collection_rank,
+            on_reset=lambda: self.leaderboards["collection"].rebuild(()),
+        )
+        # 插件自有状态库；任务每位用户每天只初始化一次
+        self.state_store = StateStore(os.path.join(self.DATA_DIR, 'teahouse', 'state.db'))
+        # 茶馆虚拟时钟（营业时段与虚拟时间模式的任务重置共用）与预先生成的营业时段倍率表
+        self.virtual_clock = self._create_virtual_clock()
+        self.business_hours = self._create_business_hours()
+        self.task_stamps = PeriodStamps(self.state_store, "tasks_initialized")
+        # 排行榜显示的用户昵称
+        self.display_names = DisplayNames(self.state_store)
+        # 连续签到天数（数据库插件只记录累计签到天数）
+        self.sign_in_streaks = SignInStreaks(self.state_store, self.leaderboards["sign_in"])
+        # 领取奖励使用的任务名称索引
+        self.task_indexes = TaskIndexCache()
+        # 每位用户当天品尝过的茶叶种类
+        self.drunk_teas = DistinctTeaTracker(self.state_store)
+        # 玩家数据导出/导入目录
+        self.EXPORT_PATH = os.path.join(self.DATA_DIR, 'teahouse', 'exports')
+        self.data_transfer_running = False
         
-    def _load_admins(self):
-        """加载管理员配置"""
-        if os.path.exists(self.admin_config_path):
-            try:
-                with open(self.admin_config_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    return data.get("admins", [])
-            except Exception as e:
-                logger.error(f"加载管理员配置失败: {e}")
-                return []
-        else:
-            # 创建默认配置文件
-            default_admins = []
-            self._save_admins(default_admins)
-            return default_admins
-    
-    def _save_admins(self, admins):
-        """保存管理员配置"""
-        try:
-            with open(self.admin_config_path, 'w', encoding='utf-8') as f:
-                json.dump({"admins": admins}, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            logger.error(f"保存管理员配置失败: {e}")
-    
-    def _load_rating_config(self):
-        """加载评级配置"""
-        if os.path.exists(self.rating_config_path):
-            try:
-                with open(self.rating_config_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception as e:
-                logger.error(f"加载评级配置失败: {e}")
-                return self._get_default_rating_config()
-        else:
-            # 创建默认配置文件
-            default_config = self._get_default_rating_config()
-            self._save_rating_config(default_config)
-            return default_config
-    
-    def _save_rating_config(self, config):
-        """保存评级配置"""
-        try:
-            with open(self.rating_config_path, 'w', encoding='utf-8') as f:
-                json.dump(config, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            logger.error(f"保存评级配置失败: {e}")
-    
     def _get_default_rating_config(self):
         """获取默认评级配置"""
         return {
@@ -257,13 +320,150 @@ class TeaHousePlugin(Star):
                 {"name": "普洱宗师", "min_varieties": 13, "max_varieties": 999, "description": "茶道宗师，收藏丰富，令人仰慕！"}
             ],
             "next_rating_text": "下一等级",
-            "max_rating_text": "恭喜您达到最高等级！"
+            "max_rating_text": "恭喜您达到最高等级！",
+            "requirement_text": "还需收集 {count} 种茶叶"
         }
     
+    def _load_plugin_config(self):
+        """加载插件运行配置，缺失的配置项使用默认值补全"""
+        config = self._get_default_plugin_config()
+        if os.path.exists(self.plugin_config_path):
+            try:
+                with open(self.plugin_config_path, 'r', encoding='utf-8') as f:
+                    config.update(json.load(f))
+            except Exception as e:
+                logger.error(f"加载插件配置失败: {e}")
+        else:
+            # 创建默认配置文件
+            self._save_plugin_config(config)
+        return config
+
+    def _save_plugin_config(self, config):
+        """保存插件运行配置"""
+        try:
+            with open(self.plugin_config_path, 'w', encoding='utf-8') as f:
+                json.dump(config, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            logger.error(f"保存插件配置失败: {e}")
+
+    def _get_default_plugin_config(self):
+        """获取默认插件运行配置"""
+        return {
+            "db_pool_workers": 4,  # 数据库线程池工作线程数
+            "db_max_pending": 64,  # 同时排队/执行的数据库调用上限
+            "economy_flush_interval_ms": 200,  # 金币入账最长缓冲时间（毫秒）
+            "economy_flush_max_entries": 100,  # 金币入账累积条数达到该值时立即写入
+            "task_flush_interval_ms": 1000,  # 任务进度最长缓冲时间（毫秒）
+            "task_flush_max_dirty": 200,  # 待写回的任务数达到该值时立即写入
+            "task_reset_clock": "real",  # 每日/每周任务重置使用的时钟：real 真实时间，virtual 虚拟时间
+            "task_reset_timezone": "",  # real 模式下判断日/周边界的时区，为空时使用系统时区
+            "fastpath_plugin_versions": [],  # 已核对表结构、允许直连其数据库文件的数据库插件版本，内置存储不受此限制
+            "storage_backend": "auto",  # 存储后端：auto 优先数据库插件、不可用时使用内置存储，external 仅数据库插件，builtin 仅内置存储
+            "flash_sale_batch_size": 32,  # 限时抢购每批最多分配的购买请求数
+            "flash_sale_batch_window_ms": 10,  # 限时抢购凑批的最长等待时间（毫秒）
+            "data_import_chunk_size": 1000,  # 导入玩家数据时每个事务写入的记录数
+            "listing_page_size": 10,  # 商店、背包、任务列表每页显示的条数（最多 50）
+            "response_cache_size": 512,  # 帮助、商店、茶叶评级、余额回复的缓存条数，0 为不缓存
+            "rate_limit_enabled": True,  # 是否对查询、购买、签到等命令限流（管理员不受限制）
+            "rate_limit_user_burst": 10,  # 每位用户的令牌桶容量
+            "rate_limit_user_per_second": 0.2,  # 每位用户每秒补充的令牌数
+            "rate_limit_group_burst": 40,  # 每个群的令牌桶容量
+            "rate_limit_group_per_second": 1,  # 每个群每秒补充的令牌数
+            "rate_limit_global_burst": 200,  # 全局令牌桶容量
+            "rate_limit_global_per_second": 20,  # 全局每秒补充的令牌数
+            "rate_limit_costs": dict(DEFAULT_COSTS),  # 各命令消耗的令牌数，未列出的命令消耗 1 个
+            "business_hours_enabled": True,  # 是否按虚拟营业时段调整购买价格与签到、茶艺展示奖励
+            "business_hours": [dict(window) for window in DEFAULT_WINDOWS]  # 营业时段（虚拟时间）及倍率
+        }
+
+    def _create_rate_limiter(self):
+        """
+        按配置创建命令限流器，未启用或配置无效时返回 None
+        """
+        config = self.plugin_config
+        if not config.get("rate_limit_enabled", True):
+            return None
+        try:
+            return RateLimiter(
+                user=BucketSpec(config.get("rate_limit_user_burst", 10), config.get("rate_limit_user_per_second", 0.2)),
+                group=BucketSpec(config.get("rate_limit_group_burst", 40), config.get("rate_limit_group_per_second", 1)),
+                global_=BucketSpec(config.get("rate_limit_global_burst", 200), config.get("rate_limit_global_per_second", 20)),
+                costs=config.get("rate_limit_costs", DEFAULT_COSTS),
+            )
+        except (TypeError, ValueError) as e:
+            logger.warning(f"限流配置无效，命令限流已关闭: {e}")
+            return None
+
+    def _create_virtual_clock(self):
+        """
+        创建茶馆虚拟时钟：起点保存在状态库中，重启后沿用原来的起点，虚拟时间不会回到启动时刻
+        """
+        real_start = self.state_store.get("virtual_clock", "real_start")
+        virtual_start = self.state_store.get("virtual_clock", "virtual_start")
+        if real_start and virtual_start:
+            try:
+                return VirtualClock(datetime.datetime.fromisoformat(real_start[0]),
+                                    datetime.datetime.fromisoformat(virtual_start[0]))
+            except ValueError as e:
+                logger.warning(f"虚拟时钟起点无效，将重新开始计时: {e}")
+        clock = VirtualClock()
+        self.state_store.put("virtual_clock", "real_start", clock.real_start.isoformat())
+        self.state_store.put("virtual_clock", "virtual_start", clock.virtual_start.isoformat())
+        return clock
+
+    def _create_business_hours(self):
+        """
+        按配置生成营业时段倍率表，未启用时返回 None，配置无效时使用默认时段
+        """
+        if not self.plugin_config.get("business_hours_enabled", True):
+            return None
+        try:
+            return BusinessHours(self.virtual_clock, self.plugin_config.get("business_hours", DEFAULT_WINDOWS))
+        except (TypeError, ValueError) as e:
+            logger.warning(f"营业时段配置无效，将使用默认时段: {e}")
+            return BusinessHours(self.virtual_clock)
+
+    def _business_period(self):
+        """
+        当前虚拟时间所在的营业时段，未启用营业时段时返回 None
+        """
+        return self.business_hours.current() if self.business_hours else None
+
+    @staticmethod
+    def _multiplier(period):
+        return period.multiplier if period else 1
+
+    @staticmethod
+    def _price_text(price, multiplier):
+        """商品价格文本，营业时段有加成时同时显示当前实际单价"""
+        if multiplier == 1:
+            return f"{price} 金币"
+        return f"{PurchaseEngine.total_price(price, 1, multiplier)} 金币（原价 {price}）"
+
+    def _rate_limited(self, event, command):
+        """
+        为命令申请令牌：放行时返回 None，超出限额时返回给用户的简短提示（按等待秒数缓存）；管理员不受限制
+        """
+        user_id = event.get_sender_id()
+        if not self.rate_limiter or self.is_admin(user_id):
+            return None
+        wait = self.rate_limiter.acquire(command, user_id, getattr(event.message_obj, "group_id", None))
+        if not wait:
+            return None
+        reply = self._rate_limit_replies.get(wait)
+        if reply is None:
+            reply = self._rate_limit_replies[wait] = f"操作太频繁啦，请 {wait} 秒后再试~"
+        return reply
+
     def is_admin(self, user_id):
         """检查用户是否为管理员"""
         return user_id in self.admins
 
+    @property
+    def admins(self):
+        """当前的管理员ID集合"""
+        return self.config.get("admins")
+
     @filter.on_astrbot_loaded()
     async def on_astrbot_loaded(self):
         """
@@ -275,6 +475,19 @@ class TeaHousePlugin(Star):
         logger.info(f"签到图输出路径设置为: {self.IMAGE_PATH}")
         logger.info(f"如果有问题，请在 https://github.com/furryHM-mrz/astrbot_plugin_furry_cg/issues 提出 issue")
         logger.info("或加作者QQ: 3322969592 进行反馈。")
+        backend = self.plugin_config.get("storage_backend", "auto")
+        if backend != "builtin":
+            self._connect_database_plugin()
+        if not self.database_plugin_activated and backend in ("auto", "builtin"):
+            self._connect_builtin_storage()
+        if self.database_plugin_activated:
+            await self._init_storage_services()
+        logger.info("------ 小茶馆插件 ------")
+
+    def _connect_database_plugin(self):
+        """
+        连接数据库插件 astrbot_plugin_furry_cgsjk
+        """
         # 获取数据库插件元数据
         database_plugin_meta = self.context.get_registered_star("astrbot_plugin_furry_cgsjk")
         # 数据库插件
@@ -289,6 +502,7 @@ class TeaHousePlugin(Star):
         else:
             # 获取数据库插件实例
             self.database_plugin = database_plugin_meta.star_cls
+            self.database_plugin_version = getattr(database_plugin_meta, "version", None)
             self.database_plugin_config = self.database_plugin.config
             self.database_plugin_activated = True
             try:
@@ -296,38 +510,327 @@ class TeaHousePlugin(Star):
                 if self.database_plugin_activated:
                     self.open_databases = self.database_plugin.get_databases
                     self.DATABASE_FILE = self.database_plugin.get_db_path()
+                    self.db = AsyncDatabase(
+                        self.open_databases,
+                        self.database_plugin_config,
+                        self.DATABASE_FILE,
+                        close_databases=getattr(self.database_plugin, 'close_databases', None),
+                        max_workers=self.plugin_config.get("db_pool_workers", 4),
+                        max_pending=self.plugin_config.get("db_max_pending", 64),
+                    )
             except Exception as e:
                 logger.error(f"无法从数据库插件获取所需模块: {e}")
                 self.database_plugin_activated = False
-        logger.info("------ 小茶馆插件 ------")
+
+    def _connect_builtin_storage(self):
+        """
+        使用内置的 SQLite 存储，接口与数据库插件相同
+        """
+        try:
+            self.builtin_storage = BuiltinStorage(os.path.join(self.DATA_DIR, 'teahouse', 'teahouse.db'))
+        except Exception as e:
+            logger.error(f"初始化内置存储失败: {e}")
+            return
+        self.open_databases = self.builtin_storage.get_databases
+        self.DATABASE_FILE = self.builtin_storage.get_db_path()
+        self.database_plugin_config = self.builtin_storage.config
+        self.db = AsyncDatabase(
+            self.open_databases,
+            self.database_plugin_config,
+            self.DATABASE_FILE,
+            max_workers=self.plugin_config.get("db_pool_workers", 4),
+            max_pending=self.plugin_config.get("db_max_pending", 64),
+        )
+        self.database_plugin_activated = True
+        logger.info(f"使用内置存储: {self.DATABASE_FILE}（结构版本 {self.builtin_storage.schema_version}）")
+
+    async def _init_storage_services(self):
+        """
+        初始化依赖数据库的后台服务：直连快速路径探测、金币写后缓冲、单事务购买、限时抢购、任务进度引擎、任务定时重置
+        """
+        self.fastpath = SQLiteFastPath(self.DATABASE_FILE)
+        if self._fastpath_trusted():
+            try:
+                schema_version = BUILTIN_SCHEMA_VERSION if self.builtin_storage else None
+                tables = await self.db.run(self.fastpath.probe, schema_version, op="fastpath_probe")
+                logger.info(f"数据库直连快速路径可用的表: {', '.join(sorted(tables)) or '无'}")
+            except Exception as e:
+                logger.warning(f"探测数据库结构失败，将只使用数据库插件接口: {e}")
+        else:
+            logger.info(f"数据库插件版本 {self.database_plugin_version} 不在 fastpath_plugin_versions 中，"
+                        f"不直接读写其数据库文件，只使用数据库插件接口")
+        self.economy_ledger = EconomyLedger(
+            self._apply_economy_deltas,
+            flush_interval_ms=self.plugin_config.get("economy_flush_interval_ms", 200),
+            max_entries=self.plugin_config.get("economy_flush_max_entries", 100),
+            listener=self.leaderboards["coins"].adjust,
+        )
+        self.economy_ledger.start(self.db)
+        self.purchase_engine = PurchaseEngine(self.fastpath)
+        self.flash_sale = FlashSale(
+            self._allocate_flash_sale,
+            batch_size=self.plugin_config.get("flash_sale_batch_size", 32),
+            batch_window_ms=self.plugin_config.get("flash_sale_batch_window_ms", 10),
+        )
+        self.flash_sale.start(self.db)
+        self.period_clock = self._create_period_clock()
+        self.task_engine = TaskEngine(
+            self._apply_task_updates,
+            flush_interval_ms=self.plugin_config.get("task_flush_interval_ms", 1000),
+            max_dirty=self.plugin_config.get("task_flush_max_dirty", 200),
+            today=self._today,
+        )
+        self.task_engine.start(self.db)
+        self.reset_job = PeriodicResetJob(self.period_clock, self.state_store, {
+            "daily": lambda: self._reset_tasks('每日任务'),
+            "weekly": lambda: self._reset_tasks('每周任务'),
+        })
+        self.reset_job.start(self.db)
+        if self.fastpath.supports("backpack"):
+            try:
+                users = await self.db.run(self._rebuild_backpack_stats, op="rebuild_backpack_stats")
+                logger.info(f"已由背包表重建 {users} 位用户的背包聚合数据")
+            except Exception as e:
+                logger.warning(f"重建背包聚合数据失败，将在首次访问时按用户重建: {e}")
+        try:
+            counts = await self.db.run(self._rebuild_leaderboards, op="rebuild_leaderboards")
+            if counts:
+                logger.info("已由存储重建排行榜: " + ", ".join(f"{name} {count} 人" for name, count in counts.items()))
+        except Exception as e:
+            logger.warning(f"重建排行榜失败，排行榜将随用户操作逐步填充: {e}")
+
+    def _fastpath_trusted(self):
+        """
+        是否允许直连快速路径读写数据库文件：内置存储的结构由本插件维护；数据库插件的表归其所有，
+        只有其版本在 fastpath_plugin_versions 中（已核对过表结构与状态取值）时才允许
+        """
+        if self.builtin_storage is not None:
+            return True
+        trusted = {str(version) for version in self.plugin_config.get("fastpath_plugin_versions", [])}
+        return self.database_plugin_version is not None and str(self.database_plugin_version) in trusted
+
+    def _create_period_clock(self):
+        """
+        按配置创建判断日/周边界的时钟，配置无效时使用系统时间
+        """
+        mode = self.plugin_config.get("task_reset_clock", "real")
+        try:
+            return PeriodClock(
+                mode=mode,
+                timezone=self.plugin_config.get("task_reset_timezone") or None,
+                virtual_clock=self.virtual_clock if mode == "virtual" else None,
+            )
+        except Exception as e:
+            logger.warning(f"任务重置时钟配置无效，将使用系统时间: {e}")
+            return PeriodClock()
+
+    def _today(self):
+        """
+        当前的日周期标识，与任务定时重置使用同一时钟（真实时间、指定时区或虚拟时间）
+        """
+        if self.period_clock is None:
+            return datetime.date.today().isoformat()
+        return self.period_clock.periods()["daily"]
+
+    def _reset_tasks(self, task_type):
+        """
+        一次性重置所有用户指定类型的任务（在数据库线程中执行），返回影响的行数
+        """
+        if not (self.fastpath and self.fastpath.supports("tasks")):
+            # 数据库结构未知时由数据库插件自行处理任务刷新
+            return None
+        return self.task_engine.reset(lambda: self.fastpath.reset_tasks(task_type))
+
+    def _rebuild_backpack_stats(self):
+        """
+        由整张背包表重建所有用户的背包聚合数据（在数据库线程中执行）
+        """
+        rows = self.fastpath.iter_rows(
+            "SELECT id, user_id, item_name, item_count, item_type, item_value FROM backpack WHERE item_count > 0"
+        )
+        return self.backpack_stats.rebuild_all(rows)
+
+    def _update_collection_rank(self, user_id, record):
+        """
+        背包聚合数据变化后更新收藏榜，背包已空的用户移出榜单
+        """
+        if record.varieties:
+            self.leaderboards["collection"].set(user_id, record.varieties)
+        else:
+            self.leaderboards["collection"].discard(user_id)
+
+    def _rebuild_leaderboards(self):
+        """
+        由存储重建金币与连续签到排行榜（在数据库线程中执行），收藏榜随背包聚合数据重建，返回各榜人数
+        """
+        counts = {}
+        if self.fastpath.supports("economy"):
+            rows = self.fastpath.iter_rows("SELECT user_id, economy FROM economy")
+            counts["coins"] = self.leaderboards["coins"].rebuild(rows)
+        # 连续签到天数保存在状态库中，与存储后端无关
+        counts["sign_in"] = self.sign_in_streaks.load(datetime.date.today().isoformat())
+        return counts
+
+    def _apply_economy_deltas(self, deltas):
+        """
+        将金币账本中累积的变化量写入存储（在数据库线程中执行）
+
+        逐个用户写入时，写入成功的用户立即从 deltas 中移除，中途失败时账本只会放回未写入的金额
+        """
+        if self.fastpath and self.fastpath.supports("economy"):
+            # 一个事务写入全部用户
+            self.fastpath.add_economy_batch(deltas)
+            return
+
+        # 数据库结构未知时回退到插件接口，每个用户合并为一次写入
+        def credit(amount):
+            return lambda db_user, db_economy, db_task, db_backpack, db_store: db_economy.add_economy(amount)
+
+        for user_id, amount in list(deltas.items()):
+            self.db.execute(user_id, credit(amount))
+            del deltas[user_id]
+
+    def _allocate_flash_sale(self, requests):
+        """
+        限时抢购的批量分配（在数据库线程中调用），requests 为 [(用户ID, 商品实际ID, 数量), ...]
+        """
+        # 整批使用分配时所在营业时段的价格倍率
+        multiplier = self._multiplier(self._business_period())
+        if self.purchase_engine.available:
+            # 一个事务处理整批请求，批内用户缓冲中的入账一并写入
+            with ExitStack() as stack:
+                pending_credits = {user_id: stack.enter_context(self.economy_ledger.draining(user_id))
+                                   for user_id in dict.fromkeys(user_id for user_id, _, _ in requests)}
+                results = self.purchase_engine.purchase_batch(requests, pending_credits=pending_credits,
+                                                              multiplier=multiplier)
+        else:
+            results = []
+            for user_id, tea_id, quantity in requests:
+                def work(db_user, db_economy, db_task, db_backpack, db_store):
+                    balance = self.economy_ledger.settle(user_id, db_economy)
+                    return PurchaseEngine.purchase_item_with_handles(db_economy, db_backpack, db_store, tea_id, quantity,
+                                                                     balance, multiplier)
+
+                try:
+                    results.append(self.db.execute(user_id, work))
+                except Exception as e:
+                    logger.error(f"限时抢购分配失败（用户 {user_id}）: {e}")
+                    results.append({"status": "error"})
+        for (user_id, _, _), result in zip(requests, results):
+            if result["status"] in ("ok", "no_stock"):
+                self.catalogue.update_stock(result["tea_id"], result["stock"])
+            if result["status"] == "ok":
+                self.economy_ledger.touch(user_id)
+                self.leaderboards["coins"].set(user_id, result["balance"])
+        return results
+
+    def _on_purchase(self, user_id, result, quantity, db_task, db_backpack):
+        """购买成功后更新背包聚合数据与任务进度"""
+        self.backpack_stats.on_add(user_id, result["tea_name"], quantity, result["price"], result["tea_type"])
+        record = self.backpack_stats.load(user_id, db_backpack)
+        self.task_engine.emit(user_id, TEA_BOUGHT, db_task, tea_name=result["tea_name"],
+                              quantity=quantity, varieties=record.varieties)
+
+    def _apply_task_updates(self, updates):
+        """
+        将任务引擎中累积的进度写入存储（在数据库线程中执行）
+        """
+        if self.fastpath and self.fastpath.supports("tasks"):
+            # 一个事务写入全部用户
+            self.fastpath.update_task_progress_batch(updates)
+            return
+
+        # 数据库结构未知时回退到插件接口，按用户分组写入
+        grouped = {}
+        for user_id, task_id, progress, completed in updates:
+            grouped.setdefault(user_id, []).append((task_id, progress, completed))
+
+        def write(user_updates):
+            def work(db_user, db_economy, db_task, db_backpack, db_store):
+                for task_id, progress, completed in user_updates:
+                    db_task.update_task_progress(task_id, progress)
+                    if completed:
+                        db_task.complete_task(task_id)
+            return work
+
+        for user_id, user_updates in grouped.items():
+            self.db.execute(user_id, write(user_updates))
+            # 已写入的用户从列表中移除，中途失败时任务引擎只会重新标记其余用户的记录
+            updates[:] = [update for update in updates if update[0] != user_id]
+
+    async def terminate(self):
+        """
+        插件卸载时释放资源
+        """
+        if self.reset_job:
+            await self.reset_job.close()
+        if self.flash_sale:
+            await self.flash_sale.close()
+        if self.task_engine:
+            try:
+                # 确保缓冲中的任务进度全部落盘
+                await self.task_engine.close()
+            except Exception as e:
+                logger.error(f"任务进度最终刷写失败: {e}")
+        if self.economy_ledger:
+            try:
+                # 确保缓冲中的金币全部落盘
+                await self.economy_ledger.close()
+            except Exception as e:
+                logger.error(f"金币账本最终刷写失败: {e}")
+        if self.db:
+            self.db.shutdown(wait=True)
+        if self.fastpath:
+            self.fastpath.close()
+        if self.builtin_storage:
+            self.builtin_storage.close()
+        self.state_store.close()
 
     @filter.command("茶馆帮助")
     async def command_menu(self, event: AstrMessageEvent):
         """
         - 显示小茶馆插件指令菜单
         """
+        # 菜单不依赖任何数据，生成一次后一直复用
+        menu = self.response_cache.get(("茶馆帮助",))
+        if menu is not None:
+            yield event.plain_result(menu)
+            return
+
         menu = "🍵 欢迎光临小茶馆！指令菜单如下：\n\n"
         menu += "📝 签到相关：\n"
         menu += "  雪泷签到 - 每日签到获取金币\n"
         menu += "  更新头像 - 手动更新个人头像\n"
         menu += "🛍 商店相关：\n"
-        menu += "  雪泷商店 - 查看茶叶商品\n"
+        menu += "  雪泷商店 [页码] - 查看茶叶商品\n"
+        menu += "  雪泷商店图 [页码] - 以图片查看茶叶商品\n"
         menu += "  雪泷购买 <商品ID> <数量> - 购买茶叶\n"
         menu += "💰 个人相关：\n"
-        menu += "  雪泷背包 - 查看个人背包\n"
+        menu += "  雪泷背包 [页码] - 查看个人背包\n"
+        menu += "  雪泷背包图 [页码] - 以图片查看个人背包\n"
         menu += "  雪泷余额 - 查看个人金币余额\n"
         menu += "  雪泷喝茶 <茶叶名称> - 享用背包中的茶叶\n"
         menu += "  雪泷茶艺展示 - 展示茶艺技能获得奖励\n"
         menu += "  雪泷茶叶评级 - 查看茶叶收藏评级\n"
-        menu += "  雪泷任务列表 - 查看茶馆任务\n"
+        menu += "  雪泷任务列表 [页码] - 查看茶馆任务\n"
         menu += "  雪泷领取奖励 <任务名称> - 领取任务奖励\n"
+        menu += "🏆 排行榜：\n"
+        menu += "  雪泷富豪榜 - 金币排行\n"
+        menu += "  雪泷签到榜 - 连续签到天数排行\n"
+        menu += "  雪泷收藏榜 - 茶叶收藏种类排行\n"
         menu += "👑 管理员相关：\n"
         menu += "  雪泷上架 <名称> <库存> <类型> <价格> <描述> - 上架新茶叶\n"
+        menu += "  雪泷批量上架 <CSV/JSON 数据> - 一次上架多种茶叶\n"
         menu += "  雪泷下架 <商品ID> - 下架茶叶商品\n"
         menu += "  雪泷补货 <商品ID> <数量> - 为茶叶商品补货\n"
+        menu += "  雪泷限时抢购 <商品ID> - 开启/关闭商品限时抢购\n"
+        menu += "  雪泷导出数据 - 导出全部玩家数据\n"
+        menu += "  雪泷导入数据 <文件名> - 从导出文件导入玩家数据\n"
+        menu += "  雪泷茶馆状态 - 查看插件运行指标\n"
         menu += "📖 其他：\n"
         menu += "  雪泷茶馆帮助 - 显示此帮助菜单\n"
-        
+
+        self.response_cache.put(("茶馆帮助",), menu)
         yield event.plain_result(menu)
 
     def getGroupUserIdentity(self, is_admin: bool, user_id: str, owner: str):
@@ -343,6 +846,7 @@ class TeaHousePlugin(Star):
 
     # -------------------------- 新增茶艺展示功能 --------------------------
     @filter.command("茶艺展示")
+    @single_flight("茶艺展示", share=False)
     async def tea_art_show(self, event: AstrMessageEvent):
         """
         - 展示茶艺技能，获得金币奖励
@@ -351,54 +855,69 @@ class TeaHousePlugin(Star):
             yield event.plain_result("数据库插件未加载，茶艺展示功能无法使用。\n请先安装并启用 astrbot_plugin_furry_cgsjk。\n插件仓库地址：https://github.com/furryHM-mrz/astrbot_plugin_furry_cgsjk")
 
             return
+
+        limited = self._rate_limited(event, "茶艺展示")
+        if limited:
+            yield event.plain_result(limited)
+            return
             
         user_id = event.get_sender_id()
         user_name = event.get_sender_name()
-        
+        period = self._business_period()
+        multiplier = self._multiplier(period)
+
+        def work(db_user, db_economy, db_task, db_backpack, db_store):
+            self.display_names.remember(user_id, event.get_sender_name())
+            # 检查用户背包中的茶叶种类和数量
+            stats = self.backpack_stats.load(user_id, db_backpack)
+            if not stats.varieties:
+                return None
+
+            # 计算茶艺展示奖励
+            tea_varieties = stats.varieties  # 茶叶种类数
+            total_teas = stats.total_teas  # 茶叶总数量
+
+            # 基础奖励 + 种类奖励 + 数量奖励
+            base_reward = 20  # 基础奖励20金币
+            variety_bonus = tea_varieties * 5  # 每种茶叶额外奖励5金币
+            quantity_bonus = min(total_teas, 50)  # 茶叶数量奖励，最多50金币
+
+            total_reward = base_reward + variety_bonus + quantity_bonus
+            # 营业时段加成
+            total_reward = round(total_reward * multiplier, 2) if multiplier != 1 else total_reward
+
+            # 添加金币奖励（写后缓冲，批量落盘）
+            self.economy_ledger.credit(user_id, total_reward)
+            return tea_varieties, total_teas, base_reward, variety_bonus, quantity_bonus, total_reward
+
         try:
-            with self.open_databases(self.database_plugin_config, self.DATABASE_FILE, user_id) as (db_user, db_economy, _, db_backpack, db_store):
-                # 检查用户背包中的茶叶种类和数量
-                items = db_backpack.query_backpack()
-                
-                if not items:
-                    yield event.plain_result(f"{user_name} 的背包中没有茶叶，无法进行茶艺展示。\n请先购买一些茶叶吧！")
-                    return
-                
-                # 计算茶艺展示奖励
-                tea_varieties = len(items)  # 茶叶种类数
-                total_teas = sum(item[3] for item in items)  # 茶叶总数量
-                
-                # 基础奖励 + 种类奖励 + 数量奖励
-                base_reward = 20  # 基础奖励20金币
-                variety_bonus = tea_varieties * 5  # 每种茶叶额外奖励5金币
-                quantity_bonus = min(total_teas, 50)  # 茶叶数量奖励，最多50金币
-                
-                total_reward = base_reward + variety_bonus + quantity_bonus
-                
-                # 添加金币奖励
-                db_economy.add_economy(total_reward)
-                
-                # 生成展示结果
-                result = f"🍵 {user_name} 的茶艺展示\n\n"
-                result += f"展示了 {tea_varieties} 种茶叶，共计 {total_teas} 份\n"
-                result += f"基础奖励: {base_reward} 金币\n"
-                result += f"种类奖励: {variety_bonus} 金币\n"
-                result += f"数量奖励: {quantity_bonus} 金币\n"
-                result += f"总计获得: {total_reward} 金币\n\n"
-                result += "茶香四溢，技艺精湛！观众们纷纷鼓掌叫好~"
-                
-                yield event.plain_result(result)
-                
+            async with self.user_locks.hold(user_id):
+                outcome = await self.db.session(user_id, work, op="tea_art_show")
+            if not outcome:
+                yield event.plain_result(f"{user_name} 的背包中没有茶叶，无法进行茶艺展示。\n请先购买一些茶叶吧！")
+                return
+            tea_varieties, total_teas, base_reward, variety_bonus, quantity_bonus, total_reward = outcome
+
+            # 生成展示结果
+            result = f"🍵 {user_name} 的茶艺展示\n\n"
+            result += f"展示了 {tea_varieties} 种茶叶，共计 {total_teas} 份\n"
+            result += f"基础奖励: {base_reward} 金币\n"
+            result += f"种类奖励: {variety_bonus} 金币\n"
+            result += f"数量奖励: {quantity_bonus} 金币\n"
+            if period and multiplier != 1:
+                result += f"时段加成: {period.describe()}\n"
+            result += f"总计获得: {total_reward} 金币\n\n"
+            result += "茶香四溢，技艺精湛！观众们纷纷鼓掌叫好~"
+
+            yield event.plain_result(result)
+
         except Exception as e:
             logger.exception(f"茶艺展示失败: {e}")
             yield event.plain_result("茶艺展示失败，请稍后再试。")
-        finally:
-            # 确保数据库连接关闭
-            if self.database_plugin_activated and hasattr(self.database_plugin, 'close_databases'):
-                self.database_plugin.close_databases()
 
     # -------------------------- 茶叶评级系统 --------------------------
     @filter.command("茶叶评级")
+    @single_flight("茶叶评级")
     async def tea_rating(self, event: AstrMessageEvent):
         """
         - 查看用户的茶叶收藏评级
@@ -406,457 +925,581 @@ class TeaHousePlugin(Star):
         if not self.database_plugin_activated:
             yield event.plain_result("数据库插件未加载，茶叶评级功能无法使用。\n请先安装并启用 astrbot_plugin_furry_cgsjk。\n插件仓库地址：https://github.com/furryHM-mrz/astrbot_plugin_furry_cgsjk")
             return
+
+        limited = self._rate_limited(event, "茶叶评级")
+        if limited:
+            yield event.plain_result(limited)
+            return
             
         user_id = event.get_sender_id()
         user_name = event.get_sender_name()
         
+        # 评级只取决于背包内容和评级表，两者版本不变时直接复用上次的回复
+        rating_config = self.config.current("rating")
+        tiers = rating_config.value
+        versions = self._data_versions(user_id, ("backpack",))
+        if versions is not None:
+            cached = self.response_cache.get(("茶叶评级", user_id, user_name, versions, rating_config.version))
+            if cached is not None:
+                yield event.plain_result(cached)
+                return
+
+        def work(db_user, db_economy, db_task, db_backpack, db_store):
+            # 获取用户背包的聚合数据（先取版本号，之后的变化只会让缓存的回复更新而不会过期）
+            stats = self.backpack_stats.load(user_id, db_backpack)
+            return stats.version, stats.varieties, stats.total_teas, stats.total_value
+
         try:
-            with self.open_databases(self.database_plugin_config, self.DATABASE_FILE, user_id) as (db_user, db_economy, _, db_backpack, db_store):
-                # 获取用户背包中的茶叶
-                items = db_backpack.query_backpack()
-                
-                if not items:
-                    yield event.plain_result(f"{user_name} 的背包空空如也，暂无评级。\n快去购买一些茶叶丰富你的收藏吧！")
-                    return
-                
-                # 计算评级参数
-                tea_varieties = len(items)  # 茶叶种类数
-                total_teas = sum(item[3] for item in items)  # 茶叶总数量
-                total_value = sum(item[3] * item[5] for item in items)  # 茶叶总价值
-                
-                # 评级标准
-                # 青茶学徒 (1-3种茶叶)
-                # 绿茶行者 (4-6种茶叶)
-                # 乌龙使者 (7-9种茶叶)
-                # 红茶大师 (10-12种茶叶)
-                # 普洱宗师 (13+种茶叶)
-                
-                if tea_varieties < 4:
-                    rating = "青茶学徒"
-                    next_rating = "绿茶行者"
-                    next_requirement = f"还需收集 {4-tea_varieties} 种茶叶"
-                elif tea_varieties < 7:
-                    rating = "绿茶行者"
-                    next_rating = "乌龙使者"
-                    next_requirement = f"还需收集 {7-tea_varieties} 种茶叶"
-                elif tea_varieties < 10:
-                    rating = "乌龙使者"
-                    next_rating = "红茶大师"
-                    next_requirement = f"还需收集 {10-tea_varieties} 种茶叶"
-                elif tea_varieties < 13:
-                    rating = "红茶大师"
-                    next_rating = "普洱宗师"
-                    next_requirement = f"还需收集 {13-tea_varieties} 种茶叶"
-                else:
-                    rating = "普洱宗师"
-                    next_rating = "已达最高等级"
-                    next_requirement = ""
-                
-                # 生成评级结果
-                result = f"📜 {user_name} 的茶叶评级\n\n"
-                result += f"评级: {rating}\n"
-                result += f"收藏种类: {tea_varieties} 种\n"
-                result += f"收藏数量: {total_teas} 份\n"
-                result += f"收藏价值: {total_value:.2f} 金币\n"
-                
-                if next_requirement:
-                    result += f"\n下一等级: {next_rating}\n"
-                    result += f"升级要求: {next_requirement}\n"
-                else:
-                    result += f"\n恭喜您达到最高等级！\n"
-                
-                # 添加评级描述
-                rating_descriptions = {
-                    "青茶学徒": "刚刚踏入茶道之门，还需努力学习~",
-                    "绿茶行者": "对绿茶颇有研究，继续加油！",
-                    "乌龙使者": "精通多种乌龙茶，技艺渐进！",
-                    "红茶大师": "红茶造诣颇深，令人敬佩！",
-                    "普洱宗师": "茶道宗师，收藏丰富，令人仰慕！"
-                }
-                
-                result += f"\n{rating_descriptions[rating]}"
-                
+            # 评级参数：茶叶种类数、茶叶总数量、茶叶总价值
+            version, tea_varieties, total_teas, total_value = await self.db.session(user_id, work, op="tea_rating")
+            cache_key = ("茶叶评级", user_id, user_name, (version,), rating_config.version)
+
+            if not tea_varieties:
+                result = f"{user_name} 的背包空空如也，暂无评级。\n快去购买一些茶叶丰富你的收藏吧！"
+                self.response_cache.put(cache_key, result)
                 yield event.plain_result(result)
-                
+                return
+            
+            # 评级表由 rating_config.json 编译，按最低种类数二分查找
+            rating, description, next_rating, missing = tiers.rate(tea_varieties)
+
+            # 生成评级结果
+            result = f"📜 {user_name} 的茶叶评级\n\n"
+            result += f"评级: {rating or '暂无评级'}\n"
+            result += f"收藏种类: {tea_varieties} 种\n"
+            result += f"收藏数量: {total_teas} 份\n"
+            result += f"收藏价值: {total_value:.2f} 金币\n"
+
+            if next_rating:
+                result += f"\n{tiers.next_rating_text}: {next_rating}\n"
+                result += f"升级要求: {tiers.requirement(missing)}\n"
+            else:
+                result += f"\n{tiers.max_rating_text}\n"
+
+            if description:
+                result += f"\n{description}"
+
+            self.response_cache.put(cache_key, result)
+            yield event.plain_result(result)
+            
         except Exception as e:
             logger.exception(f"茶叶评级查询失败: {e}")
             yield event.plain_result("茶叶评级查询失败，请稍后再试。")
-        finally:
-            # 确保数据库连接关闭
-            if self.database_plugin_activated and hasattr(self.database_plugin, 'close_databases'):
-                self.database_plugin.close_databases()
 
     # -------------------------- 任务系统 --------------------------
     # 删除重复的tea_tasks命令实现，使用view_tasks作为唯一入口
 
     @filter.command("任务列表")
-    async def view_tasks(self, event: AstrMessageEvent):
+    @single_flight("任务列表")
+    async def view_tasks(self, event: AstrMessageEvent, args: tuple = ()):
         """
-        - 查看茶馆任务
+        - 查看茶馆任务 雪泷任务列表 [页码]
         """
         if not self.database_plugin_activated:
             yield event.plain_result("数据库插件未加载，任务功能无法使用。\n请先安装并启用 astrbot_plugin_furry_cgsjk。\n插件仓库地址：https://github.com/furryHM-mrz/astrbot_plugin_furry_cgsjk")
             return
 
+        limited = self._rate_limited(event, "任务列表")
+        if limited:
+            yield event.plain_result(limited)
+            return
+
         user_id = event.get_sender_id()
         user_name = event.get_sender_name()
+        try:
+            number = self.commands.parse(event, "任务列表", args)["page"]
+        except CommandArgumentError as e:
+            yield event.plain_result(str(e))
+            return
         
+        today = self._today()
+
+        def work(db_user, db_economy, db_task, db_backpack, db_store):
+            # 每位用户每天首次查看时初始化默认任务（包括每日随机任务）
+            self._ensure_daily_tasks(db_task, user_id, today)
+
+            # 获取用户任务，并叠加任务引擎中尚未写回的进度
+            return self.task_engine.overlay(user_id, db_task.get_user_tasks())
+
         try:
-            with self.open_databases(self.database_plugin_config, self.DATABASE_FILE, user_id) as (db_user, db_economy, db_task, db_backpack, db_store):
-                # 初始化默认任务（包括每日随机任务）
-                self._init_default_tasks(db_task, user_id)
-                
-                # 获取用户任务
-                tasks = db_task.get_user_tasks()
-                
-                if not tasks:
-                    yield event.plain_result(f"{user_name} 暂无任务。\n每天凌晨会刷新任务列表哦~")
-                    return
-                
-                # 分类任务
-                daily_tasks = [task for task in tasks if task[9] == '每日任务']
-                weekly_tasks = [task for task in tasks if task[9] == '每周任务']
-                special_tasks = [task for task in tasks if task[9] == '特殊任务']
-                
-                # 生成任务列表
-                result = f"📜 {user_name} 的茶馆任务\n\n"
-                
-                # 显示每日任务
-                if daily_tasks:
-                    result += "【每日任务】\n"
-                    for task in daily_tasks:
-                        # id, user_id, task_id, task_name, task_description, task_progress, task_target, reward, status, task_type
-                        _, _, task_id, task_name, task_description, task_progress, task_target, reward, status, _ = task
-                        status_icon = "✅" if status == '已完成' else "⏳"
-                        if status == '已领取':
-                            status_icon = "🎁"
-                        result += f"{status_icon} {task_name} - {task_description}\n"
-                        result += f"   进度: {task_progress}/{task_target} | 奖励: {reward} 金币\n\n"
-                
-                # 显示每周任务
-                if weekly_tasks:
-                    result += "【每周任务】\n"
-                    for task in weekly_tasks:
-                        # id, user_id, task_id, task_name, task_description, task_progress, task_target, reward, status, task_type
-                        _, _, task_id, task_name, task_description, task_progress, task_target, reward, status, _ = task
-                        status_icon = "✅" if status == '已完成' else "⏳"
-                        if status == '已领取':
-                            status_icon = "🎁"
-                        result += f"{status_icon} {task_name} - {task_description}\n"
-                        result += f"   进度: {task_progress}/{task_target} | 奖励: {reward} 金币\n\n"
-                
-                # 显示特殊任务
-                if special_tasks:
-                    result += "【特殊任务】\n"
-                    for task in special_tasks:
-                        # id, user_id, task_id, task_name, task_description, task_progress, task_target, reward, status, task_type
-                        _, _, task_id, task_name, task_description, task_progress, task_target, reward, status, _ = task
-                        status_icon = "✅" if status == '已完成' else "⏳"
-                        if status == '已领取':
-                            status_icon = "🎁"
-                        result += f"{status_icon} {task_name} - {task_description}\n"
-                        result += f"   进度: {task_progress}/{task_target} | 奖励: {reward} 金币\n\n"
-                
-                result += "完成任务可获得金币奖励！\n\n"
-                result += "使用 雪泷领取奖励 <任务名称> 来领取已完成任务的奖励！"
-                
-                yield event.plain_result(result)
-                
+            if self.task_stamps.is_current(user_id, today):
+                # 今天已初始化，只读查询无需加锁
+                tasks = await self.db.session(user_id, work, op="view_tasks")
+            else:
+                async with self.user_locks.hold(user_id):
+                    tasks = await self.db.session(user_id, work, op="view_tasks")
+
+            if not tasks:
+                yield event.plain_result(f"{user_name} 暂无任务。\n每天凌晨会刷新任务列表哦~")
+                return
+            
+            # 按每日、每周、特殊任务的顺序分页，每组在页内第一次出现时显示组标题
+            order = {'每日任务': 0, '每周任务': 1, '特殊任务': 2}
+            tasks = sorted((task for task in tasks if task[9] in order), key=lambda task: order[task[9]])
+            page = paginate(tasks, number, page_size(self.plugin_config.get("listing_page_size", 10)))
+            shown_groups = set()
+
+            def render(task):
+                # id, user_id, task_id, task_name, task_description, task_progress, task_target, reward, status, task_type
+                _, _, task_id, task_name, task_description, task_progress, task_target, reward, status, task_type = task
+                lines = []
+                if task_type not in shown_groups:
+                    shown_groups.add(task_type)
+                    lines.append(f"【{task_type}】")
+                status_icon = "✅" if status == '已完成' else "⏳"
+                if status == '已领取':
+                    status_icon = "🎁"
+                lines.append(f"{status_icon} {task_name} - {task_description}")
+                lines.append(f"   进度: {task_progress}/{task_target} | 奖励: {reward} 金币")
+                lines.append("")
+                return lines
+
+            footer = ["完成任务可获得金币奖励！", "", "使用 雪泷领取奖励 <任务名称> 来领取已完成任务的奖励！"]
+            yield event.plain_result(render_page(page, [f"📜 {user_name} 的茶馆任务", ""], render,
+                                                 "雪泷任务列表", footer=footer))
+            
         except Exception as e:
             logger.exception(f"任务查询失败: {e}")
             yield event.plain_result("任务查询失败，请稍后再试。")
-        finally:
-            # 确保数据库连接关闭
-            if self.database_plugin_activated and hasattr(self.database_plugin, 'close_databases'):
-                self.database_plugin.close_databases()
 
     # -------------------------- 任务功能 --------------------------
     @filter.command("领取奖励")
+    @single_flight("领取奖励", share=False)
     async def claim_reward(self, event: AstrMessageEvent, args: tuple):
         """
         - 领取任务奖励 雪泷领取奖励 <任务名称>
         """
-        # 添加调试信息
-        logger.info(f"收到领取奖励命令: 消息内容='{event.message_obj.message}', 参数='{args}'")
-        
         if not self.database_plugin_activated:
             yield event.plain_result("数据库插件未加载，奖励领取功能无法使用。\n请先安装并启用 astrbot_plugin_furry_cgsjk。\n插件仓库地址：https://github.com/furryHM-mrz/astrbot_plugin_furry_cgsjk")
             return
 
-        # 修复参数解析问题，从原始消息中提取任务名称
-        raw_message = event.message_obj.message
-        if isinstance(raw_message, list) and len(raw_message) > 0:
-            # 如果是消息段列表，提取文本内容
-            plain_texts = [seg.text for seg in raw_message if hasattr(seg, 'type') and seg.type == 'Plain']
-            full_text = ''.join(plain_texts)
-        else:
-            full_text = str(raw_message)
-        
-        # 从完整消息中提取任务名称（去掉命令前缀）
-        prefix = "雪泷领取奖励"
-        if full_text.startswith(prefix):
-            task_input = full_text[len(prefix):].strip()
-        else:
-            # 如果无法从完整消息中提取，则使用原来的参数拼接方式作为备选
-            task_input = ' '.join(args).strip()
-            
-        logger.info(f"解析后的任务输入: '{task_input}'")
-        
-        if not task_input:
-            yield event.plain_result("参数不足，请使用 雪泷领取奖励 <任务名称>")
+        limited = self._rate_limited(event, "领取奖励")
+        if limited:
+            yield event.plain_result(limited)
             return
-        
+
+        try:
+            task_input = self.commands.parse(event, "领取奖励", args)["task_name"]
+        except CommandArgumentError as e:
+            yield event.plain_result(str(e))
+            return
+
         user_id = event.get_sender_id()
         user_name = event.get_sender_name()
         
+        def work(db_user, db_economy, db_task, db_backpack, db_store):
+            self.display_names.remember(user_id, event.get_sender_name())
+            # 先写回任务引擎中该用户尚未落盘的进度，再读取任务
+            self.task_engine.flush_user(user_id, db_task)
+            tasks = db_task.get_user_tasks()
+
+            # 通过任务名称索引查找：名称、描述、去掉“今日挑战: ”前缀的别名、唯一的部分名称
+            index = self.task_indexes.get(user_id, tasks)
+            matched_id = index.resolve(task_input)
+            if matched_id is None:
+                by_id = {t[2]: t for t in tasks}
+                return "not_found", (tasks, [by_id[task_id] for task_id in index.suggest(task_input)])
+            task = next(t for t in tasks if t[2] == matched_id)
+
+            # id, user_id, task_id, task_name, task_description, task_progress, task_target, reward, status, task_type
+            _, _, task_id, _, _, _, _, reward, status, _ = task
+            if status != '已完成':
+                return "unfinished", task
+
+            # 先更新任务状态为已领取，成功后再发放奖励，避免重复发放
+            if not db_task.claim_reward(task_id):
+                return "claimed", task
+            self.task_engine.mark_claimed(user_id, task_id)
+            self.economy_ledger.credit(user_id, reward)
+            return "ok", task
+
         try:
-            with self.open_databases(self.database_plugin_config, self.DATABASE_FILE, user_id) as (db_user, db_economy, db_task, db_backpack, db_store):
-                # 获取所有任务
-                tasks = db_task.get_user_tasks()
-                
-                # 查找匹配的任务
-                task = None
-                for t in tasks:
-                    # id, user_id, task_id, task_name, task_description, task_progress, task_target, reward, status, task_type
-                    _, _, task_id, task_name, task_description, task_progress, task_target, reward, status, _ = t
-                    
-                    # 调试信息
-                    logger.info(f"尝试匹配任务: 用户输入='{task_input}', 任务名称='{task_name}', 任务描述='{task_description}'")
-                    
-                    # 多种匹配方式:
-                    # 1. 直接匹配任务名称
-                    # 2. 匹配任务描述
-                    # 3. 匹配随机任务的简化名称 (去除"今日挑战: "前缀)
-                    # 4. 匹配用户可能输入的部分名称
-                    if (task_name == task_input or 
-                        task_description == task_input or 
-                        (task_name.startswith("今日挑战: ") and task_name[7:] == task_input) or
-                        (task_name.startswith("今日挑战: ") and task_name.endswith(task_input))):
-                        task = t
-                        logger.info(f"成功匹配任务: {task_name}")
-                        break
-                
-                if not task:
-                    # 如果还没找到，提供更详细的错误信息
-                    task_list = "\n".join([f"  - {t[3]} ({t[4]})" if not t[3].startswith("今日挑战: ") else f"  - {t[3]}" for t in tasks])
-                    logger.info(f"未找到任务: 用户输入='{task_input}', 可用任务列表={task_list}")
-                    yield event.plain_result(f"未找到该任务，请检查任务名称是否正确。\n可用的任务列表:\n{task_list}")
-                    return
-                
-                # id, user_id, task_id, task_name, task_description, task_progress, task_target, reward, status, task_type
-                _, _, task_id, task_display_name, task_description, task_progress, task_target, reward, status, _ = task
-                
-                # 检查任务是否已完成
-                if status != '已完成':
-                    yield event.plain_result(f"任务 '{task_display_name}' 尚未完成，无法领取奖励。\n当前进度: {task_progress}/{task_target}")
-                    return
-                
-                # 检查任务奖励是否已经领取过
+            async with self.user_locks.hold(user_id):
+                outcome, payload = await self.db.session(user_id, work, op="claim_reward")
+
+            if outcome == "not_found":
+                # 如果还没找到，提供更详细的错误信息
+                tasks, suggestions = payload
+                task_list = "\n".join([f"  - {t[3]} ({t[4]})" if not t[3].startswith("今日挑战: ") else f"  - {t[3]}" for t in tasks])
+                result = "未找到该任务，请检查任务名称是否正确。\n"
+                if suggestions:
+                    result += f"你是不是想领取: {'、'.join(t[3] for t in suggestions)}\n"
+                yield event.plain_result(f"{result}可用的任务列表:\n{task_list}")
+                return
+
+            # id, user_id, task_id, task_name, task_description, task_progress, task_target, reward, status, task_type
+            _, _, task_id, task_display_name, task_description, task_progress, task_target, reward, status, _ = payload
+
+            # 检查任务是否已完成
+            if outcome == "unfinished":
                 if status == '已领取':
                     yield event.plain_result("你已经领取过了")
-                    return
-                
-                # 发放奖励
-                db_economy.add_economy(reward)
-                
-                # 更新任务状态为已领取
-                claimed = db_task.claim_reward(task_id)
-                if not claimed:
-                    yield event.plain_result("你已经领取过了")
-                    return
-                
-                yield event.plain_result(f"🎉 恭喜 {user_name}！\n任务 '{task_display_name}' 的奖励已发放。\n获得 {reward} 金币。")
-                
+                else:
+                    yield event.plain_result(f"任务 '{task_display_name}' 尚未完成，无法领取奖励。\n当前进度: {task_progress}/{task_target}")
+                return
+
+            # 检查任务奖励是否已经领取过
+            if outcome == "claimed":
+                yield event.plain_result("你已经领取过了")
+                return
+
+            yield event.plain_result(f"🎉 恭喜 {user_name}！\n任务 '{task_display_name}' 的奖励已发放。\n获得 {reward} 金币。")
+
         except Exception as e:
             logger.exception(f"领取奖励失败: {e}")
             yield event.plain_result("领取奖励失败，请稍后再试。")
-        finally:
-            # 确保数据库连接关闭
-            if self.database_plugin_activated and hasattr(self.database_plugin, 'close_databases'):
-                self.database_plugin.close_databases()
+
+    def _ensure_daily_tasks(self, db_task, user_id, today):
+        """
+        每位用户每天至多初始化一次任务，返回本次是否执行了初始化
+        """
+        if self.task_stamps.check(user_id, today):
+            return False
+        self._init_default_tasks(db_task, user_id)
+        self.task_stamps.mark(user_id, today)
+        return True
 
     def _init_default_tasks(self, db_task, user_id):
         """
         初始化默认任务
         """
-        from datetime import datetime, timedelta
-        import random
-        
         # 检查是否已有任务，避免重复创建基本任务
         existing_tasks = db_task.get_user_tasks()
         has_daily_tasks = any(task[9] == '每日任务' and not task[2].startswith('daily_random_') for task in existing_tasks)
-        
-        # 基础任务
-        default_tasks = [
-            ('daily_drink_tea', '品茶师', '品尝3种不同的茶叶', 3, 50, '每日任务'),
-            ('daily_buy_tea', '采购员', '购买茶叶2次', 2, 30, '每日任务'),
-            ('weekly_collect_tea', '收藏家', '收集5种不同的茶叶', 5, 100, '每周任务')
-        ]
-        
-        # 只有当没有每日任务时才创建基础任务
+
+        # 只有当没有每日任务时才创建基础任务（任务定义见 API/task_engine.py）
         if not has_daily_tasks:
-            for task_id, task_name, task_desc, target, reward, task_type in default_tasks:
-                db_task.create_task(task_id, task_name, task_desc, target, reward, task_type)
-        
+            for definition in DEFAULT_TASKS:
+                db_task.create_task(definition.task_id, definition.name, definition.description,
+                                    definition.target, definition.reward, definition.task_type)
+            # 任务引擎可能缓存了创建前的任务状态
+            self.task_engine.invalidate(user_id, db_task)
+
         # 更新每日随机任务（确保每天都有新的随机任务）
         db_task.update_daily_random_task()
 
-    def _update_task_progress(self, db_task, task_id, increment, unique_check=None):
+    def _list_store_with_mapping(self, db_store):
         """
-        更新任务进度
-        :param db_task: TaskDB实例
-        :param task_id: 任务ID
-        :param increment: 进度增量
-        :param unique_check: 唯一性检查参数（用于检查是否为不同种类的茶叶）
+        获取商店商品列表（连续ID），并重建显示ID到实际ID映射的商品目录索引
         """
-        try:
-            # 获取任务信息
-            task = db_task.get_task_by_id(task_id)
-            if not task or task[8] == '已完成':  # status字段
-                # 检查是否是每日随机任务
-                from datetime import datetime
-                today = datetime.now().date()
-                daily_random_task_id = f"daily_random_{today.strftime('%Y%m%d')}"
-                
-                # 如果是今天的随机任务，也尝试获取
-                if task_id == daily_random_task_id:
-                    task = db_task.get_task_by_id(task_id)
-                    if not task or task[8] == '已完成':
-                        return
-                else:
-                    return
-            
-            current_progress = task[5]  # task_progress字段
-            target = task[6]  # task_target字段
-            
-            # 对于唯一性检查任务（如品尝不同茶叶）
-            if unique_check and task_id == "daily_drink_tea":
-                # 这里可以扩展实现记录已品尝的茶叶种类，避免重复计算
-                # 简化处理：每次调用都增加进度
-                pass
-            
-            # 更新进度
-            new_progress = min(current_progress + increment, target)
-            db_task.update_task_progress(task_id, new_progress)
-            
-            # 检查任务是否完成
-            if new_progress >= target:
-                db_task.complete_task(task_id)
-                
-        except Exception as e:
-            logger.warning(f"更新任务进度失败: {e}")
+        return self.catalogue.rebuild(db_store.get_all_tea_store())
 
-            db_task.update_task_progress(task_id, new_progress)
-            
-            # 检查任务是否完成
-            if new_progress >= target:
-                db_task.complete_task(task_id)
-                
-        except Exception as e:
-            logger.warning(f"更新任务进度失败: {e}")
+    def _format_not_found_store(self, teas):
+        """
+        商品不存在时生成的提示信息，附带当前商店商品列表
+        """
+        if not teas:
+            return "未找到该商品，且商店中暂无其他商品"
+        tea_list = "当前商店中的商品列表：\n"
+        for tea in teas:
+            tea_id, tea_name, quantity, tea_type, price, description = tea
+            tea_list += f"ID: {tea_id} | {tea_name} | 库存: {quantity}\n"
+        return f"未找到该商品，请检查商品ID是否正确\n{tea_list}"
+
+    async def _flash_sale_item(self, user_id, display_id):
+        """
+        显示ID对应的商品处于限时抢购时返回其实际ID，否则返回 None
+        """
+        if not self.flash_sale or not self.flash_sale.items:
+            return None
+        if not self.catalogue.loaded:
+            def load(db_user, db_economy, db_task, db_backpack, db_store):
+                self._list_store_with_mapping(db_store)
+
+            await self.db.session(user_id, load, op="get_all_tea_store")
+        tea_id = self.catalogue.actual_id(display_id)
+        return tea_id if self.flash_sale.is_active(tea_id) else None
+
+    def _data_versions(self, user_id, depends):
+        """
+        回复所依赖数据的当前版本号元组，依赖的数据尚未加载到内存（无法得知版本）时返回 None
+
+        参数:
+            depends: "backpack" 用户背包、"economy" 用户余额 的组合（商品目录版本随分页一并读取）
+        """
+        versions = []
+        for name in depends:
+            if name == "backpack":
+                record = self.backpack_stats.get(user_id)
+                version = record.version if record else None
+            else:
+                version = self.economy_ledger.version(user_id)
+            if version is None:
+                return None
+            versions.append(version)
+        return tuple(versions)
+
+    async def _store_page(self, user_id, number):
+        """
+        获取商店商品列表（连续ID）的一页：优先使用商品目录索引，其次只查询请求的一页
+
+        返回:
+            (Page, 商品目录版本号)，未经过商品目录索引时版本号为 None
+        """
+        size = page_size(self.plugin_config.get("listing_page_size", 10))
+        number, offset = page_bounds(number, size)
+        cached = self.catalogue.page(offset, size)
+        if cached is not None:
+            rows, total, version = cached
+            return Page(rows, number, size, total), version
+
+        def work(db_user, db_economy, db_task, db_backpack, db_store):
+            if self.fastpath and self.fastpath.supports("tea_store"):
+                rows, total = self.fastpath.store_page(offset, size)
+                return Page([(offset + index,) + tuple(row[1:]) for index, row in enumerate(rows, start=1)],
+                            number, size, total), None
+            return paginate(self._list_store_with_mapping(db_store), number, size), None
+
+        return await self.db.session(user_id, work, op="shop")
 
     # -------------------------- 商店功能 --------------------------
     @filter.command("商店")
-    async def shop(self, event: AstrMessageEvent):
+    @single_flight("商店")
+    async def shop(self, event: AstrMessageEvent, args: tuple = ()):
         """
-        - 查看商店中的所有茶叶商品
+        - 查看商店中的茶叶商品 雪泷商店 [页码]
         """
         if not self.database_plugin_activated:
             yield event.plain_result("数据库插件未加载，商店功能无法使用。\n请先安装并启用 astrbot_plugin_furry_cgsjk。\n插件仓库地址：https://github.com/furryHM-mrz/astrbot_plugin_furry_cgsjk")
             return
+
+        limited = self._rate_limited(event, "商店")
+        if limited:
+            yield event.plain_result(limited)
+            return
             
         user_id = event.get_sender_id()
         try:
-            with self.open_databases(self.database_plugin_config, self.DATABASE_FILE, user_id) as (db_user, db_economy, _, db_backpack, db_store):
-                # 使用新的连续ID方法
-                teas = db_store.get_all_tea_store_with_continuous_id()
-                if not teas:
-                    yield event.plain_result("商店暂无商品。")
-                    return
-                    
-                # 构建商店信息
-                shop_info = "----- 茶馆商店 -----\n"
-                shop_info += "输入 雪泷购买 <商品ID> <数量> 来购买茶叶\n\n"
-                
-                # 创建ID映射，使用连续序号
-                id_mapping = {}  # 显示ID -> 实际数据库ID
-                display_id = 1
-                
-                for tea in teas:
-                    # id, tea_name, quantity, tea_type, price, description
-                    tea_id, tea_name, quantity, tea_type, price, description = tea
-                    # 获取实际ID用于映射
-                    actual_tea_id = db_store.get_actual_id_by_continuous_id(tea_id)
-                    id_mapping[tea_id] = actual_tea_id
-                    
-                    shop_info += f"ID: {tea_id}\n"
-                    shop_info += f"茶叶名称: {tea_name}\n"
-                    shop_info += f"类型: {tea_type}\n"
-                    shop_info += f"价格: {price} 金币\n"
-                    shop_info += f"库存: {quantity}\n"
-                    shop_info += f"描述: {description}\n"
-                    shop_info += "----------\n"
-                    
-                    display_id += 1
-                
-                # 保存ID映射到用户会话中
-                self._id_mapping = id_mapping
-                
-                yield event.plain_result(shop_info)
+            number = self.commands.parse(event, "商店", args)["page"]
+        except CommandArgumentError as e:
+            yield event.plain_result(str(e))
+            return
+
+        try:
+            page, version = await self._store_page(user_id, number)
+            period = self._business_period()
+            multiplier = self._multiplier(period)
+            # 回复取决于商品目录、分页与营业时段，三者不变时直接复用
+            cache_key = ("商店", version, page.number, page.size, period.name if period else None, multiplier)
+            cached = self.response_cache.get(cache_key) if version is not None else None
+            if cached is not None:
+                yield event.plain_result(cached)
+                return
+            if not page.total:
+                yield event.plain_result("商店暂无商品。")
+                return
+
+            def render(tea):
+                # id, tea_name, quantity, tea_type, price, description
+                tea_id, tea_name, quantity, tea_type, price, description = tea
+                return [
+                    f"ID: {tea_id}",
+                    f"茶叶名称: {tea_name}",
+                    f"类型: {tea_type}",
+                    f"价格: {self._price_text(price, multiplier)}",
+                    f"库存: {quantity}",
+                    f"描述: {truncate(description, 60)}",
+                    "----------",
+                ]
+
+            header = ["----- 茶馆商店 -----", "输入 雪泷购买 <商品ID> <数量> 来购买茶叶", ""]
+            if period:
+                header.insert(1, f"当前时段: {period.describe()}")
+            result = render_page(page, header, render, "雪泷商店")
+            if version is not None:
+                self.response_cache.put(cache_key, result)
+            yield event.plain_result(result)
         except Exception as e:
             logger.exception(f"查看商店失败: {e}")
             yield event.plain_result("查看商店失败，请稍后再试。")
-        finally:
-            # 确保数据库连接关闭
-            if self.database_plugin_activated and hasattr(self.database_plugin, 'close_databases'):
-                self.database_plugin.close_databases()
+
+    @filter.command("商店图")
+    @single_flight("商店图")
+    async def shop_image(self, event: AstrMessageEvent, args: tuple = ()):
+        """
+        - 以图片查看商店中的茶叶商品 雪泷商店图 [页码]
+        """
+        if not self.database_plugin_activated:
+            yield event.plain_result("数据库插件未加载，商店功能无法使用。\n请先安装并启用 astrbot_plugin_furry_cgsjk。\n插件仓库地址：https://github.com/furryHM-mrz/astrbot_plugin_furry_cgsjk")
+            return
+
+        limited = self._rate_limited(event, "商店图")
+        if limited:
+            yield event.plain_result(limited)
+            return
+
+        user_id = event.get_sender_id()
+        try:
+            number = self.commands.parse(event, "商店图", args)["page"]
+        except CommandArgumentError as e:
+            yield event.plain_result(str(e))
+            return
+        number, offset = page_bounds(number, GRID_PAGE_SIZE)
+
+        def work(db_user, db_economy, db_task, db_backpack, db_store):
+            self._list_store_with_mapping(db_store)
+
+        try:
+            # 图片按商品目录版本缓存，需要先加载商品目录索引
+            if not self.catalogue.loaded:
+                await self.db.session(user_id, work, op="shop")
+            rows, total, version = self.catalogue.page(offset, GRID_PAGE_SIZE)
+            if not total:
+                yield event.plain_result("商店暂无商品。")
+                return
+            page = Page(rows, number, GRID_PAGE_SIZE, total)
+            if not page.items:
+                yield event.plain_result(f"页码超出范围，共 {page.pages} 页，请使用 雪泷商店图 <页码> 查看")
+                return
+            period = self._business_period()
+            multiplier = self._multiplier(period)
+            footer = f"第 {page.number}/{page.pages} 页 · 输入 雪泷购买 <商品ID> <数量> 来购买茶叶"
+            if period:
+                footer = f"当前时段: {period.describe()} · {footer}"
+
+            async def render():
+                return await self.html_render(TMPL, {
+                    "title": "茶馆商店",
+                    "items": [
+                        [("ID", tea_id), ("名称", tea_name), ("类型", tea_type), ("价格", self._price_text(price, multiplier)),
+                         ("库存", quantity), ("描述", truncate(description, 30))]
+                        for tea_id, tea_name, quantity, tea_type, price, description in page.items
+                    ],
+                    "footer": footer,
+                })
+
+            # 商品目录与营业时段不变时直接复用上次的图片
+            image = await self.render_cache.get_or_render(
+                ("shop", version, page.number, period.name if period else None, multiplier), render)
+            yield event.image_result(image)
+        except Exception as e:
+            logger.exception(f"生成商店图片失败: {e}")
+            yield event.plain_result("生成商店图片失败，请使用 雪泷商店 查看文字版。")
 
     @filter.command("背包")
-    async def view_backpack(self, event: AstrMessageEvent):
+    @single_flight("背包")
+    async def view_backpack(self, event: AstrMessageEvent, args: tuple = ()):
         """
-        - 查看个人背包
+        - 查看个人背包 雪泷背包 [页码]
         """
         if not self.database_plugin_activated:
             yield event.plain_result("数据库插件未加载，背包功能无法使用。\n请先安装并启用 astrbot_plugin_furry_cgsjk。\n插件仓库地址：https://github.com/furryHM-mrz/astrbot_plugin_furry_cgsjk")
             return
+
+        limited = self._rate_limited(event, "背包")
+        if limited:
+            yield event.plain_result(limited)
+            return
             
         user_id = event.get_sender_id()
         user_name = event.get_sender_name()
-        
         try:
-            with self.open_databases(self.database_plugin_config, self.DATABASE_FILE, user_id) as (db_user, db_economy, _, db_backpack, db_store):
-                items = db_backpack.query_backpack()
-                
-                if not items:
-                    yield event.plain_result(f"{user_name} 的背包空空如也。")
-                    return
-                
-                # 构建背包信息
-                backpack_info = f"----- {user_name} 的背包 -----\n\n"
-                total_items = 0
-                for item in items:
-                    # id, user_id, item_name, item_count, item_type, item_value
-                    item_id, _, item_name, item_count, item_type, item_value = item
-                    backpack_info += f"物品名称: {item_name}\n"
-                    backpack_info += f"数量: {item_count}\n"
-                    backpack_info += f"类型: {item_type}\n"
-                    backpack_info += f"单价: {item_value} 金币\n"
-                    backpack_info += f"总价值: {item_value * item_count:.2f} 金币\n"
-                    backpack_info += "----------\n"
-                    total_items += item_count
-                    
-                backpack_info += f"\n总计物品数量: {total_items}"
-                
-                yield event.plain_result(backpack_info)
+            number = self.commands.parse(event, "背包", args)["page"]
+        except CommandArgumentError as e:
+            yield event.plain_result(str(e))
+            return
+        size = page_size(self.plugin_config.get("listing_page_size", 10))
+        number, offset = page_bounds(number, size)
+
+        def work(db_user, db_economy, db_task, db_backpack, db_store):
+            if self.fastpath and self.fastpath.supports("backpack"):
+                # 只读取请求的一页，总数量取自背包聚合数据
+                rows, total = self.fastpath.backpack_page(user_id, offset, size)
+                stats = self.backpack_stats.load(user_id, db_backpack)
+                return Page(rows, number, size, total), stats.total_teas
+            items = db_backpack.query_backpack()
+            # 已经取到完整背包，顺便校准聚合数据
+            stats = self.backpack_stats.rebuild(user_id, items)
+            return paginate(items, number, size), stats.total_teas
+
+        try:
+            page, total_items = await self.db.session(user_id, work, op="view_backpack")
+
+            if not page.total:
+                yield event.plain_result(f"{user_name} 的背包空空如也。")
+                return
+
+            def render(item):
+                # id, user_id, item_name, item_count, item_type, item_value
+                item_id, _, item_name, item_count, item_type, item_value = item
+                return [
+                    f"物品名称: {item_name}",
+                    f"数量: {item_count}",
+                    f"类型: {item_type}",
+                    f"单价: {item_value} 金币",
+                    f"总价值: {item_value * item_count:.2f} 金币",
+                    "----------",
+                ]
+
+            header = [f"----- {user_name} 的背包 -----", ""]
+            yield event.plain_result(render_page(page, header, render, "雪泷背包",
+                                                 footer=["", f"总计物品数量: {total_items}"]))
         except Exception as e:
             logger.exception(f"查看背包失败: {e}")
             yield event.plain_result("查看背包失败，请稍后再试。")
-        finally:
-            # 确保数据库连接关闭
-            if self.database_plugin_activated and hasattr(self.database_plugin, 'close_databases'):
-                self.database_plugin.close_databases()
+
+    @filter.command("背包图")
+    @single_flight("背包图")
+    async def view_backpack_image(self, event: AstrMessageEvent, args: tuple = ()):
+        """
+        - 以图片查看个人背包 雪泷背包图 [页码]
+        """
+        if not self.database_plugin_activated:
+            yield event.plain_result("数据库插件未加载，背包功能无法使用。\n请先安装并启用 astrbot_plugin_furry_cgsjk。\n插件仓库地址：https://github.com/furryHM-mrz/astrbot_plugin_furry_cgsjk")
+            return
+
+        limited = self._rate_limited(event, "背包图")
+        if limited:
+            yield event.plain_result(limited)
+            return
+
+        user_id = event.get_sender_id()
+        user_name = event.get_sender_name()
+        try:
+            number = self.commands.parse(event, "背包图", args)["page"]
+        except CommandArgumentError as e:
+            yield event.plain_result(str(e))
+            return
+
+        def work(db_user, db_economy, db_task, db_backpack, db_store):
+            self.backpack_stats.load(user_id, db_backpack)
+            return self.backpack_stats.snapshot(user_id)
+
+        try:
+            # 背包聚合数据已缓存时无需访问数据库
+            snapshot = self.backpack_stats.snapshot(user_id)
+            if snapshot is None:
+                snapshot = await self.db.session(user_id, work, op="view_backpack")
+            version, items = snapshot
+            if not items:
+                yield event.plain_result(f"{user_name} 的背包空空如也。")
+                return
+            page = paginate(items, number, GRID_PAGE_SIZE)
+            if not page.items:
+                yield event.plain_result(f"页码超出范围，共 {page.pages} 页，请使用 雪泷背包图 <页码> 查看")
+                return
+
+            async def render():
+                total_items = sum(count for _, count, _, _ in items)
+                return await self.html_render(TMPL, {
+                    "title": f"{user_name} 的背包",
+                    "items": [
+                        [("名称", name), ("数量", count), ("类型", item_type), ("单价", f"{value} 金币"),
+                         ("总价值", f"{value * count:.2f} 金币")]
+                        for name, count, value, item_type in page.items
+                    ],
+                    "footer": f"第 {page.number}/{page.pages} 页 · 总计物品数量: {total_items}",
+                })
+
+            # 背包内容不变时直接复用上次的图片
+            image = await self.render_cache.get_or_render(("backpack", user_id, user_name, version, page.number), render)
+            yield event.image_result(image)
+        except Exception as e:
+            logger.exception(f"生成背包图片失败: {e}")
+            yield event.plain_result("生成背包图片失败，请使用 雪泷背包 查看文字版。")
 
     @filter.command("余额")
+    @single_flight("余额")
     async def view_balance(self, event: AstrMessageEvent):
         """
         - 查看个人余额
@@ -864,23 +1507,39 @@ class TeaHousePlugin(Star):
         if not self.database_plugin_activated:
             yield event.plain_result("数据库插件未加载，余额查询功能无法使用。\n请先安装并启用 astrbot_plugin_furry_cgsjk。\n插件仓库地址：https://github.com/furryHM-mrz/astrbot_plugin_furry_cgsjk")
             return
+
+        limited = self._rate_limited(event, "余额")
+        if limited:
+            yield event.plain_result(limited)
+            return
             
         user_id = event.get_sender_id()
         user_name = event.get_sender_name()
         
+        # 先取版本号再读余额，读取期间的入账只会让缓存的回复更新而不会过期
+        cache_key = ("余额", user_id, user_name, self._data_versions(user_id, ("economy",)))
+        cached = self.response_cache.get(cache_key)
+        if cached is not None:
+            yield event.plain_result(cached)
+            return
+
+        def work(db_user, db_economy, db_task, db_backpack, db_store):
+            self.display_names.remember(user_id, event.get_sender_name())
+            balance = self.economy_ledger.read_balance(user_id, db_economy)
+            self.leaderboards["coins"].set(user_id, balance)
+            return balance
+
         try:
-            with self.open_databases(self.database_plugin_config, self.DATABASE_FILE, user_id) as (db_user, db_economy, _, db_backpack, db_store):
-                balance = db_economy.get_economy()
-                yield event.plain_result(f"{user_name} 的余额: {balance:.2f} 金币")
+            balance = await self.db.session(user_id, work, op="view_balance")
+            result = f"{user_name} 的余额: {balance:.2f} 金币"
+            self.response_cache.put(cache_key, result)
+            yield event.plain_result(result)
         except Exception as e:
             logger.exception(f"查询余额失败: {e}")
             yield event.plain_result("查询余额失败，请稍后再试。")
-        finally:
-            # 确保数据库连接关闭
-            if self.database_plugin_activated and hasattr(self.database_plugin, 'close_databases'):
-                self.database_plugin.close_databases()
 
     @filter.command("喝茶")
+    @single_flight("喝茶", share=False)
     async def drink_tea(self, event: AstrMessageEvent, args: tuple):
         """
         - 从背包中选择茶叶享用 雪泷喝茶 <茶叶名称>
@@ -888,88 +1547,73 @@ class TeaHousePlugin(Star):
         if not self.database_plugin_activated:
             yield event.plain_result("数据库插件未加载，喝茶功能无法使用。\n请先安装并启用 astrbot_plugin_furry_cgsjk。\n插件仓库地址：https://github.com/furryHM-mrz/astrbot_plugin_furry_cgsjk")
             return
-            
-        # 添加调试信息
-        logger.info(f"喝茶命令接收到参数: {args}, 参数数量: {len(args)}")
-        
-        # 检查参数是否为空
-        if not args or len(args) < 1:
-            yield event.plain_result("参数不足，请使用 雪泷喝茶 <茶叶名称>")
+
+        limited = self._rate_limited(event, "喝茶")
+        if limited:
+            yield event.plain_result(limited)
             return
             
-        # 修复参数解析问题，从原始消息中提取茶叶名称
-        raw_message = event.message_obj.message
-        if isinstance(raw_message, list) and len(raw_message) > 0:
-            # 如果是消息段列表，提取文本内容
-            plain_texts = [seg.text for seg in raw_message if hasattr(seg, 'type') and seg.type == 'Plain']
-            full_text = ''.join(plain_texts)
-        else:
-            full_text = str(raw_message)
-        
-        # 从完整消息中提取茶叶名称（去掉命令前缀）
-        prefix = "雪泷喝茶"
-        if full_text.startswith(prefix):
-            tea_name = full_text[len(prefix):].strip()
-        elif full_text.startswith("喝茶"):
-            tea_name = full_text[2:].strip()
-        else:
-            # 如果无法从完整消息中提取，则使用原来的参数拼接方式作为备选
-            tea_name = ' '.join(args).strip()
-        logger.info(f"解析后的茶叶名称: '{tea_name}'")
-            
-        logger.info(f"解析后的茶叶名称: '{tea_name}'")
-        
+        try:
+            tea_name = self.commands.parse(event, "喝茶", args)["tea_name"]
+        except CommandArgumentError as e:
+            yield event.plain_result(str(e))
+            return
+
         user_id = event.get_sender_id()
         user_name = event.get_sender_name()
         
+        def work(db_user, db_economy, db_task, db_backpack, db_store):
+            self.display_names.remember(user_id, event.get_sender_name())
+            # 检查背包中是否有这种茶叶
+            entry = self.backpack_stats.load(user_id, db_backpack).items.get(tea_name)
+            if not entry or entry[0] <= 0:
+                return "missing", None
+            # 数量, 单价, 类型
+            target_tea = tuple(entry)
+
+            # 享用茶叶，从背包中移除1个
+            if not db_backpack.remove_item(tea_name, 1):
+                self.backpack_stats.invalidate(user_id)
+                return "failed", target_tea
+            self.backpack_stats.on_remove(user_id, tea_name, 1)
+
+            # 更新任务进度，只有当天首次品尝的种类才计入“品尝不同的茶叶”
+            distinct = self.drunk_teas.add(user_id, tea_name, self._today())
+            self.task_engine.emit(user_id, TEA_DRUNK, db_task, tea_name=tea_name, distinct=distinct)
+            return "ok", target_tea
+
         try:
-            with self.open_databases(self.database_plugin_config, self.DATABASE_FILE, user_id) as (db_user, db_economy, db_task, db_backpack, db_store):
-                # 检查背包中是否有这种茶叶
-                items = db_backpack.query_backpack()
-                target_tea = None
-                for item in items:
-                    # id, user_id, item_name, item_count, item_type, item_value
-                    _, _, item_name, item_count, item_type, _ = item
-                    if item_name == tea_name and item_count > 0:
-                        target_tea = item
-                        break
-                
-                if not target_tea:
-                    yield event.plain_result(f"您的背包中没有 {tea_name} 或数量不足。")
-                    return
-                
-                # 享用茶叶，从背包中移除1个
-                removed = db_backpack.remove_item(tea_name, 1)
-                if not removed:
-                    yield event.plain_result(f"饮用 {tea_name} 失败。")
-                    return
-                
-                # 根据茶叶类型给出不同的回复
-                _, _, _, _, tea_type, _ = target_tea
-                tea_responses = {
-                    '绿茶': f"清淡的绿茶散发着清香，{user_name} 感到一阵清新舒适。",
-                    '乌龙茶': f"醇厚的乌龙茶在口中回甘，{user_name} 感到心旷神怡。",
-                    '黑茶': f"陈香浓郁的黑茶暖胃舒心，{user_name} 感到浑身温暖。",
-                    '红茶': f"香甜的红茶让{user_name}感到温暖和放松。",
-                    '白茶': f"清淡的白茶带着自然的香气，{user_name} 感到宁静祥和。",
-                    '普通': f"{user_name} 品尝了 {tea_name}，感到十分满足。"
-                }
-                
-                response = tea_responses.get(tea_type, tea_responses['普通'])
-                
-                # 更新任务进度
-                self._update_task_progress(db_task, "daily_drink_tea", 1, unique_check=tea_name)
-                
-                yield event.plain_result(f"{response}\n您享用了 1 份 {tea_name}，背包中还剩 {target_tea[3]-1} 份。")
+            async with self.user_locks.hold(user_id):
+                outcome, target_tea = await self.db.session(user_id, work, op="drink_tea")
+
+            if outcome == "missing":
+                yield event.plain_result(f"您的背包中没有 {tea_name} 或数量不足。")
+                return
+
+            if outcome == "failed":
+                yield event.plain_result(f"饮用 {tea_name} 失败。")
+                return
+
+            # 根据茶叶类型给出不同的回复
+            remaining, _, tea_type = target_tea
+            tea_responses = {
+                '绿茶': f"清淡的绿茶散发着清香，{user_name} 感到一阵清新舒适。",
+                '乌龙茶': f"醇厚的乌龙茶在口中回甘，{user_name} 感到心旷神怡。",
+                '黑茶': f"陈香浓郁的黑茶暖胃舒心，{user_name} 感到浑身温暖。",
+                '红茶': f"香甜的红茶让{user_name}感到温暖和放松。",
+                '白茶': f"清淡的白茶带着自然的香气，{user_name} 感到宁静祥和。",
+                '普通': f"{user_name} 品尝了 {tea_name}，感到十分满足。"
+            }
+
+            response = tea_responses.get(tea_type, tea_responses['普通'])
+
+            yield event.plain_result(f"{response}\n您享用了 1 份 {tea_name}，背包中还剩 {remaining - 1} 份。")
         except Exception as e:
             logger.exception(f"喝茶失败: {e}")
             yield event.plain_result("喝茶失败，请稍后再试。")
-        finally:
-            # 确保数据库连接关闭
-            if self.database_plugin_activated and hasattr(self.database_plugin, 'close_databases'):
-                self.database_plugin.close_databases()
 
     @filter.command("购买")
+    @single_flight("购买", share=False)
     async def buy_tea(self, event: AstrMessageEvent, args: tuple):
         """
         - 购买茶叶 雪泷购买 <商品ID> <数量>
@@ -977,153 +1621,113 @@ class TeaHousePlugin(Star):
         if not self.database_plugin_activated:
             yield event.plain_result("数据库插件未加载，购买功能无法使用。\n请先安装并启用 astrbot_plugin_furry_cgsjk。\n插件仓库地址：https://github.com/furryHM-mrz/astrbot_plugin_furry_cgsjk")
             return
-            
-        # 添加调试信息
-        logger.info(f"购买命令接收到参数: {args}, 参数数量: {len(args)}")
-        
-        # 检查参数是否为空或数量不足
-        if not args or len(args) < 1:
-            # 先显示商店信息，帮助用户了解有哪些商品可以购买
-            try:
-                user_id = event.get_sender_id()
-                with self.open_databases(self.database_plugin_config, self.DATABASE_FILE, user_id) as (db_user, db_economy, db_task, db_backpack, db_store):
-                    teas = db_store.get_all_tea_store()
-                    if teas:
-                        shop_info = "----- 可购买的茶叶商品 -----\n"
-                        shop_info += "使用方法: 雪泷购买 <商品ID> <数量>\n"
-                        shop_info += "例如: 雪泷购买 1 2 (购买ID为1的商品2份)\n\n"
-                        for tea in teas:
-                            tea_id, tea_name, quantity, tea_type, price, description = tea
-                            shop_info += f"ID: {tea_id} | {tea_name} | 价格: {price}金币 | 库存: {quantity}\n"
-                        shop_info += "\n请使用 雪泷购买 <商品ID> <数量> 来购买您喜欢的茶叶"
-                        yield event.plain_result(shop_info)
-                    else:
-                        yield event.plain_result("商店暂无商品，无法购买。")
-            except Exception as e:
-                logger.exception(f"获取商店信息失败: {e}")
-                yield event.plain_result("获取商店信息失败，请稍后再试。")
+
+        limited = self._rate_limited(event, "购买")
+        if limited:
+            yield event.plain_result(limited)
             return
             
-        # 修复参数解析问题，从原始消息中提取参数
-        raw_message = event.message_obj.message
-        if isinstance(raw_message, list) and len(raw_message) > 0:
-            # 如果是消息段列表，提取文本内容
-            plain_texts = [seg.text for seg in raw_message if hasattr(seg, 'type') and seg.type == 'Plain']
-            full_text = ''.join(plain_texts)
-        else:
-            full_text = str(raw_message)
-        
-        # 从完整消息中提取参数（去掉命令前缀）
-        prefix = "雪泷购买"
-        if full_text.startswith(prefix):
-            params = full_text[len(prefix):].strip().split()
-        elif full_text.startswith("购买"):
-            params = full_text[2:].strip().split()
-        else:
-            # 如果无法从完整消息中提取，则使用原来的参数作为备选
-            params = list(args)
-            
-        logger.info(f"解析后的参数: {params}")
-        
-        # 检查参数是否为空或数量不足
-        if not args or len(args) < 1:
-            # 先显示商店信息，帮助用户了解有哪些商品可以购买
+        try:
+            parsed = self.commands.parse(event, "购买", args)
+        except CommandArgumentError as e:
+            yield event.plain_result(str(e))
+            return
+
+        if parsed.empty:
+            # 未带参数时先显示商店第一页，帮助用户了解有哪些商品可以购买
             try:
-                user_id = event.get_sender_id()
-                with self.open_databases(self.database_plugin_config, self.DATABASE_FILE, user_id) as (db_user, db_economy, db_task, db_backpack, db_store):
-                    teas = db_store.get_all_tea_store()
-                    if teas:
-                        shop_info = "----- 可购买的茶叶商品 -----\n"
-                        shop_info += "使用方法: 雪泷购买 <商品ID> <数量>\n"
-                        shop_info += "例如: 雪泷购买 1 2 (购买ID为1的商品2份)\n\n"
-                        
-                        # 创建ID映射，使用连续序号
-                        id_mapping = {}
-                        display_id = 1
-                        
-                        for tea in teas:
-                            tea_id, tea_name, quantity, tea_type, price, description = tea
-                            id_mapping[display_id] = tea_id
-                            shop_info += f"ID: {display_id} | {tea_name} | 价格: {price}金币 | 库存: {quantity}\n"
-                            display_id += 1
-                            
-                        shop_info += "\n请使用 雪泷购买 <商品ID> <数量> 来购买您喜欢的茶叶"
-                        yield event.plain_result(shop_info)
-                    else:
-                        yield event.plain_result("商店暂无商品，无法购买。")
+                page, _ = await self._store_page(event.get_sender_id(), 1)
+                if page.total:
+                    header = ["----- 可购买的茶叶商品 -----", "使用方法: 雪泷购买 <商品ID> <数量>",
+                              "例如: 雪泷购买 1 2 (购买ID为1的商品2份)", ""]
+
+                    def render(tea):
+                        tea_id, tea_name, quantity, tea_type, price, description = tea
+                        return [f"ID: {tea_id} | {tea_name} | 价格: {price}金币 | 库存: {quantity}"]
+
+                    footer = ["", "请使用 雪泷购买 <商品ID> <数量> 来购买您喜欢的茶叶"]
+                    yield event.plain_result(render_page(page, header, render, "雪泷商店", footer=footer))
+                else:
+                    yield event.plain_result("商店暂无商品，无法购买。")
             except Exception as e:
                 logger.exception(f"获取商店信息失败: {e}")
                 yield event.plain_result("获取商店信息失败，请稍后再试。")
             return
             
-        # 检查参数数量
-        if len(params) < 2:
-            yield event.plain_result("参数不足，请使用 雪泷购买 <商品ID> <数量>")
-            return
-            
-        tea_id_str, quantity_str = params[0], params[1]
-        
-        try:
-            tea_id = int(tea_id_str)
-            quantity = int(quantity_str)
-        except ValueError:
-            yield event.plain_result("参数错误，商品ID和数量必须是数字")
+        if parsed["quantity"] is None:
+            yield event.plain_result(self.commands.usage("购买"))
             return
-            
+        tea_id, quantity = parsed["tea_id"], parsed["quantity"]
+
         if quantity <= 0:
             yield event.plain_result("购买数量必须大于0")
             return
             
         user_id = event.get_sender_id()
+        # 按下单时所在营业时段的倍率计价
+        multiplier = self._multiplier(self._business_period())
+
+        def work(db_user, db_economy, db_task, db_backpack, db_store):
+            self.display_names.remember(user_id, event.get_sender_name())
+            if self.purchase_engine.available:
+                # 单事务完成扣款、扣库存和入背包，缓冲中的入账一并写入
+                with self.economy_ledger.draining(user_id) as pending_credit:
+                    result = self.purchase_engine.purchase(user_id, tea_id, quantity, pending_credit=pending_credit,
+                                                           multiplier=multiplier)
+            else:
+                # 检查用户余额（先结算缓冲中的入账）
+                user_balance = self.economy_ledger.settle(user_id, db_economy)
+                result = PurchaseEngine.purchase_with_handles(db_economy, db_backpack, db_store, tea_id, quantity,
+                                                              user_balance, multiplier)
+
+            if result["status"] in ("ok", "no_stock"):
+                self.catalogue.update_stock(result["tea_id"], result["stock"])
+            if result["status"] == "ok":
+                self.economy_ledger.touch(user_id)
+                self.leaderboards["coins"].set(user_id, result["balance"])
+                # 更新背包聚合数据和任务进度
+                self._on_purchase(user_id, result, quantity, db_task, db_backpack)
+            return result
+
         try:
-            with self.open_databases(self.database_plugin_config, self.DATABASE_FILE, user_id) as (db_user, db_economy, db_task, db_backpack, db_store):
-                # 检查ID映射
-                actual_tea_id = tea_id
-                if hasattr(self, '_id_mapping') and tea_id in self._id_mapping:
-                    actual_tea_id = self._id_mapping[tea_id]
-                
-                # 使用新的方法通过连续ID获取实际ID
-                actual_tea_id = db_store.get_actual_id_by_continuous_id(tea_id)
-                
-                # 获取商品信息
-                tea_item = db_store.get_tea_store_item(actual_tea_id)
-                tea_id, tea_name, stock_quantity, tea_type, price, description = tea_item
-                
-                # 检查库存
-                if stock_quantity < quantity:
-                    yield event.plain_result(f"库存不足，当前库存仅有 {stock_quantity} 份")
-                    return
-                    
-                # 计算总价
-                total_price = price * quantity
-                
-                # 检查用户余额
-                user_balance = db_economy.get_economy()
-                if user_balance < total_price:
-                    yield event.plain_result(f"余额不足，需要 {total_price} 金币，您当前有 {user_balance} 金币")
-                    return
-                    
-                # 扣除金币
-                db_economy.reduce_economy(total_price)
-                
-                # 添加到背包
-                db_backpack.add_item(tea_name, quantity, tea_type, price)
-                
-                # 更新库存
-                db_store.update_tea_quantity(actual_tea_id, -quantity)
-                
-                # 更新任务进度（如果有的话）
-                self._update_task_progress(db_task, "daily_buy_tea", 1)
-                
-                yield event.plain_result(f"购买成功！\n购买了 {quantity} 份 {tea_name}\n花费 {total_price} 金币\n茶叶已放入您的背包")
-                
+            async with self.user_locks.hold(user_id):
+                flash_tea_id = await self._flash_sale_item(user_id, tea_id)
+                if flash_tea_id is not None:
+                    # 限时抢购商品排队，由分配协程按到达顺序批量分配库存
+                    result = await self.flash_sale.submit(user_id, flash_tea_id, quantity)
+                    if result["status"] == "ok":
+                        def after_purchase(db_user, db_economy, db_task, db_backpack, db_store):
+                            self.display_names.remember(user_id, event.get_sender_name())
+                            self._on_purchase(user_id, result, quantity, db_task, db_backpack)
+
+                        await self.db.session(user_id, after_purchase, op="flash_sale_followup")
+                else:
+                    result = await self.db.session(user_id, work, op="buy_tea")
+            status = result["status"]
+
+            if status == "error":
+                yield event.plain_result("购买失败，请稍后再试。")
+                return
+
+            if status == "not_found":
+                yield event.plain_result("未找到该商品，请检查商品ID是否正确，可使用 雪泷商店 查看商品列表")
+                return
+
+            if status == "no_stock":
+                yield event.plain_result(f"库存不足，当前库存仅有 {result['stock']} 份")
+                return
+
+            if status == "no_money":
+                yield event.plain_result(f"余额不足，需要 {result['total_price']} 金币，您当前有 {result['balance']} 金币")
+                return
+
+            surcharge = f"（营业时段价格 ×{result['multiplier']:g}）" if result.get("multiplier", 1) != 1 else ""
+            yield event.plain_result(f"购买成功！\n购买了 {quantity} 份 {result['tea_name']}\n"
+                                     f"花费 {result['total_price']} 金币{surcharge}\n茶叶已放入您的背包")
+
         except Exception as e:
             logger.exception(f"购买失败: {e}")
             yield event.plain_result("购买失败，请稍后再试。")
-        finally:
-            # 确保数据库连接关闭
-            if self.database_plugin_activated and hasattr(self.database_plugin, 'close_databases'):
-                self.database_plugin.close_databases()
 
     # -------------------------- 管理员功能 --------------------------
     @filter.command("上架")
@@ -1136,188 +1740,94 @@ class TeaHousePlugin(Star):
             return
             
         user_id = event.get_sender_id()
-        try:
-            with self.open_databases(self.database_plugin_config, self.DATABASE_FILE, user_id) as (db_user, db_economy, db_task, db_backpack, db_store):
-                # 检查ID映射
-                actual_tea_id = tea_id
-                if hasattr(self, '_id_mapping') and tea_id in self._id_mapping:
-                    actual_tea_id = self._id_mapping[tea_id]
-                
-                # 使用新的方法通过连续ID获取实际ID
-                actual_tea_id = db_store.get_actual_id_by_continuous_id(tea_id)
-                
-                # 获取商品信息
-                tea_item = db_store.get_tea_store_item(actual_tea_id)
-                tea_id, tea_name, stock_quantity, tea_type, price, description = tea_item
-                
-                # 检查库存
-                if stock_quantity < quantity:
-                    yield event.plain_result(f"库存不足，当前库存仅有 {stock_quantity} 份")
-                    return
-                    
-                # 计算总价
-                total_price = price * quantity
-                
-                # 检查用户余额
-                user_balance = db_economy.get_economy()
-                if user_balance < total_price:
-                    yield event.plain_result(f"余额不足，需要 {total_price} 金币，您当前有 {user_balance} 金币")
-                    return
-                    
-                # 扣除金币
-                db_economy.reduce_economy(total_price)
-                
-                # 添加到背包
-                db_backpack.add_item(tea_name, quantity, tea_type, price)
-                
-                # 更新库存
-                db_store.update_tea_quantity(actual_tea_id, -quantity)
-                
-                # 更新任务进度（如果有的话）
-                self._update_task_progress(db_task, "daily_buy_tea", 1)
-                
-                yield event.plain_result(f"购买成功！\n购买了 {quantity} 份 {tea_name}\n花费 {total_price} 金币\n茶叶已放入您的背包")
-                
-        except Exception as e:
-            logger.exception(f"购买失败: {e}")
-            yield event.plain_result("购买失败，请稍后再试。")
-        finally:
-            # 确保数据库连接关闭
-            if self.database_plugin_activated and hasattr(self.database_plugin, 'close_databases'):
-                self.database_plugin.close_databases()
 
-        
         # 检查是否为管理员（使用配置文件方式）
         if not self.is_admin(user_id):
             yield event.plain_result("权限不足，只有管理员才能上架商品")
             return
         
-        # 添加调试信息
-        logger.info(f"上架命令接收到参数: {args}, 参数数量: {len(args)}")
-        logger.info(f"完整消息内容: {event.message_obj.message}")
-            
-        # 初始化参数
-        tea_name = ""
-        quantity_str = ""
-        tea_type = ""
-        price_str = ""
-        description = ""
-        
-        # 检查参数是否足够
-        if len(args) < 1:
-            yield event.plain_result("参数不足，请使用 雪泷上架 <茶叶名称> <库存> <类型> <价格> <描述>")
-            return
-            
-        # 如果参数不足5个，尝试从完整消息中解析
-        if len(args) < 5:
-            # 从完整消息中解析参数
-            message_obj = event.message_obj.message
-            
-            # 处理消息对象可能是列表的情况
-            if isinstance(message_obj, list):
-                # 提取消息文本内容
-                message_text = ""
-                for item in message_obj:
-                    if hasattr(item, 'text'):
-                        message_text += item.text
-                    else:
-                        message_text += str(item)
-            else:
-                message_text = str(message_obj)
-            
-            # 移除命令前缀
-            message = message_text
-            if message.startswith("雪泷上架"):
-                message = message[4:].strip()
-            elif message.startswith("上架"):
-                message = message[2:].strip()
-            
-            # 使用更智能的方式解析参数
-            # 将消息按空格分割，然后重新组合以适应5个参数的要求
-            parts = message.split()
-            if len(parts) >= 5:
-                # 茶叶名称可能是多个单词，需要特殊处理
-                # 假设格式为: 茶叶名称 数量 类型 价格 描述...
-                tea_name = parts[0]
-                quantity_str = parts[1]
-                tea_type = parts[2]
-                price_str = parts[3]
-                description = ' '.join(parts[4:])  # 描述可能包含多个单词
-                
-                # 如果茶叶名称明显不完整（以常见的结尾词结尾），尝试合并更多部分
-                # 检查是否有更合理的茶叶名称组合
-                potential_name_parts = [parts[0]]
-                i = 1
-                # 常见的茶叶名称可能的结尾词
-                name_endings = ['茶', '清茶', '绿茶', '红茶', '乌龙茶', '白茶', '黑茶', '花茶', '奶茶']
-                while i < len(parts) - 3:  # 确保后面还有至少3个参数（数量、类型、价格）
-                    potential_name_parts.append(parts[i])
-                    potential_name = ' '.join(potential_name_parts)
-                    # 如果当前组合以常见的茶叶名称结尾，可能是完整的茶叶名称
-                    if any(potential_name.endswith(ending) for ending in name_endings):
-                        tea_name = potential_name
-                        # 更新其他参数的索引
-                        remaining_parts = parts[i+1:]
-                        if len(remaining_parts) >= 4:
-                            quantity_str = remaining_parts[0]
-                            tea_type = remaining_parts[1]
-                            price_str = remaining_parts[2]
-                            description = ' '.join(remaining_parts[3:])
-                        break
-                    i += 1
-            else:
-                yield event.plain_result("参数不足，请使用 雪泷上架 <茶叶名称> <库存> <类型> <价格> <描述>")
-                return
-        else:
-            # 直接从args中提取参数，但要考虑茶叶名称可能包含空格的情况
-            if len(args) >= 5:
-                tea_name = args[0]
-                quantity_str = args[1]
-                tea_type = args[2]
-                price_str = args[3]
-                description = ' '.join(args[4:])  # 描述可能包含多个单词
-            else:
-                yield event.plain_result("参数不足，请使用 雪泷上架 <茶叶名称> <库存> <类型> <价格> <描述>")
-                return
-        
-        # 处理用户可能在参数中添加的标签
-        if tea_name.startswith("茶叶名称"):
-            tea_name = tea_name[4:]  # 去掉"茶叶名称"前缀
-        
-        if tea_type.startswith("类型"):
-            tea_type = tea_type[2:]  # 去掉"类型"前缀
-        
-        if quantity_str.startswith("库存"):
-            quantity_str = quantity_str[2:]  # 去掉"库存"前缀
-        
-        if price_str.startswith("价格"):
-            price_str = price_str[2:]  # 去掉"价格"前缀
-        
-        if description.startswith("描述"):
-            description = description[2:]  # 去掉"描述"前缀
-        
-        # 尝试转换数量和价格
         try:
-            quantity = int(quantity_str)
-            price = float(price_str)
-        except ValueError:
-            yield event.plain_result("参数错误，库存必须是整数，价格必须是数字")
+            parsed = self.commands.parse(event, "上架", args)
+        except CommandArgumentError as e:
+            yield event.plain_result(str(e))
             return
-        
+        tea_name, quantity, tea_type = parsed["tea_name"], parsed["quantity"], parsed["tea_type"]
+        price, description = parsed["price"], parsed["description"]
+
+        def work(db_user, db_economy, db_task, db_backpack, db_store):
+            # 添加到商店
+            tea_id = db_store.add_tea_to_store(tea_name, quantity, tea_type, price, description)
+            self.catalogue.invalidate()
+            return tea_id
+
         try:
-            with self.open_databases(self.database_plugin_config, self.DATABASE_FILE, user_id) as (db_user, db_economy, _, db_backpack, db_store):
-                # 添加到商店
-                tea_id = db_store.add_tea_to_store(tea_name, quantity, tea_type, price, description)
-                
-                yield event.plain_result(f"上架成功！\n茶叶名称: {tea_name}\n库存: {quantity}\n类型: {tea_type}\n价格: {price} 金币\n描述: {description}\n商品ID: {tea_id}")
-                
+            tea_id = await self.db.session(user_id, work, op="add_tea")
+
+            yield event.plain_result(f"上架成功！\n茶叶名称: {tea_name}\n库存: {quantity}\n类型: {tea_type}\n价格: {price} 金币\n描述: {description}\n商品ID: {tea_id}")
+
         except Exception as e:
             logger.exception(f"上架失败: {e}")
             yield event.plain_result("上架失败，请稍后再试。")
-        finally:
-            # 确保数据库连接关闭
-            if self.database_plugin_activated and hasattr(self.database_plugin, 'close_databases'):
-                self.database_plugin.close_databases()
+
+    @filter.command("批量上架")
+    async def import_teas(self, event: AstrMessageEvent):
+        """
+        - 管理员批量上架茶叶 雪泷批量上架 <JSON/JSONL/CSV 内容 或 data/teahouse/imports 下的文件名>
+        """
+        if not self.database_plugin_activated:
+            yield event.plain_result("数据库插件未加载，上架功能无法使用。\n请先安装并启用 astrbot_plugin_furry_cgsjk。\n插件仓库地址：https://github.com/furryHM-mrz/astrbot_plugin_furry_cgsjk")
+            return
+
+        user_id = event.get_sender_id()
+        if not self.is_admin(user_id):
+            yield event.plain_result("权限不足，只有管理员才能上架商品")
+            return
+
+        # 消息可能包含多行内容，参数为命令之后的全部原始文本
+        payload = self.commands.parse(event, "批量上架")["payload"]
+
+        if not payload:
+            yield event.plain_result("请在命令后附上商品数据，例如：\n"
+                                     "雪泷批量上架\n"
+                                     "茶叶名称,库存,类型,价格,描述\n"
+                                     "西湖龙井,50,绿茶,30,明前新茶\n"
+                                     "也可以使用 JSON/JSONL，或将文件放入 data/teahouse/imports 后填写文件名")
+            return
+
+        # 单个文件名：从导入目录读取
+        if "\n" not in payload and os.path.splitext(payload)[1].lower() in (".json", ".jsonl", ".csv"):
+            import_path = os.path.join(self.DATA_DIR, 'teahouse', 'imports', os.path.basename(payload))
+            if not os.path.exists(import_path):
+                yield event.plain_result(f"未找到导入文件: {import_path}")
+                return
+            with open(import_path, 'r', encoding='utf-8') as f:
+                payload = f.read()
+
+        # 全部校验通过后才写入
+        try:
+            teas = validate_catalogue(parse_catalogue(payload))
+        except CatalogueImportError as e:
+            errors = "\n".join(e.errors[:10])
+            more = f"\n……共 {len(e.errors)} 处错误" if len(e.errors) > 10 else ""
+            yield event.plain_result(f"导入失败，未上架任何商品：\n{errors}{more}")
+            return
+
+        def work(db_user, db_economy, db_task, db_backpack, db_store):
+            if self.fastpath and self.fastpath.supports("tea_store"):
+                # 一个事务写入全部商品
+                self.fastpath.insert_teas(teas)
+            else:
+                for tea in teas:
+                    db_store.add_tea_to_store(*tea)
+            # 商品目录索引只重建一次
+            return self._list_store_with_mapping(db_store)
+
+        try:
+            listing = await self.db.session(user_id, work, op="import_teas")
+            yield event.plain_result(f"批量上架成功！\n共上架 {len(teas)} 种茶叶，商店现有 {len(listing)} 种商品。")
+        except Exception as e:
+            logger.exception(f"批量上架失败: {e}")
+            yield event.plain_result("批量上架失败，请稍后再试。")
 
     @filter.command("下架")
     async def remove_tea(self, event: AstrMessageEvent, args: tuple):
@@ -1335,96 +1845,41 @@ class TeaHousePlugin(Star):
             yield event.plain_result("权限不足，只有管理员才能下架商品")
             return
 
-        # 添加调试信息
-        logger.info(f"下架命令接收到参数: {args}, 参数数量: {len(args)}")
-        
-        # 检查参数是否为空或数量不足
-        if not args or len(args) < 1:
-            yield event.plain_result("参数不足，请使用 雪泷下架 <商品ID>")
-            return
-            
-        # 修复参数解析问题，从原始消息中提取参数
-        raw_message = event.message_obj.message
-        if isinstance(raw_message, list) and len(raw_message) > 0:
-            # 如果是消息段列表，提取文本内容
-            plain_texts = [seg.text for seg in raw_message if hasattr(seg, 'type') and seg.type == 'Plain']
-            full_text = ''.join(plain_texts)
-        else:
-            full_text = str(raw_message)
-        
-        # 从完整消息中提取参数（去掉命令前缀）
-        prefix = "雪泷下架"
-        if full_text.startswith(prefix):
-            params = full_text[len(prefix):].strip().split()
-        elif full_text.startswith("下架"):
-            params = full_text[2:].strip().split()
-        else:
-            # 如果无法从完整消息中提取，则使用原来的参数作为备选
-            params = list(args)
-            
-        logger.info(f"解析后的参数: {params}")
-        
-        # 检查参数数量
-        if len(params) < 1:
-            yield event.plain_result("参数不足，请使用 雪泷下架 <商品ID>")
-            return
-            
-        tea_id_str = params[0]
-        
         try:
-            tea_id = int(tea_id_str)
-        except ValueError:
-            yield event.plain_result("参数错误，商品ID必须是数字")
+            tea_id = self.commands.parse(event, "下架", args)["tea_id"]
+        except CommandArgumentError as e:
+            yield event.plain_result(str(e))
             return
 
+        def work(db_user, db_economy, db_task, db_backpack, db_store):
+            # 使用新的方法通过连续ID获取实际ID
+            actual_tea_id = db_store.get_actual_id_by_continuous_id(tea_id)
+            if not actual_tea_id:
+                return "not_found", self._list_store_with_mapping(db_store)
+
+            # 获取商品信息
+            tea_item = db_store.get_tea_store_item(actual_tea_id)
+            # 执行下架操作
+            db_store.remove_tea_from_store(actual_tea_id)
+            self.catalogue.invalidate()
+            if self.flash_sale:
+                self.flash_sale.disable(actual_tea_id)
+            return "ok", tea_item
+
         try:
-            with self.open_databases(self.database_plugin_config, self.DATABASE_FILE, user_id) as (db_user, db_economy, _, db_backpack, db_store):
-                # 使用新的方法通过连续ID获取实际ID
-                actual_tea_id = db_store.get_actual_id_by_continuous_id(tea_id)
-                
-                if not actual_tea_id:
-                    # 如果商品不存在，显示商店信息帮助用户选择正确的商品
-                    try:
-                        # 使用新的连续ID方法
-                        teas = db_store.get_all_tea_store_with_continuous_id()
-                        if teas:
-                            tea_list = "当前商店中的商品列表：\n"
-                            # 创建ID映射，使用连续序号
-                            id_mapping = {}
-                            
-                            for tea in teas:
-                                tea_id, tea_name, quantity, tea_type, price, description = tea
-                                # 获取实际ID用于映射
-                                actual_tea_id = db_store.get_actual_id_by_continuous_id(tea_id)
-                                id_mapping[tea_id] = actual_tea_id
-                                tea_list += f"ID: {tea_id} | {tea_name} | 库存: {quantity}\n"
-                                
-                            # 保存ID映射到用户会话中
-                            self._id_mapping = id_mapping
-                                
-                            yield event.plain_result(f"未找到该商品，请检查商品ID是否正确\n{tea_list}")
-                        else:
-                            yield event.plain_result("未找到该商品，且商店中暂无其他商品")
-                    except Exception as e:
-                        logger.exception(f"获取商店信息失败: {e}")
-                        yield event.plain_result("未找到该商品，请检查商品ID是否正确。")
-                    return
-                
-                # 获取商品信息
-                tea_item = db_store.get_tea_store_item(actual_tea_id)
-                # 执行下架操作
-                db_store.remove_tea_from_store(actual_tea_id)
-                
-                yield event.plain_result(f"下架成功！\n"
-                                       f"商品: {tea_item[1]}")
-                
+            outcome, payload = await self.db.session(user_id, work, op="remove_tea")
+
+            if outcome == "not_found":
+                # 如果商品不存在，显示商店信息帮助用户选择正确的商品
+                yield event.plain_result(self._format_not_found_store(payload))
+                return
+
+            yield event.plain_result(f"下架成功！\n"
+                                   f"商品: {payload[1]}")
+
         except Exception as e:
             logger.exception(f"下架失败: {e}")
             yield event.plain_result("下架失败，请稍后再试。")
-        finally:
-            # 确保数据库连接关闭
-            if self.database_plugin_activated and hasattr(self.database_plugin, 'close_databases'):
-                self.database_plugin.close_databases()
 
 
     @filter.command("补货")
@@ -1443,113 +1898,338 @@ class TeaHousePlugin(Star):
             yield event.plain_result("权限不足，只有管理员才能为商品补货")
             return
 
-        # 添加调试信息
-        logger.info(f"补货命令接收到参数: {args}, 参数数量: {len(args)}")
-        
-        # 检查参数是否为空或数量不足
-        if not args or len(args) < 1:
-            yield event.plain_result("参数不足，请使用 雪泷补货 <商品ID> <补货数量>")
-            return
-            
-        # 修复参数解析问题，从原始消息中提取参数
-        raw_message = event.message_obj.message
-        if isinstance(raw_message, list) and len(raw_message) > 0:
-            # 如果是消息段列表，提取文本内容
-            plain_texts = [seg.text for seg in raw_message if hasattr(seg, 'type') and seg.type == 'Plain']
-            full_text = ''.join(plain_texts)
-        else:
-            full_text = str(raw_message)
-        
-        # 从完整消息中提取参数（去掉命令前缀）
-        prefix = "雪泷补货"
-        if full_text.startswith(prefix):
-            params = full_text[len(prefix):].strip().split()
-        elif full_text.startswith("补货"):
-            params = full_text[2:].strip().split()
-        else:
-            # 如果无法从完整消息中提取，则使用原来的参数作为备选
-            params = list(args)
-            
-        logger.info(f"解析后的参数: {params}")
-        
-        # 检查参数数量
-        if len(params) < 2:
-            yield event.plain_result("参数不足，请使用 雪泷补货 <商品ID> <补货数量>")
-            return
-            
-        tea_id_str, quantity_str = params[0], params[1]
-        
         try:
-            tea_id = int(tea_id_str)
-            quantity = int(quantity_str)
-        except ValueError:
-            yield event.plain_result("参数错误，商品ID和补货数量必须是数字")
+            parsed = self.commands.parse(event, "补货", args)
+        except CommandArgumentError as e:
+            yield event.plain_result(str(e))
             return
-            
+        tea_id, quantity = parsed["tea_id"], parsed["quantity"]
+
         if quantity <= 0:
             yield event.plain_result("补货数量必须大于0")
             return
 
+        def work(db_user, db_economy, db_task, db_backpack, db_store):
+            # 使用新的方法通过连续ID获取实际ID
+            actual_tea_id = db_store.get_actual_id_by_continuous_id(tea_id)
+            if not actual_tea_id:
+                return "not_found", self._list_store_with_mapping(db_store)
+
+            # 执行补货操作
+            tea_item = db_store.restock_tea(actual_tea_id, quantity)
+            if tea_item:
+                self.catalogue.update_stock(tea_item[0], tea_item[2])
+            return "ok", tea_item
+
         try:
-            with self.open_databases(self.database_plugin_config, self.DATABASE_FILE, user_id) as (db_user, db_economy, _, db_backpack, db_store):
-                # 检查ID映射
-                actual_tea_id = tea_id
-                if hasattr(self, '_id_mapping') and tea_id in self._id_mapping:
-                    actual_tea_id = self._id_mapping[tea_id]
-                
-                # 使用新的方法通过连续ID获取实际ID
-                actual_tea_id = db_store.get_actual_id_by_continuous_id(tea_id)
-                
-                if not actual_tea_id:
-                    # 如果商品不存在，显示商店信息帮助用户选择正确的商品
-                    try:
-                        # 使用新的连续ID方法
-                        teas = db_store.get_all_tea_store_with_continuous_id()
-                        if teas:
-                            tea_list = "当前商店中的商品列表：\n"
-                            # 创建ID映射，使用连续序号
-                            id_mapping = {}
-                            
-                            for tea in teas:
-                                tea_id, tea_name, quantity, tea_type, price, description = tea
-                                # 获取实际ID用于映射
-                                actual_tea_id = db_store.get_actual_id_by_continuous_id(tea_id)
-                                id_mapping[tea_id] = actual_tea_id
-                                tea_list += f"ID: {tea_id} | {tea_name} | 库存: {quantity}\n"
-                                
-                            # 保存ID映射到用户会话中
-                            self._id_mapping = id_mapping
-                                
-                            yield event.plain_result(f"未找到该商品，请检查商品ID是否正确\n{tea_list}")
-                        else:
-                            yield event.plain_result("未找到该商品，且商店中暂无其他商品")
-                    except Exception as e:
-                        logger.exception(f"获取商店信息失败: {e}")
-                        yield event.plain_result("未找到该商品，请检查商品ID是否正确。")
-                    return
-                
-                # 执行补货操作
-                updated_tea = db_store.restock_tea(actual_tea_id, quantity)
-                
-                yield event.plain_result(f"补货成功！\n"
-                                       f"商品: {updated_tea[1]}\n"
-                                       f"补货数量: {quantity}\n"
-                                       f"补货后库存: {updated_tea[2]}")
-                
+            outcome, payload = await self.db.session(user_id, work, op="restock_tea")
+
+            if outcome == "not_found":
+                # 如果商品不存在，显示商店信息帮助用户选择正确的商品
+                yield event.plain_result(self._format_not_found_store(payload))
+                return
+
+            yield event.plain_result(f"补货成功！\n"
+                                   f"商品: {payload[1]}\n"
+                                   f"补货数量: {quantity}\n"
+                                   f"补货后库存: {payload[2]}")
+
         except Exception as e:
             logger.exception(f"补货失败: {e}")
             yield event.plain_result("补货失败，请稍后再试。")
+
+    def _transfer_tables(self):
+        """当前存储中可导出/导入的玩家数据表"""
+        return [table for table in TRANSFER_TABLES if self.fastpath and self.fastpath.supports(table)]
+
+    @filter.command("导出数据")
+    async def export_data(self, event: AstrMessageEvent):
+        """
+        - 管理员导出全部玩家数据 雪泷导出数据
+        """
+        if not self.database_plugin_activated:
+            yield event.plain_result("数据库插件未加载，导出功能无法使用。\n请先安装并启用 astrbot_plugin_furry_cgsjk。\n插件仓库地址：https://github.com/furryHM-mrz/astrbot_plugin_furry_cgsjk")
+            return
+
+        if not self.is_admin(event.get_sender_id()):
+            yield event.plain_result("权限不足，只有管理员才能导出数据")
+            return
+
+        tables = self._transfer_tables()
+        if not tables:
+            yield event.plain_result("当前数据库结构不支持直接读取，无法导出玩家数据。")
+            return
+        if self.data_transfer_running:
+            yield event.plain_result("已有导出/导入任务正在进行，请稍后再试。")
+            return
+
+        created_at = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        export_path = os.path.join(self.EXPORT_PATH, f"teahouse-{created_at}.jsonl")
+
+        def export():
+            # 先落盘缓冲中的金币与任务进度，导出内容才完整
+            self.economy_ledger.flush()
+            self.task_engine.flush()
+            return write_export(export_path, export_rows(self.fastpath, tables), tables, created_at=created_at)
+
+        self.data_transfer_running = True
+        try:
+            summary = await self.db.run(export, op="export_data")
+        except Exception as e:
+            logger.exception(f"导出玩家数据失败: {e}")
+            yield event.plain_result("导出失败，请稍后再试。")
+            return
+        finally:
+            self.data_transfer_running = False
+
+        counts = "，".join(f"{table} {count} 条" for table, count in summary["tables"].items())
+        yield event.plain_result(f"导出成功！\n文件: {export_path}\n共 {summary['records']} 条（{counts}）\n"
+                                 f"SHA-256: {summary['sha256']}")
+
+    @filter.command("导入数据")
+    async def import_data(self, event: AstrMessageEvent, args: tuple):
+        """
+        - 管理员从导出文件导入玩家数据 雪泷导入数据 <文件名>
+        """
+        if not self.database_plugin_activated:
+            yield event.plain_result("数据库插件未加载，导入功能无法使用。\n请先安装并启用 astrbot_plugin_furry_cgsjk。\n插件仓库地址：https://github.com/furryHM-mrz/astrbot_plugin_furry_cgsjk")
+            return
+
+        if not self.is_admin(event.get_sender_id()):
+            yield event.plain_result("权限不足，只有管理员才能导入数据")
+            return
+
+        file_name = self.commands.parse(event, "导入数据", args)["file_name"]
+        if not file_name:
+            yield event.plain_result(f"{self.commands.usage('导入数据')}\n导出文件位于 {self.EXPORT_PATH}")
+            return
+        import_path = os.path.join(self.EXPORT_PATH, os.path.basename(file_name))
+        if not os.path.exists(import_path):
+            yield event.plain_result(f"未找到导入文件: {import_path}")
+            return
+        if not self._transfer_tables():
+            yield event.plain_result("当前数据库结构不支持直接写入，无法导入玩家数据。")
+            return
+        if self.data_transfer_running:
+            yield event.plain_result("已有导出/导入任务正在进行，请稍后再试。")
+            return
+
+        importer = DataImporter(self.fastpath, self.state_store,
+                                chunk_size=self.plugin_config.get("data_import_chunk_size", 1000))
+        progress = {"logged": 0}
+
+        def on_chunk(applied, total):
+            # 每完成约 10% 记录一次进度
+            if total and applied * 10 // total > progress["logged"]:
+                progress["logged"] = applied * 10 // total
+                logger.info(f"导入玩家数据: {applied}/{total}")
+
+        def work():
+            # 先落盘缓冲中的金币，任务进度在导入前写回、导入后丢弃内存状态
+            self.economy_ledger.flush()
+            result = self.task_engine.reset(lambda: importer.run(import_path, on_chunk=on_chunk))
+            # 导入的数据可能涉及任何用户，余额版本、背包聚合与排行榜整体更新
+            self.economy_ledger.touch()
+            if self.fastpath.supports("backpack"):
+                self._rebuild_backpack_stats()
+            self._rebuild_leaderboards()
+            return result
+
+        self.data_transfer_running = True
+        try:
+            result = await self.db.run(work, op="import_data")
+        except DataTransferError as e:
+            yield event.plain_result(f"导入失败：{e}")
+            return
+        except Exception as e:
+            logger.exception(f"导入玩家数据失败: {e}")
+            yield event.plain_result("导入中断，已导入的部分会保留，再次执行相同命令将从中断处继续。")
+            return
         finally:
-            # 确保数据库连接关闭
-            if self.database_plugin_activated and hasattr(self.database_plugin, 'close_databases'):
-                self.database_plugin.close_databases()
+            self.data_transfer_running = False
+
+        resumed = f"（从第 {result['resumed_from'] + 1} 条续传）" if result["resumed_from"] else ""
+        yield event.plain_result(f"导入成功！\n共 {result['records']} 条，本次写入 {result['imported']} 条{resumed}\n"
+                                 f"校验和已验证: {result['sha256'][:16]}…")
+
+    @filter.command("限时抢购")
+    async def toggle_flash_sale(self, event: AstrMessageEvent, args: tuple):
+        """
+        - 管理员开启/关闭商品的限时抢购 雪泷限时抢购 <商品ID>
+        """
+        if not self.database_plugin_activated or not self.flash_sale:
+            yield event.plain_result("数据库插件未加载，限时抢购功能无法使用。\n请先安装并启用 astrbot_plugin_furry_cgsjk。\n插件仓库地址：https://github.com/furryHM-mrz/astrbot_plugin_furry_cgsjk")
+            return
+
+        user_id = event.get_sender_id()
+
+        # 检查是否为管理员
+        if not self.is_admin(user_id):
+            yield event.plain_result("权限不足，只有管理员才能设置限时抢购")
+            return
+
+        def work(db_user, db_economy, db_task, db_backpack, db_store):
+            return self._list_store_with_mapping(db_store)
+
+        try:
+            teas = await self.db.session(user_id, work, op="get_all_tea_store")
+        except Exception as e:
+            logger.exception(f"获取商店信息失败: {e}")
+            yield event.plain_result("获取商店信息失败，请稍后再试。")
+            return
+
+        try:
+            display_id = self.commands.parse(event, "限时抢购", args)["tea_id"]
+        except CommandArgumentError as e:
+            yield event.plain_result(str(e))
+            return
+
+        if display_id is None:
+            active = [tea for tea in teas if self.flash_sale.is_active(self.catalogue.actual_id(tea[0]))]
+            if not active:
+                yield event.plain_result("当前没有限时抢购商品。\n使用 雪泷限时抢购 <商品ID> 开启或关闭")
+                return
+            result = "----- 限时抢购商品 -----\n"
+            for tea_id, tea_name, quantity, tea_type, price, description in active:
+                result += f"ID: {tea_id} | {tea_name} | 库存: {quantity}\n"
+            yield event.plain_result(result.rstrip())
+            return
+
+        tea_id = self.catalogue.actual_id(display_id)
+        if tea_id is None:
+            yield event.plain_result(self._format_not_found_store(teas))
+            return
+
+        tea_name = teas[display_id - 1][1]
+        if self.flash_sale.is_active(tea_id):
+            self.flash_sale.disable(tea_id)
+            yield event.plain_result(f"已关闭 {tea_name} 的限时抢购")
+        else:
+            self.flash_sale.enable(tea_id)
+            yield event.plain_result(f"已开启 {tea_name} 的限时抢购，购买请求将排队按先后顺序分配库存")
+
+    @filter.command("茶馆状态")
+    async def plugin_status(self, event: AstrMessageEvent):
+        """
+        - 管理员查看插件运行指标 雪泷茶馆状态
+        """
+        if not self.is_admin(event.get_sender_id()):
+            yield event.plain_result("权限不足，只有管理员才能查看运行状态")
+            return
+
+        if not self.db:
+            yield event.plain_result("数据库插件未加载，暂无运行指标。")
+            return
+
+        stats = self.db.stats()
+        result = "----- 茶馆运行状态 -----\n"
+        result += f"数据库线程: {stats['workers']} | 执行中: {stats['running']} | 排队: {stats['queued']} (峰值 {stats['peak_queued']})\n"
+        for op, op_stats in sorted(stats["ops"].items()):
+            result += (f"{op}: {op_stats['count']} 次 | 失败 {op_stats['errors']} | "
+                       f"平均 {op_stats['avg_ms']:.1f}ms | 排队 {op_stats['avg_wait_ms']:.1f}ms | 最大 {op_stats['max_ms']:.1f}ms\n")
+        locks = self.user_locks.stats()
+        result += (f"用户锁: 活跃 {locks['active']} | 加锁 {locks['acquisitions']} 次 | "
+                   f"等待 {locks['contended']} 次 | 已清理 {locks['evicted']}\n")
+        if self.economy_ledger:
+            ledger = self.economy_ledger.stats()
+            result += (f"金币账本: 待写入 {ledger['pending_entries']} 笔/{ledger['pending_users']} 人 | "
+                       f"已刷写 {ledger['flushes']} 次共 {ledger['flushed_entries']} 笔 | "
+                       f"失败 {ledger['failed_flushes']} 次 | 最近耗时 {ledger['last_flush_ms']:.1f}ms\n")
+        if self.task_engine:
+            tasks = self.task_engine.stats()
+            result += (f"任务引擎: 缓存 {tasks['users']} 人 | 事件 {tasks['events']} 次 | 加载 {tasks['loads']} 次 | "
+                       f"待写回 {tasks['dirty']} | 已刷写 {tasks['flushes']} 次共 {tasks['flushed_tasks']} 项\n")
+        if self.flash_sale:
+            sale = self.flash_sale.stats()
+            result += (f"限时抢购: 商品 {sale['items']} 件 | 排队 {sale['queued']} | 请求 {sale['requests']} 次 | "
+                       f"批次 {sale['batches']} (最大 {sale['max_batch']}) | 成交 {sale['granted']}\n")
+        cache = self.render_cache.stats()
+        result += f"图片缓存: {cache['entries']} 张 | 命中 {cache['hits']} 次 | 渲染 {cache['misses']} 次\n"
+        configs = self.config.stats()
+        result += "配置热加载: " + " | ".join(
+            f"{name} 版本 {info['version']}（重载 {info['reloads']} 次，失败 {info['failures']} 次）"
+            for name, info in configs.items()) + "\n"
+        period = self._business_period()
+        if period:
+            clock = self.virtual_clock.get_virtual_clock_data()
+            result += f"营业时段: {clock['virtual_time1']} {clock['weekday']} · {period.describe()}\n"
+        flights = self.single_flight.stats()
+        result += (f"请求合并: 处理中 {flights['in_flight']} | 共享回复 {flights['shared']} 次 | "
+                   f"拒绝重复 {flights['rejected']} 次\n")
+        if self.rate_limiter:
+            limiter = self.rate_limiter.stats()
+            result += (f"命令限流: 活跃令牌桶 {limiter['buckets']} | 放行 {limiter['allowed']} 次 | "
+                       f"拒绝 {limiter['limited']} 次 | 清理 {limiter['evicted']} 个\n")
+        cache = self.response_cache.stats()
+        result += f"回复缓存: {cache['entries']} 条 | 命中 {cache['hits']} 次 | 未命中 {cache['misses']} 次\n"
+        if self.reset_job:
+            for name, label in (("daily", "每日"), ("weekly", "每周")):
+                report = self.reset_job.reports.get(name)
+                if report:
+                    rows = "不支持" if report['rows'] is None else f"{report['rows']} 行"
+                    result += (f"{label}任务重置: {report['previous']} -> {report['period']} | {rows} | "
+                               f"耗时 {report['duration_ms']:.1f}ms | {report['finished_at']}\n")
+        yield event.plain_result(result.rstrip())
+
+    # -------------------------- 排行榜 --------------------------
+    def _format_leaderboard(self, event: AstrMessageEvent, board_name, title, score_format, limit=10):
+        """
+        生成排行榜文本：前 limit 名与发送者自己的名次
+        """
+        board = self.leaderboards[board_name]
+        user_id = event.get_sender_id()
+        entries = board.top(limit)
+        if not entries:
+            return f"{title}\n\n暂时还没有人上榜哦~"
+        medals = {1: "🥇", 2: "🥈", 3: "🥉"}
+        lines = [f"{title}\n"]
+        for rank, entry_user, score in entries:
+            marker = "（你）" if entry_user == str(user_id) else ""
+            # 显示昵称而不是用户ID，未知昵称时显示遮盖后的ID
+            lines.append(f"{medals.get(rank, f'{rank}.')} {self.display_names.get(entry_user)}{marker} - "
+                         f"{score_format.format(score)}")
+        mine = board.rank(user_id)
+        if mine:
+            lines.append(f"\n{event.get_sender_name()} 当前第 {mine[0]} 名（{score_format.format(mine[1])}），共 {len(board)} 人上榜")
+        else:
+            lines.append(f"\n{event.get_sender_name()} 暂未上榜")
+        return "\n".join(lines)
+
+    @filter.command("富豪榜")
+    async def rich_list(self, event: AstrMessageEvent):
+        """
+        - 查看金币排行榜
+        """
+        yield event.plain_result(self._format_leaderboard(event, "coins", "💰 茶馆富豪榜", "{:.2f} 金币"))
+
+    @filter.command("签到榜")
+    async def sign_in_list(self, event: AstrMessageEvent):
+        """
+        - 查看签到天数排行榜
+        """
+        # 断签的用户每天移出榜单一次
+        self.sign_in_streaks.expire(datetime.date.today().isoformat())
+        yield event.plain_result(self._format_leaderboard(event, "sign_in", "📅 茶馆连续签到榜", "{} 天"))
+
+    @filter.command("收藏榜")
+    async def collection_list(self, event: AstrMessageEvent):
+        """
+        - 查看茶叶收藏种类排行榜
+        """
+        yield event.plain_result(self._format_leaderboard(event, "collection", "🍵 茶馆收藏榜", "{} 种"))
 
     # -------------------------- 新增更新头像功能 --------------------------
     @filter.command("更新头像")
+    @single_flight("更新头像", share=False)
     async def update_avatar(self, event: AstrMessageEvent):
         """
         - 手动更新用户头像
         """
+        limited = self._rate_limited(event, "更新头像")
+        if limited:
+            yield event.plain_result(limited)
+            return
+
         user_id = event.get_sender_id()
         user_name = event.get_sender_name()
         
@@ -1570,6 +2250,7 @@ class TeaHousePlugin(Star):
             yield event.plain_result("更新头像失败，请稍后再试。")
 
     @filter.command("签到")
+    @single_flight("签到", share=False)
     async def sign_in(self, event: AstrMessageEvent):
         """
         - 签到 [生成签到卡片并发送]
@@ -1578,101 +2259,126 @@ class TeaHousePlugin(Star):
             yield event.plain_result("数据库插件未加载，签到功能无法使用。\n请先安装并启用 astrbot_plugin_furry_cgsjk。\n插件仓库地址：https://github.com/furryHM-mrz/astrbot_plugin_furry_cgsjk")
             return
 
-        user_id = event.get_sender_id()
-        try:
-            with self.open_databases(self.database_plugin_config, self.DATABASE_FILE, user_id) as (db_user, db_economy, _, db_backpack, db_store):
-                user_name = event.get_sender_name()
-                group = await event.get_group(group_id=event.message_obj.group_id)
-                owner = group.group_owner
-                is_admin = event.is_admin()
-                identity = self.getGroupUserIdentity(is_admin, user_id, owner)
-                formatted_time = get_formatted_time()
-                sign_in_count = db_user.query_sign_in_count()[0]  # 获取签到次数的第一个元素
-                one_sentence_data = await get_one_sentence()
-
-                # 默认值，防止one_sentence获取失败造成错误
-                one_sentence = "今日一言获取失败"
-                one_sentence_source = "未知"
-
-                if one_sentence_data:
-                    one_sentence = one_sentence_data.get("tangdouz", "今日一言获取失败")
-                    one_sentence_source = f"————{one_sentence_data.get('from', '未知')} - {one_sentence_data.get('from_who', '未知')}"
-
-                last_sign_in_date = db_user.query_last_sign_in_date()
-                today = datetime.datetime.now().strftime("%Y-%m-%d")
-                user_economy = db_economy.get_economy()
-
-                sign_in_reward = 0  # 签到奖励
-                is_signed_today = (last_sign_in_date == today)
-
-                if not is_signed_today:
-                    sign_in_reward = round(random.uniform(50, 100), 2)
-                    db_user.update_sign_in(sign_in_reward)
-                    db_economy.add_economy(sign_in_reward)
-                    user_economy += sign_in_reward
-
-                user_info = [user_id, identity, user_name]
-                bottom_left_info = [
-                    f"当前时间: {formatted_time}",
-                    f"签到日期: {today if not is_signed_today else last_sign_in_date}",
-                    f"金币: {user_economy:.2f}"  # 格式化为两位小数
-                ]
+        limited = self._rate_limited(event, "签到")
+        if limited:
+            yield event.plain_result(limited)
+            return
 
-                bottom_right_top_info = [
-                    "今日已签到" if is_signed_today else "签到成功",
-                    f"签到天数: {sign_in_count}" if is_signed_today else f"签到天数: {sign_in_count + 1}",
-                    f"获取金币: {db_user.query_sign_in_coins() if is_signed_today else sign_in_reward:.2f}"  # 格式化为两位小数
-                ]
+        user_id = event.get_sender_id()
+        today = datetime.datetime.now().strftime("%Y-%m-%d")
+        # 签到奖励按签到时所在营业时段加成
+        period = self._business_period()
+        multiplier = self._multiplier(period)
+
+        def work(db_user, db_economy, db_task, db_backpack, db_store):
+            self.display_names.remember(user_id, event.get_sender_name())
+            sign_in_count = db_user.query_sign_in_count()[0]  # 获取签到次数的第一个元素
+            last_sign_in_date = db_user.query_last_sign_in_date()
+            user_economy = self.economy_ledger.read_balance(user_id, db_economy)
+
+            sign_in_reward = 0  # 签到奖励
+            is_signed_today = (last_sign_in_date == today)
+
+            if not is_signed_today:
+                sign_in_reward = round(random.uniform(50, 100) * multiplier, 2)
+                db_user.update_sign_in(sign_in_reward)
+                self.economy_ledger.credit(user_id, sign_in_reward)
+                self.task_engine.emit(user_id, SIGNED_IN, db_task)
+                user_economy += sign_in_reward
+                sign_in_coins = sign_in_reward
+            else:
+                sign_in_coins = db_user.query_sign_in_coins()
+            self.leaderboards["coins"].set(user_id, user_economy)
+            self.sign_in_streaks.record(user_id, today)
+            return sign_in_count, last_sign_in_date, user_economy, sign_in_reward, is_signed_today, sign_in_coins
 
-                bottom_right_bottom_info = [
-                    one_sentence,
-                    one_sentence_source,
-                ]
+        try:
+            user_name = event.get_sender_name()
+            group = await event.get_group(group_id=event.message_obj.group_id)
+            owner = group.group_owner
+            is_admin = event.is_admin()
+            identity = self.getGroupUserIdentity(is_admin, user_id, owner)
+            formatted_time = get_formatted_time()
+            one_sentence_data = await get_one_sentence()
+
+            # 默认值，防止one_sentence获取失败造成错误
+            one_sentence = "今日一言获取失败"
+            one_sentence_source = "未知"
+
+            if one_sentence_data:
+                one_sentence = one_sentence_data.get("tangdouz", "今日一言获取失败")
+                one_sentence_source = f"————{one_sentence_data.get('from', '未知')} - {one_sentence_data.get('from_who', '未知')}"
+
+            async with self.user_locks.hold(user_id):
+                (sign_in_count, last_sign_in_date, user_economy,
+                 sign_in_reward, is_signed_today, sign_in_coins) = await self.db.session(user_id, work, op="sign_in")
+
+            user_info = [user_id, identity, user_name]
+            bottom_left_info = [
+                f"当前时间: {formatted_time}",
+                f"签到日期: {today if not is_signed_today else last_sign_in_date}",
+                f"金币: {user_economy:.2f}"  # 格式化为两位小数
+            ]
+
+            bottom_right_top_info = [
+                "今日已签到" if is_signed_today else "签到成功",
+                f"签到天数: {sign_in_count}" if is_signed_today else f"签到天数: {sign_in_count + 1}",
+                f"获取金币: {sign_in_coins:.2f}"  # 格式化为两位小数
+            ]
+            if period and not is_signed_today:
+                bottom_right_top_info.append(f"时段: {period.describe()}")
+
+            bottom_right_bottom_info = [
+                one_sentence,
+                one_sentence_source,
+            ]
 
-                # 头像路径
-                pp = os.path.join(self.PP_PATH, f"{user_id}.png")
-                if os.path.exists(pp):
+            # 头像路径
+            pp = os.path.join(self.PP_PATH, f"{user_id}.png")
+            if os.path.exists(pp):
+                avatar_path = pp
+            else:
+                di = await download_image(user_id, self.PP_PATH)
+                if di:
                     avatar_path = pp
                 else:
-                    di = await download_image(user_id, self.PP_PATH)
-                    if di:
-                        avatar_path = pp
-                    else:
-                        avatar_path = os.path.join(self.PLUGIN_DIR, "avatar.png")
-                # 背景图路径
-                files = os.listdir(self.BACKGROUND_PATH)
-                if len(files) == 0:
-                    image_folder = self.IMAGE_FOLDER
-                else:
-                    image_folder = self.BACKGROUND_PATH
-
-                sign_image = create_check_in_card(
-                    avatar_path=avatar_path,
-                    user_info=user_info,
-                    bottom_left_info=bottom_left_info,
-                    bottom_right_top_info=bottom_right_top_info,
-                    bottom_right_bottom_info=bottom_right_bottom_info,
-                    output_path=os.path.join(self.IMAGE_PATH, f"{user_id}.png"),
-                    image_folder=image_folder,
-                    font_path=self.FONT_PATH
-                )
-                
-                # 检查图片是否生成成功
-                if sign_image and os.path.exists(sign_image):
-                    yield event.image_result(sign_image)
-                else:
-                    # 如果图片生成失败，返回文字信息
-                    result_text = f"签到成功！\n"
-                    result_text += f"用户: {user_name}\n"
-                    result_text += f"身份: {identity}\n"
-                    result_text += f"时间: {formatted_time}\n"
-                    result_text += f"金币: {user_economy:.2f}\n"
-                    if not is_signed_today:
-                        result_text += f"今日获得金币: {sign_in_reward:.2f}\n"
-                    result_text += f"签到天数: {sign_in_count if is_signed_today else sign_in_count + 1}\n"
-                    result_text += f"一言: {one_sentence}\n"
-                    result_text += one_sentence_source
-                    yield event.plain_result(result_text)
+                    avatar_path = os.path.join(self.PLUGIN_DIR, "avatar.png")
+            # 背景图路径
+            files = os.listdir(self.BACKGROUND_PATH)
+            if len(files) == 0:
+                image_folder = self.IMAGE_FOLDER
+            else:
+                image_folder = self.BACKGROUND_PATH
+
+            sign_image = create_check_in_card(
+                avatar_path=avatar_path,
+                user_info=user_info,
+                bottom_left_info=bottom_left_info,
+                bottom_right_top_info=bottom_right_top_info,
+                bottom_right_bottom_info=bottom_right_bottom_info,
+                output_path=os.path.join(self.IMAGE_PATH, f"{user_id}.png"),
+                image_folder=image_folder,
+                font_path=self.FONT_PATH
+            )
+            
+            # 检查图片是否生成成功
+            if sign_image and os.path.exists(sign_image):
+                yield event.image_result(sign_image)
+            else:
+                # 如果图片生成失败，返回文字信息
+                result_text = f"签到成功！\n"
+                result_text += f"用户: {user_name}\n"
+                result_text += f"身份: {identity}\n"
+                result_text += f"时间: {formatted_time}\n"
+                result_text += f"金币: {user_economy:.2f}\n"
+                if not is_signed_today:
+                    result_text += f"今日获得金币: {sign_in_reward:.2f}\n"
+                    if period:
+                        result_text += f"当前时段: {period.describe()}\n"
+                result_text += f"签到天数: {sign_in_count if is_signed_today else sign_in_count + 1}\n"
+                result_text += f"一言: {one_sentence}\n"
+                result_text += one_sentence_source
+                yield event.plain_result(result_text)
 
         except Exception as e:
             logger.exception(f"签到失败: {e}")
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 测试直接导入 API 包，不依赖 AstrBot 运行环境
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,29 @@
+import pytest
+
+from API.catalogue import CatalogueImportError, parse_catalogue, validate_catalogue
+
+
+def test_csv_with_header_is_validated():
+    records = parse_catalogue("茶叶名称,库存,类型,价格,描述\n龙井,50,绿茶,28.5,\"明前, 新茶\"")
+    assert validate_catalogue(records) == [("龙井", 50, "绿茶", 28.5, "明前, 新茶")]
+
+
+@pytest.mark.parametrize("price", ["nan", "inf", "-inf", "1e999", "-1"])
+def test_non_finite_or_negative_price_is_rejected(price):
+    with pytest.raises(CatalogueImportError):
+        validate_catalogue([{"茶叶名称": "龙井", "库存": 1, "类型": "绿茶", "价格": price}])
+
+
+def test_csv_rows_with_extra_columns_are_rejected():
+    with pytest.raises(CatalogueImportError) as info:
+        parse_catalogue("龙井,50,绿茶,28.5,明前,新茶")
+    assert "第 1 条" in info.value.errors[0]
+    with pytest.raises(CatalogueImportError):
+        parse_catalogue("茶叶名称,库存,类型,价格\n龙井,50,绿茶,28.5,多余")
+
+
+def test_errors_are_collected_before_writing():
+    with pytest.raises(CatalogueImportError) as info:
+        validate_catalogue([{"茶叶名称": "龙井", "库存": -1, "类型": "绿茶", "价格": 1},
+                            {"茶叶名称": "龙井", "库存": 1, "类型": "", "价格": 1}])
+    assert len(info.value.errors) == 3
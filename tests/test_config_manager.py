@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+from API.config_manager import ConfigManager, parse_admins
+from API.rating import RatingConfigError, RatingTiers
+
+RATINGS = {"ratings": [{"name": "青茶学徒", "min_varieties": 1}, {"name": "绿茶行者", "min_varieties": 4}]}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def manager(tmp_path):
+    clock = Clock()
+    manager = ConfigManager(check_interval=1.0, clock=clock)
+    manager.watch("admins", str(tmp_path / "admins.json"), parse_admins, {"admins": ["1"]})
+    manager.watch("rating", str(tmp_path / "rating_config.json"), RatingTiers, RATINGS)
+    return manager, clock, tmp_path
+
+
+def rewrite(manager, clock, path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    clock.now += 2
+    # 同一秒内多次写入时修改时间可能不变，强制视为已修改
+    manager._files[path.stem.replace("_config", "")].mtime = None
+
+
+def test_valid_change_is_reloaded(manager):
+    manager, clock, tmp_path = manager
+    version = manager.current("admins").version
+    rewrite(manager, clock, tmp_path / "admins.json", {"admins": ["1", 2]})
+    assert manager.get("admins") == frozenset({"1", "2"})
+    assert manager.current("admins").version == version + 1
+
+
+@pytest.mark.parametrize("data", [{"ratings": 5}, {"ratings": ["x"]}, {"ratings": RATINGS["ratings"], "requirement_text": "还需 {n} 种"}, []])
+def test_badly_typed_rating_config_keeps_previous_tiers(manager, data):
+    manager, clock, tmp_path = manager
+    before = manager.current("rating")
+    rewrite(manager, clock, tmp_path / "rating_config.json", data)
+
+    # 读取配置的命令不会因为无效文件出错，继续使用之前的评级表
+    tiers = manager.get("rating")
+    assert tiers is before.value
+    assert tiers.rate(2)[0] == "青茶学徒"
+    stats = manager.stats()["rating"]
+    assert stats["failures"] == 1
+    assert stats["last_error"]
+
+
+def test_same_content_keeps_version(manager):
+    manager, clock, tmp_path = manager
+    version = manager.current("admins").version
+    rewrite(manager, clock, tmp_path / "admins.json", {"admins": ["1"]})
+    assert manager.current("admins").version == version
+
+
+def test_rating_tiers_reject_non_list_ratings():
+    with pytest.raises(RatingConfigError):
+        RatingTiers({"ratings": 5})
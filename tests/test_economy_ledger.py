@@ -0,0 +1,113 @@
+import pytest
+
+from API.economy_ledger import EconomyLedger
+from API.task_engine import TaskEngine
+
+
+class FlakyStore:
+    """逐个用户写入的存储，写到 fail_on 指定的用户时失败一次"""
+
+    def __init__(self, fail_on=None):
+        self.balances = {}
+        self.fail_on = fail_on
+
+    def apply(self, deltas):
+        for user_id, amount in list(deltas.items()):
+            if user_id == self.fail_on:
+                self.fail_on = None
+                raise RuntimeError("写入失败")
+            self.balances[user_id] = self.balances.get(user_id, 0) + amount
+            del deltas[user_id]
+
+
+def test_flush_writes_all_pending_credits():
+    store = FlakyStore()
+    ledger = EconomyLedger(store.apply, max_entries=100)
+    ledger.credit("a", 10)
+    ledger.credit("a", 5)
+    ledger.credit("b", 3)
+
+    assert ledger.pending("a") == 15
+    assert ledger.flush() == 2
+    assert store.balances == {"a": 15, "b": 3}
+    assert ledger.pending("a") == 0
+    assert ledger.flush() == 0
+
+
+def test_partial_flush_failure_restores_only_unwritten_credits():
+    store = FlakyStore(fail_on="b")
+    ledger = EconomyLedger(store.apply, max_entries=100)
+    for user_id in ("a", "b", "c"):
+        ledger.credit(user_id, 10)
+
+    with pytest.raises(RuntimeError):
+        ledger.flush()
+    assert store.balances == {"a": 10}
+    assert ledger.pending("a") == 0
+    assert ledger.pending("b") == 10
+    assert ledger.stats()["failed_flushes"] == 1
+
+    # 重试后已写入的用户不会重复入账
+    ledger.flush()
+    assert store.balances == {"a": 10, "b": 10, "c": 10}
+
+
+def test_draining_restores_amount_when_caller_fails():
+    ledger = EconomyLedger(lambda deltas: None, max_entries=100)
+    ledger.credit("a", 7)
+    with pytest.raises(ValueError):
+        with ledger.draining("a") as amount:
+            assert amount == 7
+            raise ValueError
+    assert ledger.pending("a") == 7
+
+
+class FakeTaskDB:
+    def __init__(self, fail_on=None):
+        self.progress = {}
+        self.fail_on = fail_on
+
+    def get_user_tasks(self):
+        return [(1, "a", "daily_buy_tea", "采购员", "", 0, 2, 30, "进行中", "每日任务")]
+
+    def update_task_progress(self, task_id, progress):
+        if task_id == self.fail_on:
+            self.fail_on = None
+            raise RuntimeError("写入失败")
+        self.progress[task_id] = progress
+
+    def complete_task(self, task_id):
+        pass
+
+
+def test_task_flush_failure_marks_only_unwritten_updates_dirty():
+    written = []
+
+    def apply(updates):
+        for update in list(updates):
+            if update[0] == "b" and not written.count("b-failed"):
+                written.append("b-failed")
+                raise RuntimeError("写入失败")
+            written.append(update[0])
+            updates.remove(update)
+
+    engine = TaskEngine(apply, today=lambda: "2025-01-01")
+    for user_id in ("a", "b"):
+        engine.emit(user_id, "tea_bought", FakeTaskDB(), count=1)
+
+    with pytest.raises(RuntimeError):
+        engine.flush()
+    assert engine.stats()["dirty"] == 1
+    assert engine.flush() == 1
+    assert written.count("a") == 1 and written.count("b") == 1
+
+
+def test_flush_user_failure_keeps_remaining_updates_dirty():
+    engine = TaskEngine(lambda updates: None, today=lambda: "2025-01-01")
+    engine.emit("a", "tea_bought", FakeTaskDB(), count=1)
+    db = FakeTaskDB(fail_on="daily_buy_tea")
+    with pytest.raises(RuntimeError):
+        engine.flush_user("a", db)
+    assert engine.stats()["dirty"] == 1
+    assert engine.flush_user("a", db) == 1
+    assert db.progress == {"daily_buy_tea": 1}
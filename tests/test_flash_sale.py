@@ -0,0 +1,86 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from API.flash_sale import FlashSale
+
+
+class Executor:
+    """与 AsyncDatabase.run 接口相同的线程池执行器"""
+
+    def __init__(self):
+        self.pool = ThreadPoolExecutor(2)
+
+    async def run(self, func, *args, op=None):
+        return await asyncio.get_running_loop().run_in_executor(self.pool, func, *args)
+
+
+class SlowAllocator:
+    """每批分配耗时 delay 秒，记录已提交的请求"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.committed = []
+        self._lock = threading.Lock()
+
+    def __call__(self, requests):
+        time.sleep(self.delay)
+        with self._lock:
+            self.committed.extend(requests)
+        return [{"status": "ok"} for _ in requests]
+
+
+async def _settle(tasks):
+    results = []
+    for task in tasks:
+        try:
+            results.append(await asyncio.wait_for(task, 1))
+        except RuntimeError as e:
+            results.append(str(e))
+    return results
+
+
+def test_close_during_allocation_finishes_running_batch():
+    async def scenario():
+        allocate = SlowAllocator(0.3)
+        sale = FlashSale(allocate, batch_size=2, batch_window_ms=50)
+        sale.start(Executor())
+        tasks = [asyncio.create_task(sale.submit(str(i), 1, 1)) for i in range(5)]
+        await asyncio.sleep(0.1)
+        await sale.close()
+        return allocate, await _settle(tasks)
+
+    allocate, results = asyncio.run(scenario())
+    # 已开始分配的一批照常提交并返回结果，其余请求收到停止错误，不会一直等待
+    assert results[:2] == [{"status": "ok"}] * 2
+    assert results[2:] == ["限时抢购已停止"] * 3
+    assert len(allocate.committed) == 2
+
+
+def test_close_while_collecting_batch_fails_waiting_requests():
+    async def scenario():
+        allocate = SlowAllocator(0)
+        sale = FlashSale(allocate, batch_size=5, batch_window_ms=500)
+        sale.start(Executor())
+        tasks = [asyncio.create_task(sale.submit(str(i), 1, 1)) for i in range(2)]
+        await asyncio.sleep(0.05)
+        await sale.close()
+        return allocate, await _settle(tasks)
+
+    allocate, results = asyncio.run(scenario())
+    assert results == ["限时抢购已停止"] * 2
+    assert allocate.committed == []
+
+
+def test_submit_after_close_is_rejected():
+    async def scenario():
+        sale = FlashSale(SlowAllocator(0), batch_size=2, batch_window_ms=10)
+        sale.start(Executor())
+        await sale.close()
+        await sale.submit("a", 1, 1)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(scenario())
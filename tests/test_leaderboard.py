@@ -0,0 +1,52 @@
+from API.leaderboard import Leaderboard, SignInStreaks
+from API.state_store import StateStore
+
+
+def make_streaks(tmp_path):
+    store = StateStore(str(tmp_path / "state.db"))
+    board = Leaderboard("连续签到榜")
+    return store, board, SignInStreaks(store, board)
+
+
+def test_consecutive_days_extend_streak(tmp_path):
+    _, board, streaks = make_streaks(tmp_path)
+
+    assert streaks.record("a", "2025-01-01") == 1
+    assert streaks.record("a", "2025-01-01") == 1
+    assert streaks.record("a", "2025-01-02") == 2
+    assert streaks.record("a", "2025-01-03") == 3
+    assert board.rank("a")[1] == 3
+
+
+def test_missed_day_restarts_streak(tmp_path):
+    _, board, streaks = make_streaks(tmp_path)
+    streaks.record("a", "2025-01-01")
+    streaks.record("a", "2025-01-02")
+
+    assert streaks.record("a", "2025-01-04") == 1
+    assert board.rank("a")[1] == 1
+
+
+def test_expire_drops_broken_streaks(tmp_path):
+    _, board, streaks = make_streaks(tmp_path)
+    streaks.record("a", "2025-01-01")
+    streaks.record("b", "2025-01-02")
+    streaks.record("c", "2025-01-03")
+
+    assert streaks.expire("2025-01-03") == 2
+    assert board.rank("a") is None
+    assert board.rank("b")[1] == 1
+
+
+def test_load_restores_streaks_from_state_store(tmp_path):
+    store, _, streaks = make_streaks(tmp_path)
+    streaks.record("a", "2025-01-01")
+    streaks.record("a", "2025-01-02")
+    streaks.record("b", "2024-12-01")
+
+    board = Leaderboard("连续签到榜")
+    restored = SignInStreaks(store, board)
+    assert restored.load("2025-01-03") == 1
+    assert board.rank("a")[1] == 2
+    assert board.rank("b") is None
+    assert restored.record("a", "2025-01-03") == 3
@@ -0,0 +1,88 @@
+import sqlite3
+
+import pytest
+
+from API.builtin_db import BuiltinStorage
+from API.purchase import PurchaseEngine
+from API.sqlite_fastpath import BUILTIN_SCHEMA_VERSION, SQLiteFastPath
+
+
+@pytest.fixture
+def store(tmp_path):
+    storage = BuiltinStorage(str(tmp_path / "teahouse.db"))
+    with storage.get_databases({}, storage.db_file, "admin") as (_, _, _, _, db_store):
+        tea_id = db_store.add_tea_to_store("龙井", 3, "绿茶", 10, "")
+    for user_id, coins in (("rich", 100), ("poor", 5)):
+        with storage.get_databases({}, storage.db_file, user_id) as (_, db_economy, _, _, _):
+            db_economy.add_economy(coins)
+    fastpath = SQLiteFastPath(storage.db_file)
+    fastpath.probe(BUILTIN_SCHEMA_VERSION)
+    yield storage, fastpath, tea_id
+    fastpath.close()
+    storage.close()
+
+
+def economy(fastpath, user_id):
+    return fastpath.connection().execute("SELECT economy FROM economy WHERE user_id = ?", (user_id,)).fetchone()[0]
+
+
+def stock(fastpath, tea_id):
+    return fastpath.connection().execute("SELECT quantity FROM tea_store WHERE id = ?", (tea_id,)).fetchone()[0]
+
+
+def test_purchase_deducts_money_stock_and_fills_backpack(store):
+    _, fastpath, tea_id = store
+    engine = PurchaseEngine(fastpath)
+    assert engine.available
+    result = engine.purchase("rich", 1, 2)
+    assert result["status"] == "ok"
+    assert (economy(fastpath, "rich"), stock(fastpath, tea_id)) == (80, 1)
+    backpack = fastpath.connection().execute(
+        "SELECT item_count, item_value FROM backpack WHERE user_id = 'rich' AND item_name = '龙井'").fetchone()
+    assert backpack == (2, 10)
+
+
+def test_stock_is_never_oversold(store):
+    _, fastpath, tea_id = store
+    results = PurchaseEngine(fastpath).purchase_batch([("rich", tea_id, 2), ("rich", tea_id, 2), ("rich", tea_id, 1)])
+    assert [result["status"] for result in results] == ["ok", "no_stock", "ok"]
+    assert stock(fastpath, tea_id) == 0
+    assert economy(fastpath, "rich") == 70
+
+
+def test_insufficient_money_rolls_back_stock(store):
+    _, fastpath, tea_id = store
+    result = PurchaseEngine(fastpath).purchase("poor", 1, 1)
+    assert result["status"] == "no_money"
+    assert (economy(fastpath, "poor"), stock(fastpath, tea_id)) == (5, 3)
+
+
+def test_multiplier_charges_total_but_keeps_base_price(store):
+    _, fastpath, tea_id = store
+    result = PurchaseEngine(fastpath).purchase("rich", 1, 2, multiplier=1.5)
+    assert result["total_price"] == 30
+    assert economy(fastpath, "rich") == 70
+
+
+def test_probe_requires_pinned_schema_version(store):
+    storage, fastpath, _ = store
+    assert fastpath.supports("economy", "backpack", "tea_store")
+    other = SQLiteFastPath(storage.db_file)
+    assert other.probe(BUILTIN_SCHEMA_VERSION + 1) == frozenset()
+    assert not PurchaseEngine(other).available
+    other.close()
+
+
+def test_probe_rejects_unknown_task_status(tmp_path):
+    db_file = str(tmp_path / "plugin.db")
+    BuiltinStorage(db_file).close()
+    conn = sqlite3.connect(db_file)
+    conn.execute("INSERT INTO tasks (user_id, task_id, task_name, task_target, status, task_type) "
+                 "VALUES ('a', 't', '任务', 1, 'in_progress', '每日任务')")
+    conn.commit()
+    conn.close()
+    fastpath = SQLiteFastPath(db_file)
+    assert "tasks" not in fastpath.probe()
+    with pytest.raises(RuntimeError):
+        fastpath.reset_tasks("每日任务")
+    fastpath.close()